@@ -7,3 +7,5 @@ from .ai import router as ai_router
 from .saved_component import router as saved_component_router
 from .template import router as template_router
 from .widget import router as widget_router
+from .metrics import router as metrics_router
+from .search import router as search_router
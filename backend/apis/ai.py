@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Any, Dict, List, Optional
-from backend.services import ai_service
+from backend.services import ai_service, annotation_job_service
 from backend.utils.logging import LoggingAPIRoute
+from backend.utils import sse
 from backend.db.session import get_db
 
 router = APIRouter(
@@ -17,20 +19,75 @@ def generate_dataset_sql(payload: Dict[str, Any], db: Session = Depends(get_db))
     table_ids: List[int] = payload.get("tableIds", [])
     user_query: str = payload.get("userQuery", "")
     skip_auto_select: bool = payload.get("skipAutoSelect", False)
-    return ai_service.generate_dataset_sql(db, data_source_id, table_ids, user_query, skip_auto_select)
+    use_cache: bool = payload.get("useCache", True)
+    return ai_service.generate_dataset_sql(db, data_source_id, table_ids, user_query, skip_auto_select, use_cache)
+
+@router.post("/generate-dataset-sql/stream")
+async def generate_dataset_sql_stream(payload: Dict[str, Any], db: Session = Depends(get_db)):
+    """Server-Sent Events: tables, delta, sql (partial, then complete), result | error"""
+    events = ai_service.stream_dataset_sql(
+        db,
+        payload.get("dataSourceId"),
+        payload.get("tableIds", []),
+        payload.get("userQuery", ""),
+        payload.get("skipAutoSelect", False),
+        payload.get("useCache", True),
+    )
+    return StreamingResponse(sse.encode(events), media_type=sse.MEDIA_TYPE, headers=sse.HEADERS)
 
 @router.post("/select-tables")
 def select_tables(payload: Dict[str, Any], db: Session = Depends(get_db)):
     data_source_id: int = payload.get("dataSourceId")
     user_query: str = payload.get("userQuery", "")
-    return ai_service.auto_select_tables(db, data_source_id, user_query)
+    use_cache: bool = payload.get("useCache", True)
+    return ai_service.auto_select_tables(db, data_source_id, user_query, use_cache)
 
 @router.post("/generate-table-annotations")
-def generate_table_annotations(payload: Dict[str, Any]):
+def generate_table_annotations(payload: Dict[str, Any], db: Session = Depends(get_db)):
     table_name: str = payload.get("tableName", "")
     table_description: Optional[str] = payload.get("tableDescription")
     columns: List[Dict[str, str]] = payload.get("columns", [])
-    return ai_service.generate_table_annotations(table_name, table_description, columns)
+    use_cache: bool = payload.get("useCache", True)
+    use_dictionary: bool = payload.get("useDictionary", True)
+    return ai_service.generate_table_annotations(table_name, table_description, columns, use_cache, db if use_dictionary else None)
+
+@router.post("/annotation-jobs", status_code=202)
+def start_annotation_job(payload: Dict[str, Any], db: Session = Depends(get_db)):
+    """Annotates many tables in the background; progress via GET /annotation-jobs/{id} or its /events stream"""
+    try:
+        return annotation_job_service.start(
+            db,
+            payload.get("dataSourceId"),
+            payload.get("tableIds") or None,
+            payload.get("overwrite", False),
+            payload.get("useCache", True),
+            use_dictionary=payload.get("useDictionary", True),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def _get_annotation_job(job_id: str) -> annotation_job_service.AnnotationJob:
+    job = annotation_job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Annotation job not found")
+    return job
+
+@router.get("/annotation-jobs/{job_id}")
+def read_annotation_job(job_id: str):
+    return _get_annotation_job(job_id).snapshot()
+
+@router.get("/annotation-jobs/{job_id}/events")
+async def annotation_job_events(job_id: str):
+    """Server-Sent Events: progress on every change, then done"""
+    job = _get_annotation_job(job_id)
+    return StreamingResponse(sse.encode(annotation_job_service.stream_progress(job)), media_type=sse.MEDIA_TYPE, headers=sse.HEADERS)
+
+@router.delete("/annotation-jobs/{job_id}")
+def cancel_annotation_job(job_id: str):
+    """Stops a job; tables already annotated keep their annotations"""
+    job = _get_annotation_job(job_id)
+    job.cancel()
+    return job.snapshot()
 
 @router.post("/generate-data-insight")
 def generate_data_insight(payload: Dict[str, Any]):
@@ -39,6 +96,16 @@ def generate_data_insight(payload: Dict[str, Any]):
     reference_context: Optional[Dict[str, Any]] = payload.get("referenceContext")
     return ai_service.generate_data_insight(tables, user_query, reference_context)
 
+@router.post("/generate-data-insight/stream")
+async def generate_data_insight_stream(payload: Dict[str, Any]):
+    """Server-Sent Events: delta, explanation (partial, then complete), result | error"""
+    events = ai_service.stream_data_insight(
+        payload.get("tables", []),
+        payload.get("userQuery", ""),
+        payload.get("referenceContext"),
+    )
+    return StreamingResponse(sse.encode(events), media_type=sse.MEDIA_TYPE, headers=sse.HEADERS)
+
 @router.post("/generate-web-component")
 def generate_web_component(payload: Dict[str, Any]):
     description: str = payload.get("description", "")
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 import backend.schemas as schemas
 from backend.db.session import get_db
 import backend.services.dashboard_service as service
+import backend.services.version_service as version_service
+from backend.utils.etag import make_etag, matches, not_modified, set_etag, conditional
 from backend.utils.logging import LoggingAPIRoute
 
 router = APIRouter(
@@ -13,8 +15,41 @@ router = APIRouter(
 )
 
 @router.get("", response_model=List[schemas.Dashboard])
-def read_dashboards(db: Session = Depends(get_db)):
-    return service.get_all(db)
+def read_dashboards(request: Request, db: Session = Depends(get_db)):
+    etag = make_etag("dashboard", version_service.get_version(db, "dashboard"))
+    if matches(request, etag):
+        return not_modified(etag)
+    # Served from the pre-serialized documents written on each dashboard/widget change
+    response = Response(content=service.get_all_documents(db), media_type="application/json")
+    set_etag(response, etag)
+    return response
+
+@router.get("/summary", response_model=schemas.DashboardSummaryPage)
+def read_dashboard_summaries(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    etag = make_etag("dashboard", version_service.get_version(db, "dashboard"), variant=f"summary?{request.url.query}")
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
+    return service.get_summaries(db, skip=skip, limit=limit)
+
+@router.get("/{dashboard_id}", response_model=schemas.Dashboard)
+def read_dashboard(dashboard_id: int, request: Request, db: Session = Depends(get_db)):
+    etag = make_etag("dashboard", version_service.get_version(db, "dashboard", dashboard_id), dashboard_id)
+    if matches(request, etag):
+        return not_modified(etag)
+    document = service.get_document(db, dashboard_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    version, body = document
+    response = Response(content=body, media_type="application/json", headers={"X-Document-Version": str(version)})
+    set_etag(response, etag)
+    return response
 
 @router.post("", response_model=schemas.Dashboard)
 def create_dashboard(dashboard: schemas.DashboardBase, db: Session = Depends(get_db)):
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, Body
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import itertools
 import backend.schemas as schemas
 import backend.services.dataset_service as service
+import backend.services.datasource_service as datasource_service
+import backend.services.export_service as export_service
+import backend.services.sql_estimate_service as estimate_service
+import backend.services.version_service as version_service
+from backend.utils.etag import make_etag, conditional
 from backend.utils.logging import LoggingAPIRoute
 from backend.db.session import get_db
 
@@ -13,7 +20,11 @@ router = APIRouter(
 )
 
 @router.get("", response_model=List[schemas.Dataset])
-def read_datasets(db: Session = Depends(get_db)):
+def read_datasets(request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag("dataset", version_service.get_version(db, "dataset"))
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
     return service.get_all(db)
 
 @router.post("", response_model=schemas.Dataset)
@@ -41,10 +52,83 @@ def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{dataset_id}/execute")
-def execute_dataset_sql(dataset_id: int, limit: int = 100, db: Session = Depends(get_db)):
+def execute_dataset_sql(dataset_id: int, limit: int = 100, options: Optional[schemas.DatasetExecuteOptions] = Body(None), db: Session = Depends(get_db)):
     try:
-        return service.execute_query(db, dataset_id, limit)
+        return service.execute_query(db, dataset_id, limit, options)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{dataset_id}/columns/{column}/values")
+def read_column_values(
+    dataset_id: int,
+    column: str,
+    prefix: Optional[str] = Query(None, description="Case-insensitive prefix search"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    try:
+        return service.get_column_values(db, dataset_id, column, prefix, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{dataset_id}/estimate")
+def estimate_dataset_sql(dataset_id: int, db: Session = Depends(get_db)):
+    try:
+        _, exec_request = service.get_execute_request(db, dataset_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return estimate_service.estimate_sql(exec_request)
+
+@router.get("/{dataset_id}/export")
+def export_dataset(
+    dataset_id: int,
+    request: Request,
+    format: str = Query("csv", description="csv / xlsx / parquet"),
+    gzip: bool = Query(False, description="Gzip the CSV output"),
+    stored: bool = Query(False, description="Materialize to a stored file (resumable via Range)"),
+    db: Session = Depends(get_db)
+):
+    if format not in export_service.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    try:
+        dataset, exec_request = service.get_execute_request(db, dataset_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    compress = gzip and format == "csv"
+    media_type, ext = export_service.EXPORT_FORMATS[format]
+    filename = f"dataset_{dataset_id}.{ext}" + (".gz" if compress else "")
+    headers = {"Content-Disposition": f"attachment; filename=\"{filename}\""}
+
+    # Only CSV can be written straight to the socket; Range requests and the
+    # binary formats go through a stored file that FileResponse serves partially.
+    use_stored = stored or format != "csv" or request.headers.get("range") is not None
+    path = export_service.export_file_path(dataset_id, exec_request.sql, format, compress)
+    if use_stored and export_service.is_fresh(path):
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    batches = datasource_service.iter_sql_chunks(exec_request, export_service.EXPORT_CHUNK_SIZE)
+    try:
+        # Pull the first batch eagerly so connection / SQL errors become a proper status code
+        first = next(batches)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    batches = itertools.chain([first], batches)
+
+    if use_stored:
+        try:
+            export_service.build_export_file(path, format, compress, batches)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    chunks = export_service.csv_chunks(batches)
+    if compress:
+        chunks = export_service.gzip_chunks(chunks)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 import backend.schemas as schemas
 from backend.db.session import get_db
 import backend.services.datasource_service as service
+import backend.services.sql_estimate_service as estimate_service
+import backend.services.version_service as version_service
+from backend.utils.etag import make_etag, conditional
 from backend.utils.logging import LoggingAPIRoute
 
 router = APIRouter(
@@ -32,10 +35,44 @@ def preview_table(request: schemas.PreviewTableRequest):
 def execute_sql(request: schemas.ExecuteSqlRequest):
     return service.execute_sql(request)
 
+@router.post("/estimate-sql")
+def estimate_sql(request: schemas.ExecuteSqlRequest):
+    return estimate_service.estimate_sql(request)
+
 @router.get("", response_model=List[schemas.DataSource])
-def read_datasources(db: Session = Depends(get_db)):
+def read_datasources(request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag("datasource", version_service.get_version(db, "datasource"))
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
     return service.get_all(db)
 
+@router.get("/summary", response_model=schemas.DataSourceSummaryPage)
+def read_datasource_summaries(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    includeTables: bool = Query(False, description="Include table id/name/description (no columns or rows)"),
+    db: Session = Depends(get_db)
+):
+    etag = make_etag("datasource", version_service.get_version(db, "datasource"), variant=f"summary?{request.url.query}")
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
+    return service.get_summaries(db, skip=skip, limit=limit, include_tables=includeTables)
+
+@router.get("/{datasource_id}", response_model=schemas.DataSource)
+def read_datasource(datasource_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag("datasource", version_service.get_version(db, "datasource", datasource_id), datasource_id)
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
+    db_datasource = service.get_by_id(db, datasource_id)
+    if not db_datasource:
+        raise HTTPException(status_code=404, detail="DataSource not found")
+    return db_datasource
+
 @router.post("", response_model=schemas.DataSource)
 def create_datasource(datasource: schemas.DataSourceBase, db: Session = Depends(get_db)):
     db_datasource = service.create(db, datasource)
@@ -50,6 +87,20 @@ def update_datasource(datasource_id: int, datasource: schemas.DataSourceBase, db
         raise HTTPException(status_code=404, detail="DataSource not found")
     return db_datasource
 
+@router.patch("/{datasource_id}/tables/{table_id}", response_model=schemas.TableData)
+def patch_table(datasource_id: int, table_id: int, patch: schemas.TableEntryPatch, db: Session = Depends(get_db)):
+    db_table = service.patch_table(db, datasource_id, table_id, patch)
+    if not db_table:
+        raise HTTPException(status_code=404, detail="Table not found")
+    return db_table
+
+@router.patch("/{datasource_id}/tables/{table_id}/columns/{column_name}", response_model=schemas.TableData)
+def patch_column(datasource_id: int, table_id: int, column_name: str, patch: schemas.ColumnPatch, db: Session = Depends(get_db)):
+    db_table = service.patch_column(db, datasource_id, table_id, column_name, patch)
+    if not db_table:
+        raise HTTPException(status_code=404, detail="Table or column not found")
+    return db_table
+
 @router.delete("/{datasource_id}")
 def delete_datasource(datasource_id: int, db: Session = Depends(get_db)):
     success = service.delete(db, datasource_id)
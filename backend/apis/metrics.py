@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from backend.db import metrics as db_metrics
+from backend.services import ai_service
+from backend.utils.logging import LoggingAPIRoute
+
+router = APIRouter(
+    prefix="/api/metrics",
+    tags=["metrics"],
+    route_class=LoggingAPIRoute
+)
+
+@router.get("/db")
+def read_db_metrics():
+    return db_metrics.snapshot()
+
+@router.get("/llm-cache")
+def read_llm_cache_metrics():
+    return ai_service.llm_cache.stats()
+
+@router.get("/llm-providers")
+def read_llm_provider_metrics():
+    return ai_service.provider_metrics()
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 import backend.schemas as schemas
 from backend.db.session import get_db
 import backend.services.saved_component_service as service
+import backend.services.version_service as version_service
+from backend.utils.etag import make_etag, conditional
 from backend.utils.logging import LoggingAPIRoute
 
 router = APIRouter(
@@ -13,7 +15,12 @@ router = APIRouter(
 )
 
 @router.get("", response_model=List[schemas.SavedComponent])
-def read_saved_components(db: Session = Depends(get_db)):
+def read_saved_components(request: Request, response: Response, db: Session = Depends(get_db)):
+    # Saved components are widget rows, so they share the widget collection version
+    etag = make_etag("widget", version_service.get_version(db, "widget"), variant="saved-components")
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
     return service.get_all(db)
 
 @router.post("", response_model=schemas.SavedComponent)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+import backend.schemas as schemas
+from backend.db.session import get_db
+import backend.services.search_service as service
+from backend.utils.logging import LoggingAPIRoute
+
+router = APIRouter(
+    prefix="/api/search",
+    tags=["search"],
+    route_class=LoggingAPIRoute
+)
+
+@router.get("", response_model=schemas.SearchResultPage)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[str] = Query(None, pattern="^(table|dataset|widget)$"),
+    datasourceId: Optional[int] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    if not service.is_available(db):
+        raise HTTPException(status_code=503, detail="Search index not built; run python -m backend.db.create_search_index")
+    return service.search(db, q, kind=kind, datasource_id=datasourceId, skip=skip, limit=limit)
@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from backend.db.session import get_db
 from backend.schemas import base as schemas
 from backend.services.template_service import TemplateService
+import backend.services.version_service as version_service
+from backend.utils.etag import make_etag, conditional
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.Template])
-def read_templates(skip: int = 0, limit: int = 100, category: Optional[str] = None, db: Session = Depends(get_db)):
+def read_templates(request: Request, response: Response, skip: int = 0, limit: int = 100, category: Optional[str] = None, db: Session = Depends(get_db)):
+    etag = make_etag("template", version_service.get_version(db, "template"), variant=request.url.query)
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
     templates = TemplateService.get_templates(db, skip=skip, limit=limit, category=category)
     return templates
 
@@ -18,7 +24,11 @@ def create_template(template: schemas.TemplateCreate, db: Session = Depends(get_
     return TemplateService.create_template(db, template)
 
 @router.get("/{template_id}", response_model=schemas.Template)
-def read_template(template_id: int, db: Session = Depends(get_db)):
+def read_template(template_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag("template", version_service.get_version(db, "template", template_id), template_id)
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
     db_template = TemplateService.get_template(db, template_id=template_id)
     if db_template is None:
         raise HTTPException(status_code=404, detail="Template not found")
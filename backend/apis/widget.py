@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import backend.schemas as schemas
 from backend.db.session import get_db
 import backend.services.widget_service as service
+import backend.services.version_service as version_service
+from backend.utils.etag import make_etag, conditional
 from backend.utils.logging import LoggingAPIRoute
 
 router = APIRouter(
@@ -14,13 +16,23 @@ router = APIRouter(
 
 @router.get("", response_model=List[schemas.Widget])
 def read_widgets(
+    request: Request,
+    response: Response,
     type: Optional[str] = Query(None, description="Filter by widget type (chart/web)"),
     db: Session = Depends(get_db)
 ):
+    etag = make_etag("widget", version_service.get_version(db, "widget"), variant=request.url.query)
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
     return service.get_all(db, type=type)
 
 @router.get("/{widget_id}", response_model=schemas.Widget)
-def read_widget(widget_id: int, db: Session = Depends(get_db)):
+def read_widget(widget_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag("widget", version_service.get_version(db, "widget", widget_id), widget_id)
+    cached = conditional(request, response, etag)
+    if cached:
+        return cached
     widget = service.get_by_id(db, widget_id)
     if not widget:
         raise HTTPException(status_code=404, detail="Widget not found")
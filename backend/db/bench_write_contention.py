@@ -0,0 +1,122 @@
+"""
+Write-contention benchmark for the SQLite metadata store.
+
+Simulates the production pattern that stalls dashboard saves: several threads
+saving dashboards (small writes), one thread running an annotation batch (large
+TableEntry rewrites) and a few readers listing dashboards. Runs once with SQLite
+defaults and once with the tuned pragmas, against throwaway database files.
+
+    python -m backend.db.bench_write_contention --seconds 10 --writers 8
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from sqlalchemy.orm import sessionmaker
+from backend.db.session import Base, SQLITE_PRAGMAS, create_metadata_engine
+from backend.models.orm import Dashboard, DashboardWidget, DataSource, TableEntry, Widget
+
+def _seed(factory, dashboards: int, widgets_per_dashboard: int, tables: int):
+    db = factory()
+    ds = DataSource(name="bench", config={"type": "oracle"})
+    db.add(ds)
+    db.flush()
+    for i in range(tables):
+        db.add(TableEntry(name=f"T_{i}", dataSourceId=ds.id, columns=[], rows=[]))
+    for d in range(dashboards):
+        dash = Dashboard(name=f"dash {d}", createdAt=0)
+        db.add(dash)
+        db.flush()
+        for w in range(widgets_per_dashboard):
+            widget = Widget(name=f"w {d}-{w}", type="chart", config={"type": "bar"}, createdAt=0)
+            db.add(widget)
+            db.flush()
+            db.add(DashboardWidget(dashboard_id=dash.id, widget_id=widget.id, layout={"colSpan": 6, "height": 300, "i": w}))
+    db.commit()
+    db.close()
+
+def _run(pragmas, label: str, seconds: float, writers: int, readers: int):
+    tmpdir = tempfile.mkdtemp(prefix="bench_sqlite_")
+    engine = create_metadata_engine(f"sqlite:///{os.path.join(tmpdir, 'bench.db')}", pragmas=pragmas)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    _seed(factory, dashboards=50, widgets_per_dashboard=15, tables=200)
+
+    stop = time.monotonic() + seconds
+    stats = {"save": [], "annotate": [], "read": [], "errors": 0}
+    stats_lock = threading.Lock()
+
+    def timed(kind, fn):
+        start = time.perf_counter()
+        db = factory()
+        try:
+            fn(db)
+            db.commit()
+            ms = (time.perf_counter() - start) * 1000
+            with stats_lock:
+                stats[kind].append(ms)
+        except Exception as e:
+            db.rollback()
+            with stats_lock:
+                stats["errors"] += 1
+            if "locked" not in str(e):
+                raise
+        finally:
+            db.close()
+
+    def save_dashboard(db):
+        dash_id = random.randint(1, 50)
+        for assoc in db.query(DashboardWidget).filter(DashboardWidget.dashboard_id == dash_id).all():
+            assoc.layout = {**(assoc.layout or {}), "height": random.randint(200, 600)}
+        db.query(Dashboard).filter(Dashboard.id == dash_id).update({"updatedAt": int(time.time() * 1000)})
+
+    def annotate_batch(db):
+        cols = [{"name": f"COL_{i}", "type": "VARCHAR2", "alias": f"字段{i}", "description": "x" * 200} for i in range(60)]
+        for t in db.query(TableEntry).filter(TableEntry.id <= 40).all():
+            t.columns = cols
+            t.simple_description = "annotated " + str(random.random())
+
+    def list_dashboards(db):
+        for d in db.query(Dashboard).all():
+            for assoc in d.widget_associations:
+                _ = assoc.widget.config
+
+    def loop(kind, fn):
+        while time.monotonic() < stop:
+            timed(kind, fn)
+
+    threads = [threading.Thread(target=loop, args=("save", save_dashboard)) for _ in range(writers)]
+    threads.append(threading.Thread(target=loop, args=("annotate", annotate_batch)))
+    threads += [threading.Thread(target=loop, args=("read", list_dashboards)) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(f"\n[{label}]")
+    for kind in ("save", "annotate", "read"):
+        data = sorted(stats[kind])
+        if not data:
+            print(f"  {kind:9s} no successful operations")
+            continue
+        p95 = data[min(len(data) - 1, int(0.95 * len(data)))]
+        print(f"  {kind:9s} ops={len(data):6d}  ops/s={len(data) / seconds:8.1f}  p50={data[len(data) // 2]:8.1f}ms  p95={p95:8.1f}ms  max={data[-1]:8.1f}ms")
+    print(f"  lock errors: {stats['errors']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    _run(None, "sqlite defaults (rollback journal, sqlite3 default 5s timeout)", args.seconds, args.writers, args.readers)
+    _run(SQLITE_PRAGMAS, f"tuned {SQLITE_PRAGMAS}", args.seconds, args.writers, args.readers)
+
+if __name__ == "__main__":
+    main()
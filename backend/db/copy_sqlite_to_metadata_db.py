@@ -0,0 +1,70 @@
+"""
+Copies an existing SQLite metadata file into the database configured via
+METADATA_DATABASE_URL (e.g. Postgres), creating the schema first.
+
+    METADATA_DATABASE_URL=postgresql+psycopg2://... python -m backend.db.copy_sqlite_to_metadata_db [path/to/ai_insight.db]
+"""
+import os
+import sys
+from sqlalchemy import create_engine, inspect, select, text, Integer
+from backend.db.session import engine, Base, DATA_DIR, is_sqlite_url, SQLALCHEMY_DATABASE_URL
+import backend.models.orm  # noqa: F401  (registers tables on Base)
+
+BATCH_SIZE = 1000
+
+def copy_table(source_conn, target_conn, table) -> int:
+    source_cols = {c["name"] for c in inspect(source_conn).get_columns(table.name)}
+    # Skip legacy columns the ORM no longer maps (and new ones the old file lacks)
+    columns = [c for c in table.columns if c.name in source_cols]
+    result = source_conn.execute(select(*columns))
+    copied = 0
+    while True:
+        rows = result.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        target_conn.execute(table.insert(), [dict(row._mapping) for row in rows])
+        copied += len(rows)
+    return copied
+
+def reset_sequences(target_conn, table):
+    """Moves Postgres id sequences past the copied ids so new inserts don't collide"""
+    if target_conn.dialect.name != "postgresql":
+        return
+    for col in table.primary_key.columns:
+        if isinstance(col.type, Integer) and col.autoincrement in (True, "auto"):
+            target_conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence(:table, :col), "
+                f"COALESCE((SELECT MAX({col.name}) FROM {table.name}), 0) + 1, false)"
+            ), {"table": table.name, "col": col.name})
+
+def copy_database(source_path: str):
+    if is_sqlite_url(SQLALCHEMY_DATABASE_URL):
+        print("METADATA_DATABASE_URL points at SQLite; set it to the target database first.")
+        return
+    if not os.path.exists(source_path):
+        print(f"Source database not found at {source_path}")
+        return
+
+    source = create_engine(f"sqlite:///{source_path}")
+    print(f"Copying {source_path} -> {engine.url.render_as_string(hide_password=True)}")
+    Base.metadata.create_all(bind=engine)
+
+    with source.connect() as source_conn, engine.begin() as target_conn:
+        source_tables = set(inspect(source_conn).get_table_names())
+        # sorted_tables orders parents before children so foreign keys resolve
+        for table in Base.metadata.sorted_tables:
+            if table.name not in source_tables:
+                print(f"- {table.name}: not in source, skipped")
+                continue
+            if target_conn.execute(select(table).limit(1)).first() is not None:
+                print(f"- {table.name}: target not empty, skipped")
+                continue
+            count = copy_table(source_conn, target_conn, table)
+            reset_sequences(target_conn, table)
+            print(f"- {table.name}: {count} rows")
+
+    source.dispose()
+    print("Copy completed.")
+
+if __name__ == "__main__":
+    copy_database(sys.argv[1] if len(sys.argv) > 1 else os.path.join(DATA_DIR, "ai_insight.db"))
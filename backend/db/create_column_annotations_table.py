@@ -0,0 +1,25 @@
+from backend.db.session import engine, SessionLocal
+from backend.models.orm import ColumnAnnotation
+from sqlalchemy import inspect
+import backend.services.column_dictionary_service as column_dictionary_service
+
+def create_column_annotations_table():
+    print(f"Using database: {engine.url.render_as_string(hide_password=True)}")
+
+    if inspect(engine).has_table("column_annotations"):
+        print("Table 'column_annotations' already exists.")
+    else:
+        print("Creating 'column_annotations' table...")
+        ColumnAnnotation.__table__.create(bind=engine)
+        print("Table 'column_annotations' created successfully.")
+
+    # Learn from the annotations already saved
+    db = SessionLocal()
+    try:
+        entries = column_dictionary_service.rebuild(db)
+        print(f"Column dictionary rebuilt: {entries} entries.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    create_column_annotations_table()
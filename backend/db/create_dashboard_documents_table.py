@@ -0,0 +1,29 @@
+from backend.db.session import engine, SessionLocal
+from backend.models.orm import Dashboard, DashboardDocument
+from backend.services import dashboard_service
+from sqlalchemy import inspect
+
+def create_dashboard_documents_table():
+    print(f"Using database: {engine.url.render_as_string(hide_password=True)}")
+
+    if not inspect(engine).has_table("dashboard_documents"):
+        print("Creating 'dashboard_documents' table...")
+        DashboardDocument.__table__.create(bind=engine)
+    else:
+        print("Table 'dashboard_documents' already exists.")
+
+    # Backfill so the first reads don't have to build documents
+    db = SessionLocal()
+    try:
+        ids = [row[0] for row in db.query(Dashboard.id).all()]
+        dashboard_service.write_documents(db, ids)
+        db.commit()
+        print(f"Built documents for {len(ids)} dashboards.")
+    except Exception as e:
+        print(f"Backfill failed: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    create_dashboard_documents_table()
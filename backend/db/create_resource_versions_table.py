@@ -0,0 +1,18 @@
+from backend.db.session import engine
+from backend.models.orm import ResourceVersion
+from sqlalchemy import inspect
+
+def create_resource_versions_table():
+    print(f"Using database: {engine.url.render_as_string(hide_password=True)}")
+
+    if inspect(engine).has_table("resource_versions"):
+        print("Table 'resource_versions' already exists.")
+        return
+
+    # Missing rows read as version 0, so no backfill is needed
+    print("Creating 'resource_versions' table...")
+    ResourceVersion.__table__.create(bind=engine)
+    print("Table 'resource_versions' created successfully.")
+
+if __name__ == "__main__":
+    create_resource_versions_table()
@@ -0,0 +1,27 @@
+"""
+Creates the full-text search index (FTS5 on SQLite, tsvector + GIN on Postgres)
+and rebuilds it from the current tables, datasets and widgets. Safe to re-run;
+the services keep it up to date incrementally afterwards.
+
+    python -m backend.db.create_search_index
+"""
+from backend.db.session import engine, SessionLocal
+from backend.db.migration_utils import describe_target
+import backend.services.search_service as search_service
+
+def create_search_index():
+    describe_target()
+    print(f"Creating '{search_service.INDEX_TABLE}' if missing...")
+    search_service.create_index(engine)
+
+    db = SessionLocal()
+    try:
+        counts = search_service.rebuild(db)
+        for kind, count in counts.items():
+            print(f"- {kind}: {count} documents")
+    finally:
+        db.close()
+    print("Search index rebuilt.")
+
+if __name__ == "__main__":
+    create_search_index()
@@ -1,9 +1,9 @@
 from backend.db.session import engine, Base
 from backend.models.orm import Template
-from sqlalchemy import text
+from sqlalchemy import inspect
 
 def create_template_table():
-    print(f"Using database: {engine.url}")
+    print(f"Using database: {engine.url.render_as_string(hide_password=True)}")
     print("Creating 'templates' table if it doesn't exist...")
     
     # Create the table
@@ -12,12 +12,11 @@ def create_template_table():
     # Verify
     with engine.connect() as conn:
         print("\nListing all tables in database:")
-        tables = conn.execute(text("SELECT name FROM sqlite_master WHERE type='table'")).fetchall()
-        for t in tables:
-            print(f"- {t[0]}")
+        inspector = inspect(conn)
+        for name in inspector.get_table_names():
+            print(f"- {name}")
             
-        result = conn.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name='templates'"))
-        if result.fetchone():
+        if inspector.has_table("templates"):
             print("\nTable 'templates' exists successfully.")
         else:
             print("\nError: Table 'templates' was not created.")
@@ -2,7 +2,7 @@ from backend.db.session import engine, SessionLocal, Base
 import backend.models as models
 import time
 import json
-from sqlalchemy import text
+from sqlalchemy import text, inspect
 
 def init_db():
     # Import all models to ensure they are registered with Base
@@ -84,13 +84,12 @@ def init_db():
         # Check if datasets need migration (dataSourceIds -> dataSourceId)
         try:
             # Check if dataSourceId column exists
-            # SQLite pragma
-            columns = db.execute(text("PRAGMA table_info(datasets)")).fetchall()
-            column_names = [col[1] for col in columns]
+            column_names = [col["name"] for col in inspect(engine).get_columns("datasets")]
+            quote = engine.dialect.identifier_preparer.quote
             
             if 'dataSourceId' not in column_names:
                 print("Migrating datasets: Adding dataSourceId column...")
-                db.execute(text("ALTER TABLE datasets ADD COLUMN dataSourceId INTEGER"))
+                db.execute(text(f"ALTER TABLE datasets ADD COLUMN {quote('dataSourceId')} BIGINT"))
                 db.commit()
                 
                 # Migrate data
@@ -103,7 +102,7 @@ def init_db():
                     fallback_source_id = first_source.id
                 
                 # We have to read dataSourceIds using raw SQL because model definition changed
-                results = db.execute(text("SELECT id, dataSourceIds FROM datasets")).fetchall()
+                results = db.execute(text(f"SELECT id, {quote('dataSourceIds')} FROM datasets")).fetchall()
                 for row in results:
                     ds_id = row[0]
                     ids_json = row[1]
@@ -130,7 +129,7 @@ def init_db():
                         target_id = fallback_source_id
                         
                     if target_id is not None:
-                         db.execute(text("UPDATE datasets SET dataSourceId = :did WHERE id = :id"), {"did": target_id, "id": ds_id})
+                         db.execute(text(f"UPDATE datasets SET {quote('dataSourceId')} = :did WHERE id = :id"), {"did": target_id, "id": ds_id})
 
                 db.commit()
                 print("Datasets migration completed.")
@@ -0,0 +1,91 @@
+from collections import deque
+from typing import Any, Dict
+from sqlalchemy import event
+import threading
+import time
+import weakref
+
+_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+_SAMPLES = 2000
+
+class _Timings:
+    """Bounded window of durations (ms) plus lifetime count/total"""
+    def __init__(self):
+        self.samples = deque(maxlen=_SAMPLES)
+        self.count = 0
+        self.total_ms = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, ms: float):
+        with self.lock:
+            self.samples.append(ms)
+            self.count += 1
+            self.total_ms += ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            data = sorted(self.samples)
+            count, total = self.count, self.total_ms
+        if not data:
+            return {"count": count, "totalMs": round(total, 3)}
+        def pct(p):
+            return round(data[min(len(data) - 1, int(p * len(data)))], 3)
+        return {
+            "count": count,
+            "totalMs": round(total, 3),
+            "p50Ms": pct(0.50),
+            "p95Ms": pct(0.95),
+            "p99Ms": pct(0.99),
+            "maxMs": round(data[-1], 3),
+        }
+
+# Write statements and commits include the time SQLite spends waiting on busy_timeout,
+# so their tail latency is the practical lock-wait signal.
+write_statements = _Timings()
+commits = _Timings()
+_lock_errors = 0
+_lock_errors_lock = threading.Lock()
+# Weak, so engines created by tests or benches drop out once they are garbage
+_engines: "weakref.WeakSet" = weakref.WeakSet()
+
+def instrument_engine(engine):
+    _engines.add(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["_metrics_start"].pop()
+        if statement.lstrip()[:7].upper().startswith(_WRITE_PREFIXES):
+            write_statements.record((time.perf_counter() - start) * 1000)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        global _lock_errors
+        starts = context.connection.info.get("_metrics_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        if "database is locked" in str(context.original_exception):
+            with _lock_errors_lock:
+                _lock_errors += 1
+
+def instrument_sessionmaker(factory):
+    @event.listens_for(factory, "before_commit")
+    def _before_commit(session):
+        session.info["_commit_start"] = time.perf_counter()
+
+    @event.listens_for(factory, "after_commit")
+    def _after_commit(session):
+        start = session.info.pop("_commit_start", None)
+        if start is not None:
+            commits.record((time.perf_counter() - start) * 1000)
+
+def snapshot() -> Dict[str, Any]:
+    return {
+        "writeStatements": write_statements.snapshot(),
+        "commits": commits.snapshot(),
+        "lockErrors": _lock_errors,
+        "pools": [e.pool.status() for e in list(_engines)],
+    }
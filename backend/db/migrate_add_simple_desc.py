@@ -1,38 +1,24 @@
-import sqlite3
-import os
+from backend.db.session import engine
+from backend.db.migration_utils import describe_target, column_names, add_column
 
 def migrate():
     print("Migrating database to add simple_description column...")
-    
-    # Path to the database file
-    db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'ai_insight.db')
-    db_path = os.path.abspath(db_path)
-    
-    if not os.path.exists(db_path):
-        print(f"Database file not found at {db_path}")
-        return
+    describe_target()
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    try:
-        # Check if column exists
-        cursor.execute("PRAGMA table_info(tables)")
-        columns = [info[1] for info in cursor.fetchall()]
-        
-        if 'simple_description' not in columns:
-            print("Adding simple_description column to tables table...")
-            cursor.execute("ALTER TABLE tables ADD COLUMN simple_description TEXT")
-            conn.commit()
-            print("Migration successful!")
-        else:
-            print("Column simple_description already exists.")
-            
-    except Exception as e:
-        print(f"Migration failed: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
+    with engine.connect() as conn:
+        try:
+            # Check if column exists
+            if 'simple_description' not in column_names(conn, "tables"):
+                print("Adding simple_description column to tables table...")
+                add_column(conn, "tables", "simple_description", "TEXT")
+                conn.commit()
+                print("Migration successful!")
+            else:
+                print("Column simple_description already exists.")
+
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            conn.rollback()
 
 if __name__ == "__main__":
     migrate()
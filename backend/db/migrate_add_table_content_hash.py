@@ -0,0 +1,54 @@
+from sqlalchemy import select, update
+from backend.db.session import engine, SessionLocal
+from backend.db.migration_utils import describe_target, column_names, add_column
+from backend.models.orm import TableEntry
+from backend.schemas.base import Column
+import backend.services.datasource_service as datasource_service
+
+BATCH_SIZE = 500
+
+def backfill_hashes() -> int:
+    """Hashes rows saved before content_hash existed, so they are not treated as changed on every read"""
+    db = SessionLocal()
+    filled = 0
+    try:
+        ids = list(db.execute(select(TableEntry.id).where(TableEntry.content_hash.is_(None)).order_by(TableEntry.id)).scalars())
+        for start in range(0, len(ids), BATCH_SIZE):
+            rows = db.execute(
+                select(TableEntry.id, TableEntry.name, TableEntry.description, TableEntry.columns, TableEntry.rows)
+                .where(TableEntry.id.in_(ids[start:start + BATCH_SIZE]))
+            ).all()
+            db.execute(update(TableEntry), [
+                {"id": table_id, "content_hash": datasource_service._table_content_hash(
+                    name, description, [Column(**c) for c in columns or []], table_rows)}
+                for table_id, name, description, columns, table_rows in rows
+            ])
+            filled += len(rows)
+        db.commit()
+    finally:
+        db.close()
+    return filled
+
+def migrate():
+    print("Migrating database to add content_hash column...")
+    describe_target()
+
+    with engine.connect() as conn:
+        try:
+            if 'content_hash' not in column_names(conn, "tables"):
+                print("Adding content_hash column to tables table...")
+                add_column(conn, "tables", "content_hash", "VARCHAR")
+                conn.commit()
+                print("Migration successful!")
+            else:
+                print("Column content_hash already exists.")
+
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            conn.rollback()
+            return
+
+    print(f"Backfilled content_hash for {backfill_hashes()} tables.")
+
+if __name__ == "__main__":
+    migrate()
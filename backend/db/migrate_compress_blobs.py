@@ -0,0 +1,90 @@
+"""
+Rewrites the large JSON/text payload columns into the compressed blob format
+used by backend.models.types (tables.columns/rows, datasets.previewData,
+widgets.content). Safe to re-run: already-compressed values are skipped.
+"""
+import os
+from sqlalchemy import text, inspect
+from backend.db.session import engine, is_sqlite_url, SQLALCHEMY_DATABASE_URL
+from backend.db.migration_utils import describe_target, backup, q
+from backend.models.types import CompressedJSON, CompressedText
+
+BATCH_SIZE = 500
+
+TARGETS = [
+    ("tables", "columns", CompressedJSON()),
+    ("tables", "rows", CompressedJSON()),
+    ("datasets", "previewData", CompressedJSON()),
+    ("widgets", "content", CompressedText()),
+]
+
+def _is_compressed(value) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:1]) == b"\x00"
+
+def _convert_column_type(conn, table: str, column: str):
+    """Server databases need the column itself to become binary first"""
+    if conn.dialect.name != "postgresql":
+        return
+    col_type = next(c["type"] for c in inspect(conn).get_columns(table) if c["name"] == column)
+    if col_type.__class__.__name__.upper() == "BYTEA":
+        return
+    print(f"Converting {table}.{column} to BYTEA...")
+    conn.execute(text(
+        f"ALTER TABLE {q(conn, table)} ALTER COLUMN {q(conn, column)} TYPE BYTEA "
+        f"USING convert_to({q(conn, column)}::text, 'UTF8')"
+    ))
+
+def _compress_column(conn, table: str, column: str, col_type) -> int:
+    rewritten = 0
+    last_id = None
+    while True:
+        where = f"{q(conn, column)} IS NOT NULL" + ("" if last_id is None else " AND id > :last_id")
+        rows = conn.execute(
+            text(f"SELECT id, {q(conn, column)} FROM {q(conn, table)} WHERE {where} ORDER BY id LIMIT {BATCH_SIZE}"),
+            {"last_id": last_id}
+        ).fetchall()
+        if not rows:
+            break
+        updates = [
+            {"id": row_id, "value": col_type.process_bind_param(col_type.process_result_value(raw, conn.dialect), conn.dialect)}
+            for row_id, raw in rows
+            if not _is_compressed(raw)
+        ]
+        if updates:
+            conn.execute(text(f"UPDATE {q(conn, table)} SET {q(conn, column)} = :value WHERE id = :id"), updates)
+            rewritten += len(updates)
+        last_id = rows[-1][0]
+    return rewritten
+
+def migrate():
+    describe_target()
+    sqlite = is_sqlite_url(SQLALCHEMY_DATABASE_URL)
+    size_before = os.path.getsize(engine.url.database) if sqlite else None
+    backup("backup_compress_blobs")
+
+    with engine.connect() as conn:
+        try:
+            existing = set(inspect(conn).get_table_names())
+            for table, column, col_type in TARGETS:
+                if table not in existing:
+                    continue
+                _convert_column_type(conn, table, column)
+                count = _compress_column(conn, table, column, col_type)
+                print(f"- {table}.{column}: {count} rows compressed")
+            conn.commit()
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            conn.rollback()
+            return
+
+    if sqlite:
+        # Reclaim the freed pages; VACUUM can't run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+            # In WAL mode the rewritten pages land in the -wal file until checkpointed
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        print(f"Database size: {size_before} -> {os.path.getsize(engine.url.database)} bytes")
+    print("Migration completed.")
+
+if __name__ == "__main__":
+    migrate()
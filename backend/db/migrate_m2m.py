@@ -20,7 +20,8 @@ def migrate_m2m():
         columns = [c['name'] for c in inspector.get_columns("widgets")]
         if 'dashboardId' in columns and 'layout' in columns:
             print("Migrating data from widgets table...")
-            widgets = db.execute(text("SELECT id, dashboardId, layout FROM widgets WHERE dashboardId IS NOT NULL")).fetchall()
+            col = engine.dialect.identifier_preparer.quote("dashboardId")
+            widgets = db.execute(text(f"SELECT id, {col}, layout FROM widgets WHERE {col} IS NOT NULL")).fetchall()
             
             count = 0
             for w in widgets:
@@ -48,9 +49,8 @@ def migrate_m2m():
             db.commit()
             print(f"Migrated {count} widget associations.")
             
-            # Note: We are NOT dropping columns dashboardId and layout from widgets table 
-            # because SQLite does not support DROP COLUMN easily and it's safer to keep data.
-            # The ORM will simply ignore them.
+            # Note: We are NOT dropping columns dashboardId and layout from widgets table here;
+            # cleanup_widget_table does that once the associations have been verified.
             
         else:
             print("Widgets table does not have dashboardId/layout columns. Skipping data migration.")
@@ -1,3 +1,5 @@
+# One-off migration of the legacy SQLite layout. Databases created on another
+# backend via METADATA_DATABASE_URL start from the current schema and never need it.
 import sqlite3
 import json
 import os
@@ -23,7 +25,8 @@ def migrate():
         # Check if already migrated
         cursor.execute("PRAGMA table_info(widgets)")
         cols = [c['name'] for c in cursor.fetchall()]
-        if 'componentType' in cols:
+        # componentType was later renamed to type (rename_widget_type_column)
+        if 'componentType' in cols or 'type' in cols:
             print("Already migrated.")
             return
 
@@ -0,0 +1,46 @@
+"""
+Helpers shared by the ad-hoc migration scripts so they run against whichever
+metadata database METADATA_DATABASE_URL points at (SQLite or Postgres).
+"""
+from sqlalchemy import inspect, text
+from backend.db.session import engine, SQLALCHEMY_DATABASE_URL, is_sqlite_url
+import os
+import shutil
+
+def describe_target():
+    print(f"Using database: {engine.url.render_as_string(hide_password=True)}")
+
+def backup(suffix: str):
+    """Copies the SQLite file next to itself; server databases should be backed up with their own tools"""
+    if not is_sqlite_url(SQLALCHEMY_DATABASE_URL):
+        print("Non-SQLite metadata database: take a backup (e.g. pg_dump) before running this migration.")
+        return
+    path = engine.url.database
+    if path and os.path.exists(path):
+        backup_path = f"{path}.{suffix}"
+        print(f"Backing up database to {backup_path}...")
+        shutil.copy2(path, backup_path)
+
+def table_names(conn) -> list:
+    return inspect(conn).get_table_names()
+
+def has_table(conn, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+def column_names(conn, table: str) -> list:
+    return [c["name"] for c in inspect(conn).get_columns(table)]
+
+def q(conn, name: str) -> str:
+    """Quotes an identifier for the connected dialect (needed for camelCase columns on Postgres)"""
+    return conn.dialect.identifier_preparer.quote(name)
+
+def add_column(conn, table: str, column: str, ddl_type: str):
+    conn.execute(text(f"ALTER TABLE {q(conn, table)} ADD COLUMN {q(conn, column)} {ddl_type}"))
+
+def drop_columns(conn, table: str, columns: list):
+    """ALTER TABLE ... DROP COLUMN works on Postgres and SQLite >= 3.35"""
+    existing = column_names(conn, table)
+    for col in columns:
+        if col in existing:
+            print(f"Dropping column {table}.{col}...")
+            conn.execute(text(f"ALTER TABLE {q(conn, table)} DROP COLUMN {q(conn, col)}"))
@@ -1,7 +1,7 @@
-
 import logging
 from sqlalchemy import text
 from backend.db.session import engine
+from backend.db.migration_utils import column_names, q
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -9,21 +9,25 @@ logger = logging.getLogger(__name__)
 def migrate_column_name():
     with engine.connect() as conn:
         logger.info("Starting migration of widget column 'componentType' to 'type'...")
-        
+
+        if "componentType" not in column_names(conn, "widgets"):
+            logger.info("Column 'componentType' not present; nothing to rename.")
+            return
+
         try:
-            # Try standard RENAME COLUMN (SQLite 3.25+)
-            conn.execute(text("ALTER TABLE widgets RENAME COLUMN componentType TO type"))
+            # Standard RENAME COLUMN (Postgres, SQLite 3.25+)
+            conn.execute(text(f"ALTER TABLE widgets RENAME COLUMN {q(conn, 'componentType')} TO {q(conn, 'type')}"))
             logger.info("Successfully renamed column 'componentType' to 'type'.")
         except Exception as e:
             logger.warning(f"Direct rename failed (likely older SQLite): {e}")
             logger.info("Attempting fallback: Add 'type', copy data, (ignoring drop for safety)...")
-            
+            conn.rollback()
+
             try:
                 # Fallback: Add column, copy, null old
-                conn.execute(text("ALTER TABLE widgets ADD COLUMN type VARCHAR"))
-                conn.execute(text("UPDATE widgets SET type = componentType"))
-                # SQLite doesn't easily support dropping columns in older versions without table recreation.
-                # We will leave componentType there but ignore it in ORM.
+                conn.execute(text(f"ALTER TABLE widgets ADD COLUMN {q(conn, 'type')} VARCHAR"))
+                conn.execute(text(f"UPDATE widgets SET {q(conn, 'type')} = {q(conn, 'componentType')}"))
+                # We leave componentType there but ignore it in ORM.
                 logger.info("Fallback migration completed: 'type' column added and populated.")
             except Exception as e2:
                 logger.error(f"Fallback migration failed: {e2}")
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -15,10 +16,22 @@ from .apis import (
     ai_router,
     saved_component_router,
     template_router,
-    widget_router
+    widget_router,
+    metrics_router,
+    search_router
 )
+from .services import ai_service, annotation_job_service, llm_http
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    annotation_job_service.shutdown()
+    # Release pooled provider connections and the LLM cache file
+    llm_http.close_all()
+    await llm_http.aclose_all()
+    ai_service.llm_cache.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow CORS
 app.add_middleware(
@@ -39,6 +52,8 @@ app.include_router(widget_router)           # New consolidated router
 app.include_router(ai_router)
 app.include_router(saved_component_router)
 app.include_router(template_router, prefix="/api/templates", tags=["templates"])
+app.include_router(metrics_router)
+app.include_router(search_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -4,5 +4,8 @@ from .orm import (
     Dataset,
     Dashboard,
     Widget,
-    DashboardWidget
+    DashboardWidget,
+    DashboardDocument,
+    ResourceVersion,
+    ColumnAnnotation
 )
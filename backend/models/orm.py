@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, JSON, BigInteger, Boolean, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, JSON, BigInteger, Boolean, ForeignKey, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from backend.db.session import Base
+from backend.models.types import CompressedJSON, CompressedText
+
+# Client-generated ids (Date.now()) exceed 32-bit INTEGER on Postgres. SQLite keeps
+# INTEGER so primary keys remain ROWID aliases and still autoincrement.
+IdType = BigInteger().with_variant(Integer, "sqlite")
 
 class DataSource(Base):
     __tablename__ = "data_sources"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(IdType, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String, nullable=True)
     config = Column(JSON)
@@ -13,31 +18,33 @@ class DataSource(Base):
 
 class TableEntry(Base):
     __tablename__ = "tables"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(IdType, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String, nullable=True)
     simple_description = Column(String, nullable=True) # New simplified annotation field
-    columns = Column(JSON)  # List[Column] as JSON
-    rows = Column(JSON)     # Sample rows as JSON
-    dataSourceId = Column(Integer, ForeignKey("data_sources.id"), index=True)
+    # Large payloads: compressed, and only loaded on access (undefer_group("payload") for lists)
+    columns = deferred(Column(CompressedJSON), group="payload")  # List[Column] as JSON
+    rows = deferred(Column(CompressedJSON), group="payload")     # Sample rows as JSON
+    content_hash = Column(String, nullable=True) # Hash of name/description/columns/rows; unchanged saves are skipped
+    dataSourceId = Column(IdType, ForeignKey("data_sources.id"), index=True)
     dataSource = relationship("DataSource", back_populates="tables")
 
 class Dataset(Base):
     __tablename__ = "datasets"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(IdType, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String, nullable=True)
-    dataSourceId = Column(Integer)
+    dataSourceId = Column(IdType)
     sql = Column(String)
-    previewData = Column(JSON)
+    previewData = deferred(Column(CompressedJSON))
     createdAt = Column(BigInteger)
 
     widgets = relationship("Widget", primaryjoin="foreign(Widget.datasetId) == Dataset.id", back_populates="dataset")
 
 class DashboardWidget(Base):
     __tablename__ = "dashboard_widgets"
-    dashboard_id = Column(Integer, ForeignKey("dashboards.id"), primary_key=True)
-    widget_id = Column(Integer, ForeignKey("widgets.id"), primary_key=True)
+    dashboard_id = Column(IdType, ForeignKey("dashboards.id"), primary_key=True)
+    widget_id = Column(IdType, ForeignKey("widgets.id"), primary_key=True)
     layout = Column(JSON)
     
     # Relationships
@@ -46,10 +53,11 @@ class DashboardWidget(Base):
 
 class Dashboard(Base):
     __tablename__ = "dashboards"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(IdType, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String, nullable=True)
     widget_associations = relationship("DashboardWidget", back_populates="dashboard", cascade="all, delete-orphan")
+    document = relationship("DashboardDocument", uselist=False, cascade="all, delete-orphan")
     
     createdAt = Column(BigInteger)
     updatedAt = Column(BigInteger, nullable=True)
@@ -59,17 +67,41 @@ class Dashboard(Base):
         # Helper to match previous interface if needed, or used by serializer
         return [assoc.widget for assoc in self.widget_associations]
 
+class DashboardDocument(Base):
+    """Pre-serialized dashboard response, rewritten whenever the dashboard or one of its widgets changes"""
+    __tablename__ = "dashboard_documents"
+    dashboard_id = Column(IdType, ForeignKey("dashboards.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    body = Column(LargeBinary) # UTF-8 JSON, same shape as schemas.Dashboard
+    updatedAt = Column(BigInteger)
+
+class ColumnAnnotation(Base):
+    """Alias/description seen on saved columns, by normalized column name and type; count is how many saves carried it"""
+    __tablename__ = "column_annotations"
+    name_key = Column(String, primary_key=True)
+    type_key = Column(String, primary_key=True)
+    alias = Column(String, primary_key=True, default="")
+    description = Column(String, primary_key=True, default="")
+    count = Column(BigInteger, nullable=False, default=0)
+
+class ResourceVersion(Base):
+    """Monotonic change counter per resource; resource_id '*' is the collection counter used for list ETags"""
+    __tablename__ = "resource_versions"
+    kind = Column(String, primary_key=True) # 'dashboard', 'dataset', 'datasource', 'widget', 'template'
+    resource_id = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
 class Widget(Base):
     __tablename__ = "widgets"
-    id = Column(Integer, primary_key=True, index=True)
-    datasetId = Column(Integer, nullable=True) # Renamed from tableId
+    id = Column(IdType, primary_key=True, index=True)
+    datasetId = Column(IdType, nullable=True) # Renamed from tableId
     name = Column(String, nullable=True) # For Saved Components
     description = Column(String, nullable=True) # For Saved Components
     config = Column(JSON)
     
     # Unified Component Fields
     type = Column(String) # 'chart' or 'web'
-    content = Column(String, nullable=True) # Web Component Code or other large text content
+    content = deferred(Column(CompressedText, nullable=True)) # Web Component Code or other large text content
     
     createdAt = Column(BigInteger) # Renamed from timestamp
     updatedAt = Column(BigInteger, nullable=True)
@@ -79,7 +111,7 @@ class Widget(Base):
 
 class Template(Base):
     __tablename__ = "templates"
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(IdType, primary_key=True, index=True, autoincrement=True)
     name = Column(String, index=True)
     description = Column(String, nullable=True)
     
@@ -0,0 +1,77 @@
+from sqlalchemy.types import TypeDecorator, LargeBinary
+import json
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+# Stored values start with a NUL-prefixed tag, which plain JSON/text never does,
+# so rows written before the migration (raw JSON text) are still readable.
+_ZSTD = b"\x00zs"
+_ZLIB = b"\x00zl"
+_RAW = b"\x00rw"
+
+# zlib unless zstd is chosen explicitly: with a shared metadata DB every host
+# must be able to read what any other host wrote, and zstandard is optional
+COMPRESSION = os.getenv("METADATA_BLOB_COMPRESSION", "zlib").lower()
+COMPRESSION_LEVEL = int(os.getenv("METADATA_BLOB_COMPRESSION_LEVEL", "6"))
+# Tiny values don't shrink; store them with the raw tag
+MIN_COMPRESS_BYTES = int(os.getenv("METADATA_BLOB_MIN_COMPRESS_BYTES", "256"))
+
+def compress_bytes(data: bytes) -> bytes:
+    if len(data) >= MIN_COMPRESS_BYTES:
+        if COMPRESSION == "zstd" and zstandard is not None:
+            return _ZSTD + zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(data)
+        if COMPRESSION in ("zstd", "zlib"):
+            return _ZLIB + zlib.compress(data, COMPRESSION_LEVEL)
+    return _RAW + data
+
+def decompress_bytes(value) -> bytes:
+    if isinstance(value, str):
+        return value.encode("utf-8")  # legacy plain column
+    value = bytes(value)
+    tag, body = value[:3], value[3:]
+    if tag == _ZLIB:
+        return zlib.decompress(body)
+    if tag == _ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed metadata")
+        return zstandard.ZstdDecompressor().decompress(body)
+    if tag == _RAW:
+        return body
+    return value
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as a compressed blob; reads legacy uncompressed JSON text transparently"""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_bytes(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, (dict, list)):
+            return value  # legacy JSON column already decoded by the driver
+        return json.loads(decompress_bytes(value))
+
+class CompressedText(TypeDecorator):
+    """Text stored as a compressed blob; reads legacy uncompressed text transparently"""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_bytes(value.encode("utf-8"))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_bytes(value).decode("utf-8")
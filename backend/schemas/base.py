@@ -16,6 +16,17 @@ class TableData(BaseModel):
     simple_description: Optional[str] = None
     dataSourceId: Optional[int] = None
 
+class TableEntryPatch(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    columns: Optional[List[Column]] = None
+    rows: Optional[List[Dict[str, Any]]] = None
+
+class ColumnPatch(BaseModel):
+    alias: Optional[str] = None
+    description: Optional[str] = None
+    type: Optional[str] = None
+
 class DatabaseConfig(BaseModel):
     type: str
     name: str
@@ -51,6 +62,25 @@ class DataSource(DataSourceBase):
     class Config:
         from_attributes = True
 
+class TableSummary(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+
+class DataSourceSummary(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    type: Optional[str] = None
+    tableCount: int = 0
+    tables: Optional[List[TableSummary]] = None # Only with includeTables=true
+
+class DataSourceSummaryPage(BaseModel):
+    items: List[DataSourceSummary]
+    total: int
+    skip: int
+    limit: int
+
 class TemplateBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -101,6 +131,30 @@ class ExecuteSqlRequest(BaseModel):
     database: Optional[str] = None
     sql: str
     limit: Optional[int] = 100
+    params: Optional[Dict[str, Any]] = None # Extra bind parameters referenced by the SQL
+
+class TimeBucketMetric(BaseModel):
+    column: str
+    agg: Optional[str] = "sum" # sum / avg / min / max / count
+
+class TimeBucketOptions(BaseModel):
+    column: str
+    unit: str # minute / hour / day / week / month
+    timezone: Optional[str] = None # Bucket boundaries in this zone, e.g. 'Asia/Shanghai'
+    sourceTimezone: Optional[str] = "UTC" # Zone of the stored (naive) timestamps
+    metrics: List[TimeBucketMetric] = []
+    groupBy: Optional[List[str]] = None
+
+class DownsampleOptions(BaseModel):
+    xColumn: str
+    yColumns: List[str]
+    method: Optional[str] = "lttb" # lttb / minmax
+    targetPoints: Optional[int] = None # Defaults to a value derived from colSpan
+    colSpan: Optional[int] = None # WidgetLayout.colSpan of the rendering widget
+
+class DatasetExecuteOptions(BaseModel):
+    timeBucket: Optional[TimeBucketOptions] = None
+    downsample: Optional[DownsampleOptions] = None
 
 class DatasetBase(BaseModel):
     id: int
@@ -172,6 +226,34 @@ class Dashboard(DashboardBase):
     class Config:
         from_attributes = True
 
+class DashboardSummary(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    widgetCount: int = 0
+    createdAt: Optional[int] = None
+    updatedAt: Optional[int] = None
+
+class DashboardSummaryPage(BaseModel):
+    items: List[DashboardSummary]
+    total: int
+    skip: int
+    limit: int
+
+class SearchHit(BaseModel):
+    kind: str # 'table', 'dataset' or 'widget'
+    id: int
+    datasourceId: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    score: float
+
+class SearchResultPage(BaseModel):
+    items: List[SearchHit]
+    total: int
+    skip: int
+    limit: int
+
 class WebComponentTemplateBase(BaseModel):
     id: int
     name: str
@@ -1,6 +1,19 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from starlette.concurrency import run_in_threadpool
+from backend.db.session import DATA_DIR
+from backend.utils.cache import SQLiteCache
+from backend.utils.circuit_breaker import CircuitBreaker
+from backend.utils.histogram import LatencyHistogram
+from backend.utils.partial_json import extract_string_field
+from backend.utils.token_count import count_message_tokens, count_tokens
+import asyncio
+import hashlib
+import json
 import os
 import logging
+import sqlite3
+import threading
 import time
 
 logger = logging.getLogger("llm_client")
@@ -12,31 +25,463 @@ if not logger.handlers:
     logger.addHandler(_h)
 
 class LLMStrategy:
+    name = ""
+
+    def model(self) -> str:
+        return ""
+
     def call(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> Dict[str, Any]:
         raise NotImplementedError
 
+    async def stream(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> AsyncIterator[str]:
+        """Raw completion text as it arrives; providers without streaming yield it all at once"""
+        result = await run_in_threadpool(self.call, messages, schema_hint)
+        if isinstance(result, dict) and "error" in result:
+            raise RuntimeError(result["error"])
+        yield json.dumps(result, ensure_ascii=False)
+
 class SiliconFlowStrategy(LLMStrategy):
+    name = "siliconflow"
+
+    def model(self) -> str:
+        from backend.services.siliconflow_service import DEFAULT_MODEL
+        return DEFAULT_MODEL
+
     def call(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> Dict[str, Any]:
         from backend.services.siliconflow_service import call_llm as sf_call
         return sf_call(messages, schema_hint)
 
+    async def stream(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> AsyncIterator[str]:
+        from backend.services.siliconflow_service import stream_llm
+        async for delta in stream_llm(messages, schema_hint):
+            yield delta
+
 class ModelScopeStrategy(LLMStrategy):
+    name = "modelscope"
+
+    def model(self) -> str:
+        from backend.services.modelscope_service import DEFAULT_MODEL
+        return DEFAULT_MODEL
+
     def call(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> Dict[str, Any]:
         from backend.services.modelscope_service import call_llm as ms_call
         return ms_call(messages, schema_hint)
 
+    async def stream(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> AsyncIterator[str]:
+        from backend.services.modelscope_service import stream_llm
+        async for delta in stream_llm(messages, schema_hint):
+            yield delta
+
+class MockStrategy(LLMStrategy):
+    name = "mock"
+
+    def model(self) -> str:
+        from backend.services.mock_llm_service import DEFAULT_MODEL
+        return DEFAULT_MODEL
+
+    def call(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> Dict[str, Any]:
+        from backend.services.mock_llm_service import call_llm as mock_call
+        return mock_call(messages, schema_hint)
+
+    async def stream(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> AsyncIterator[str]:
+        from backend.services.mock_llm_service import stream_llm
+        async for delta in stream_llm(messages, schema_hint):
+            yield delta
+
+# Hedged routing across providers (AI_PROVIDER=hedged)
+HEDGE_PROVIDERS = [p.strip() for p in os.getenv("AI_HEDGE_PROVIDERS", "siliconflow,modelscope").split(",") if p.strip()]
+HEDGE_QUANTILE = float(os.getenv("AI_HEDGE_QUANTILE", "0.9"))
+HEDGE_MIN_SAMPLES = int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("AI_HEDGE_DEFAULT_DELAY", "15"))
+HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "0.5"))
+# Threads per provider. A hedge that loses keeps its thread until the HTTP call
+# ends (up to the read timeout), so size this for the concurrent callers
+# (annotation job workers + interactive requests), not just for the winners
+HEDGE_WORKERS_PER_PROVIDER = int(os.getenv("AI_HEDGE_WORKERS_PER_PROVIDER", "32"))
+BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "3"))
+BREAKER_RESET = float(os.getenv("AI_BREAKER_RESET", "30"))
+
+class ProviderHealth:
+    """Latency histograms (full call and first streamed chunk) and circuit breaker of one provider"""
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.first_chunk = LatencyHistogram()
+        self.breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+
+    @staticmethod
+    def _delay(histogram: LatencyHistogram) -> float:
+        if histogram.observations < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, histogram.quantile(HEDGE_QUANTILE) / 1000)
+
+    def hedge_delay(self) -> float:
+        return self._delay(self.latency)
+
+    def stream_hedge_delay(self) -> float:
+        return self._delay(self.first_chunk)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency.snapshot(),
+            "firstChunk": self.first_chunk.snapshot(),
+            "breaker": self.breaker.state,
+            "consecutiveFailures": self.breaker.failures,
+        }
+
+_provider_health: Dict[str, ProviderHealth] = {}
+
+class _ProviderPool:
+    """A provider's own executor, so slow losers of one provider never queue calls to another"""
+    def __init__(self, name: str):
+        self.workers = HEDGE_WORKERS_PER_PROVIDER
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"llm-{name}")
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def saturated(self) -> bool:
+        return self.in_flight >= self.workers
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self.in_flight += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+
+def provider_health(name: str) -> ProviderHealth:
+    return _provider_health.setdefault(name, ProviderHealth())
+
+def provider_metrics() -> Dict[str, Any]:
+    return {name: health.snapshot() for name, health in _provider_health.items()}
+
+class HedgedStrategy(LLMStrategy):
+    """
+    Sends the request to the first healthy provider of `providers`; if it hasn't
+    answered within that provider's p90 latency, the next one is asked as well and
+    the first success wins. Errors fail over to the next provider immediately, and
+    providers whose circuit breaker is open are skipped.
+    """
+    name = "hedged"
+
+    def __init__(self, providers: List[str]):
+        self.providers = providers
+        self._pools: Dict[str, _ProviderPool] = {}
+        self._pools_lock = threading.Lock()
+
+    def _pool(self, name: str) -> _ProviderPool:
+        with self._pools_lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = self._pools[name] = _ProviderPool(name)
+            return pool
+
+    def model(self) -> str:
+        return ",".join(f"{name}:{STRATEGY_REGISTRY[name].model()}" for name in self.providers if name in STRATEGY_REGISTRY)
+
+    def _candidates(self) -> List[str]:
+        return [name for name in self.providers if name in STRATEGY_REGISTRY and name != self.name]
+
+    @staticmethod
+    def _next_provider(queue: List[str]) -> Optional[Tuple[str, LLMStrategy, ProviderHealth]]:
+        """Pops providers until one whose circuit breaker lets a request through"""
+        while queue:
+            name = queue.pop(0)
+            health = provider_health(name)
+            if health.breaker.allow():
+                return name, STRATEGY_REGISTRY[name], health
+            logger.info(f"LLM_BREAKER_OPEN provider={name}")
+        return None
+
+    def _first_provider(self, queue: List[str]) -> Optional[Tuple[str, LLMStrategy, ProviderHealth]]:
+        names = list(queue)
+        # A provider whose threads are all busy goes to the back instead of queueing the first attempt
+        queue.sort(key=lambda name: self._pool(name).saturated())
+        picked = self._next_provider(queue)
+        if picked is None and names:
+            # With every breaker open, trying anyway beats failing without a request
+            picked = names[0], STRATEGY_REGISTRY[names[0]], provider_health(names[0])
+        return picked
+
+    def _timed_call(self, name: str, strategy: LLMStrategy, health: ProviderHealth,
+                    messages: List[Dict[str, Any]], schema_hint: Optional[str]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            result = strategy.call(messages, schema_hint)
+        except Exception as e:
+            result = {"error": str(e)}
+        # Failed and abandoned (hedge-losing) calls count too: a p90 of successes
+        # alone misses the timeouts and would hedge too early
+        health.latency.record((time.perf_counter() - start) * 1000)
+        if isinstance(result, dict) and "error" in result:
+            health.breaker.record_failure()
+        else:
+            health.breaker.record_success()
+        return result
+
+    def call(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> Dict[str, Any]:
+        queue = self._candidates()
+        pending: Dict[Any, str] = {}
+        errors: List[str] = []
+        health: Optional[ProviderHealth] = None
+
+        def launch(picked: Optional[Tuple[str, LLMStrategy, ProviderHealth]]) -> Optional[ProviderHealth]:
+            if picked is None:
+                return health
+            name, strategy, h = picked
+            pending[self._pool(name).submit(self._timed_call, name, strategy, h, messages, schema_hint)] = name
+            return h
+
+        health = launch(self._first_provider(queue))
+        hedging = True
+        while pending:
+            done, _ = wait(pending, timeout=health.hedge_delay() if queue and hedging else None, return_when=FIRST_COMPLETED)
+            if not done:
+                if queue and self._pool(queue[0]).saturated():
+                    # Its threads are taken (e.g. by earlier losers): a hedge would only
+                    # queue, so wait for what is running and keep the provider for failover
+                    logger.info(f"LLM_HEDGE_SKIPPED schema={schema_hint} saturated={queue[0]}")
+                    hedging = False
+                    continue
+                logger.info(f"LLM_HEDGE schema={schema_hint} slow={list(pending.values())}")
+                health = launch(self._next_provider(queue))
+                continue
+            for future in done:
+                name = pending.pop(future)
+                result = future.result()
+                if not (isinstance(result, dict) and "error" in result):
+                    # Blocking HTTP calls can't be interrupted: losers finish in the background and only feed the histograms
+                    for loser in pending:
+                        loser.cancel()
+                    return result
+                errors.append(f"{name}: {result['error']}")
+                logger.warning(f"LLM_FAILOVER provider={name} schema={schema_hint} err={result['error']}")
+            if not pending:
+                health = launch(self._next_provider(queue))
+        return {"error": "; ".join(errors) or "No LLM provider configured"}
+
+    async def stream(self, messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> AsyncIterator[str]:
+        """Races providers on the first chunk, then streams from the winner; losers are cancelled"""
+        queue = self._candidates()
+        racing: Dict[asyncio.Future, Tuple[str, Any, float, ProviderHealth]] = {}
+        errors: List[str] = []
+        winner = None
+        health: Optional[ProviderHealth] = None
+
+        def launch(picked: Optional[Tuple[str, LLMStrategy, ProviderHealth]]) -> Optional[ProviderHealth]:
+            if picked is None:
+                return health
+            name, strategy, h = picked
+            chunks = strategy.stream(messages, schema_hint)
+            racing[asyncio.ensure_future(chunks.__anext__())] = (name, chunks, time.perf_counter(), h)
+            return h
+
+        async def discard(task: asyncio.Future, chunks: Any):
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+            await chunks.aclose()
+
+        health = launch(self._first_provider(queue))
+        try:
+            while racing and winner is None:
+                done, _ = await asyncio.wait(racing, timeout=health.stream_hedge_delay() if queue else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"LLM_HEDGE_STREAM schema={schema_hint}")
+                    health = launch(self._next_provider(queue))
+                    continue
+                for task in done:
+                    name, chunks, start, h = racing.pop(task)
+                    try:
+                        first = task.result()
+                    except StopAsyncIteration:
+                        error = "empty response"
+                    except Exception as e:
+                        error = str(e)
+                    else:
+                        h.first_chunk.record((time.perf_counter() - start) * 1000)
+                        if winner is None:
+                            winner = (name, chunks, start, h, first)
+                        else:
+                            await chunks.aclose()
+                        continue
+                    h.first_chunk.record((time.perf_counter() - start) * 1000)
+                    h.breaker.record_failure()
+                    errors.append(f"{name}: {error}")
+                    logger.warning(f"LLM_FAILOVER provider={name} schema={schema_hint} err={error}")
+                if winner is None and not racing:
+                    health = launch(self._next_provider(queue))
+        finally:
+            for task, (_, chunks, start, h) in list(racing.items()):
+                # Cancelled losers had no first chunk yet: their wait so far is a lower bound
+                h.first_chunk.record((time.perf_counter() - start) * 1000)
+                await discard(task, chunks)
+        if winner is None:
+            raise RuntimeError("; ".join(errors) or "No LLM provider configured")
+
+        name, chunks, start, h, first = winner
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        except Exception:
+            h.breaker.record_failure()
+            raise
+        finally:
+            await chunks.aclose()
+        h.latency.record((time.perf_counter() - start) * 1000)
+        h.breaker.record_success()
+
 STRATEGY_REGISTRY: Dict[str, LLMStrategy] = {
     "siliconflow": SiliconFlowStrategy(),
     "modelscope": ModelScopeStrategy(),
+    "mock": MockStrategy(),
+    "hedged": HedgedStrategy(HEDGE_PROVIDERS),
 }
 
 def get_strategy() -> LLMStrategy:
     provider = os.getenv("AI_PROVIDER", "siliconflow").lower()
     return STRATEGY_REGISTRY.get(provider, STRATEGY_REGISTRY["siliconflow"])
 
-def _call_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None, provider_override: Optional[str] = None) -> Dict[str, Any]:
-    strategy = STRATEGY_REGISTRY.get(provider_override, get_strategy()) if provider_override else get_strategy()
-    return strategy.call(messages, schema_hint)
+# Responses for these schema hints depend only on the prompt (schema, annotations,
+# question), so repeated calls are answered from an on-disk cache. Creative outputs
+# (charts, web components, insights) are regenerated on every call.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_SCHEMAS = {
+    s.strip() for s in os.getenv("LLM_CACHE_SCHEMAS", "table_selection,dataset_sql,table_annotations,table_annotations_batch").split(",") if s.strip()
+}
+llm_cache = SQLiteCache(
+    os.getenv("LLM_CACHE_PATH", os.path.join(DATA_DIR, "llm_cache.db")),
+    maxsize=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+    ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+)
+
+def _normalize_content(content: Any) -> Any:
+    # Whitespace differences (indentation, trailing newlines) shouldn't miss the cache
+    if isinstance(content, str):
+        return " ".join(content.split())
+    if isinstance(content, list):
+        return [
+            {**part, "text": _normalize_content(part["text"])} if isinstance(part, dict) and "text" in part else part
+            for part in content
+        ]
+    return content
+
+def _cache_key(strategy: LLMStrategy, messages: List[Dict[str, Any]], schema_hint: Optional[str]) -> str:
+    normalized = [{"role": m.get("role"), "content": _normalize_content(m.get("content"))} for m in messages]
+    raw = json.dumps(
+        {"provider": strategy.name, "model": strategy.model(), "schema": schema_hint, "messages": normalized},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _resolve_strategy(provider_override: Optional[str] = None) -> LLMStrategy:
+    return STRATEGY_REGISTRY.get(provider_override, get_strategy()) if provider_override else get_strategy()
+
+def _cache_lookup(strategy: LLMStrategy, messages: List[Dict[str, Any]], schema_hint: Optional[str], use_cache: bool) -> Tuple[Optional[str], Any]:
+    """(cache key or None when the call isn't cacheable, cached response or None)"""
+    if not (use_cache and LLM_CACHE_ENABLED and schema_hint in LLM_CACHE_SCHEMAS):
+        return None, None
+    key = _cache_key(strategy, messages, schema_hint)
+    try:
+        cached = llm_cache.get(key)
+    except sqlite3.Error as e:
+        logger.warning(f"LLM_CACHE_ERROR err={e}")
+        cached = None
+    if cached is not None:
+        logger.info(f"LLM_CACHE_HIT provider={strategy.name} schema={schema_hint}")
+    return key, cached
+
+def _cache_store(key: Optional[str], result: Any):
+    if key is None or not isinstance(result, dict) or "error" in result:
+        return
+    try:
+        llm_cache.set(key, result)
+    except sqlite3.Error as e:
+        logger.warning(f"LLM_CACHE_ERROR err={e}")
+
+def _log_tokens(strategy: LLMStrategy, schema_hint: Optional[str], messages: List[Dict[str, Any]], completion: Any):
+    model = strategy.model()
+    if not isinstance(completion, str):
+        completion = json.dumps(completion, ensure_ascii=False, default=str)
+    logger.info(
+        f"LLM_TOKENS provider={strategy.name} model={model} schema={schema_hint or ''} "
+        f"prompt={count_message_tokens(messages, model)} completion={count_tokens(completion, model)}"
+    )
+
+def _call_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None, provider_override: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
+    strategy = _resolve_strategy(provider_override)
+    key, cached = _cache_lookup(strategy, messages, schema_hint, use_cache)
+    if cached is not None:
+        return cached
+    result = strategy.call(messages, schema_hint)
+    if not (isinstance(result, dict) and "error" in result):
+        _log_tokens(strategy, schema_hint, messages, result)
+    _cache_store(key, result)
+    return result
+
+def _parse_json_content(content: str) -> Optional[Dict[str, Any]]:
+    """Parses a completion that may be wrapped in a markdown code fence"""
+    cleaned = content.strip()
+    if cleaned.startswith("```"):
+        first_newline = cleaned.find("\n")
+        cleaned = cleaned[first_newline + 1:] if first_newline != -1 else cleaned[3:]
+        if cleaned.endswith("```"):
+            cleaned = cleaned[:-3]
+    try:
+        parsed = json.loads(cleaned.strip())
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+async def _stream_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str], outcome: Dict[str, Any],
+                      provider_override: Optional[str] = None, use_cache: bool = True, fields: Tuple[str, ...] = ()) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming counterpart of _call_llm. Yields ("delta", {"text"}) per chunk and,
+    for each of `fields`, (field, {field: value so far, "complete"}) whenever that
+    string field of the JSON answer grows, so e.g. the SQL shows before the
+    explanation is written. The parsed answer (or the error) is put in `outcome`.
+    """
+    strategy = _resolve_strategy(provider_override)
+    key, cached = await run_in_threadpool(_cache_lookup, strategy, messages, schema_hint, use_cache)
+    if cached is not None:
+        for field in fields:
+            if isinstance(cached.get(field), str):
+                yield field, {field: cached[field], "complete": True}
+        outcome["result"] = cached
+        return
+
+    buffer = ""
+    sent: Dict[str, Tuple[str, bool]] = {}
+    try:
+        async for delta in strategy.stream(messages, schema_hint):
+            buffer += delta
+            yield "delta", {"text": delta}
+            for field in fields:
+                if sent.get(field, ("", False))[1]:
+                    continue
+                value, complete = extract_string_field(buffer, field)
+                if value is not None and sent.get(field) != (value, complete):
+                    sent[field] = (value, complete)
+                    yield field, {field: value, "complete": complete}
+    except Exception as e:
+        logger.error(f"LLM_STREAM_ERROR provider={strategy.name} err={str(e)}")
+        outcome["error"] = str(e)
+        return
+
+    _log_tokens(strategy, schema_hint, messages, buffer)
+    result = _parse_json_content(buffer)
+    if result is None:
+        outcome["error"] = "Model response is not valid JSON"
+        return
+    await run_in_threadpool(_cache_store, key, result)
+    outcome["result"] = result
 
 def _get_provider_override(kind: str) -> Optional[str]:
     if kind == "chart":
@@ -46,9 +491,12 @@ def _get_provider_override(kind: str) -> Optional[str]:
     return None
 
 from sqlalchemy.orm import Session
-from backend.models.orm import DataSource, TableEntry
+from backend.models.orm import DataSource
+import backend.services.table_retrieval_service as table_retrieval_service
+import backend.services.prompt_context_service as prompt_context_service
+import backend.services.column_dictionary_service as column_dictionary_service
 
-def select_relevant_tables(user_query: str, all_tables_summary: List[Dict[str, Any]]) -> List[int]:
+def select_relevant_tables(user_query: str, all_tables_summary: List[Dict[str, Any]], use_cache: bool = True) -> List[int]:
     """
     Selects relevant table IDs based on user query.
     """
@@ -68,10 +516,11 @@ def select_relevant_tables(user_query: str, all_tables_summary: List[Dict[str, A
     
     user = {
         "role": "user",
-        "content": f"User Query: \"{user_query}\"\n\nAvailable Tables:\n{tables_context}\n\nPlease select the table IDs that are necessary to answer the query. Return JSON with 'relevant_table_ids'."
+        # Tables before the question, so repeated questions share the prompt prefix (provider-side prompt caching)
+        "content": f"Available Tables:\n{tables_context}\n\nUser Query: \"{user_query}\"\n\nPlease select the table IDs that are necessary to answer the query. Return JSON with 'relevant_table_ids'."
     }
     
-    result = _call_llm([system, user], schema_hint="table_selection")
+    result = _call_llm([system, user], schema_hint="table_selection", use_cache=use_cache)
     
     if "error" in result:
         logger.error(f"Table selection failed: {result['error']}")
@@ -82,23 +531,21 @@ def select_relevant_tables(user_query: str, all_tables_summary: List[Dict[str, A
         return [int(i) for i in ids if isinstance(i, (int, str)) and str(i).isdigit()]
     return []
 
-def auto_select_tables(db: Session, data_source_id: int, user_query: str) -> Dict[str, Any]:
+def auto_select_tables(db: Session, data_source_id: int, user_query: str, use_cache: bool = True) -> Dict[str, Any]:
     """
     Selects relevant tables based on user query.
     Returns a dict with 'selectedTableIds' and possibly 'reasoning' or just the ids.
     """
-    all_tables = db.query(TableEntry).filter(TableEntry.dataSourceId == data_source_id).all()
-    annotated_tables = [t for t in all_tables if t.simple_description]
+    annotated_tables = prompt_context_service.annotated_tables(db, data_source_id)
     
     if not annotated_tables:
         raise ValueError("当前数据源没有已标注的表，无法进行自动选择。请先对表进行标注（添加简要描述）。")
 
-    table_summaries = [
-        {"id": t.id, "name": t.name, "description": t.simple_description}
-        for t in annotated_tables
-    ]
+    # Only the lexically closest tables go to the LLM, so the prompt stays bounded as the schema grows
+    candidates = table_retrieval_service.rank_tables(db, data_source_id, user_query, annotated_tables)
+    table_summaries = _table_summaries(candidates)
     
-    selected_ids = select_relevant_tables(user_query, table_summaries)
+    selected_ids = select_relevant_tables(user_query, table_summaries, use_cache=use_cache)
     
     # Fallback logic same as generate_dataset_sql
     if not selected_ids:
@@ -109,93 +556,120 @@ def auto_select_tables(db: Session, data_source_id: int, user_query: str) -> Dic
             
     return {"selectedTableIds": selected_ids}
 
-def generate_dataset_sql(db: Session, data_source_id: int, table_ids: List[int], user_query: str, skip_auto_select: bool = False) -> Dict[str, Any]:
+def _table_summaries(tables: List[prompt_context_service.TableSummary]) -> List[Dict[str, Any]]:
+    # Id order, not rank order: the same candidates always give the same prompt prefix
+    return [{"id": t.id, "name": t.name, "description": t.description} for t in sorted(tables, key=lambda t: t.id)]
+
+def _resolve_dataset_tables(db: Session, data_source_id: int, table_ids: List[int], user_query: str, skip_auto_select: bool = False, use_cache: bool = True) -> List[int]:
     # Fetch data source and tables from database
     data_source = db.query(DataSource).filter(DataSource.id == data_source_id).first()
     if not data_source:
         raise ValueError(f"DataSource with id {data_source_id} not found")
 
-    if not table_ids:
-        if skip_auto_select:
-             tables = []
-        else:
-            # Auto-selection mode: Fetch all tables for this data source
-            all_tables = db.query(TableEntry).filter(TableEntry.dataSourceId == data_source_id).all()
-            
-            # Filter only annotated tables
-            annotated_tables = [t for t in all_tables if t.simple_description]
-            
-            if not annotated_tables:
-                raise ValueError("当前数据源没有已标注的表，无法进行自动选择。请先对表进行标注（添加简要描述）。")
-
-            # Prepare summary for AI selection
-            table_summaries = [
-                {"id": t.id, "name": t.name, "description": t.simple_description}
-                for t in annotated_tables
-            ]
-            
-            # Use AI to select relevant tables
-            selected_ids = select_relevant_tables(user_query, table_summaries)
-            
-            if not selected_ids:
-                 # If AI selects nothing, but we have few tables, maybe use all?
-                 # For now, let's trust the AI or fallback to all if very few (< 3)
-                 if len(annotated_tables) <= 3:
-                     tables = annotated_tables
-                 else:
-                     # If we return empty, the SQL generation will likely fail or be generic.
-                     # Let's try to proceed with empty and let the next step handle it (which will result in empty context)
-                     tables = []
-                     logger.warning("AI selected no tables for query: %s", user_query)
-            else:
-                 tables = [t for t in annotated_tables if t.id in selected_ids]
-                 
-            if not tables and len(annotated_tables) > 0:
-                 # Fallback: if AI selection failed entirely (returned empty), maybe just pick top 5?
-                 # Or just error out.
-                 # Let's try to return a helpful error in the SQL explanation later if context is empty.
-                 pass
+    if table_ids:
+        return list(table_ids)
+    if skip_auto_select:
+        return []
 
-    else:
-        tables = db.query(TableEntry).filter(TableEntry.id.in_(table_ids)).all()
-        if not tables:
-             raise ValueError(f"No valid tables found for ids {table_ids}")
-
-    processed_tables = []
-    for t in tables:
-        simple_desc = t.simple_description
-        if not simple_desc:
-            raise ValueError(f"Table '{t.name}' is missing simple_description. Please save table annotations first.")
-        
-        # Parse columns from JSON if needed (TableEntry columns is JSON field)
-        cols = t.columns if isinstance(t.columns, list) else []
-        
-        processed_tables.append({
-            "name": t.name,
-            "description": simple_desc,
-            "columns": [{"name": c.get("name"), "type": c.get("type"), "alias": c.get("alias"), "description": c.get("description")} for c in cols]
-        })
-
-    schema_context = [{
-        "tables": processed_tables
-    }]
+    # Auto-selection mode: only annotated tables can be used
+    annotated_tables = prompt_context_service.annotated_tables(db, data_source_id)
+    
+    if not annotated_tables:
+        raise ValueError("当前数据源没有已标注的表，无法进行自动选择。请先对表进行标注（添加简要描述）。")
+
+    # Prepare summary for AI selection (top-k by local BM25 retrieval)
+    candidates = table_retrieval_service.rank_tables(db, data_source_id, user_query, annotated_tables)
+    
+    # Use AI to select relevant tables
+    selected_ids = select_relevant_tables(user_query, _table_summaries(candidates), use_cache=use_cache)
     
+    if not selected_ids:
+         # If AI selects nothing, but we have few tables, maybe use all?
+         # For now, let's trust the AI or fallback to all if very few (< 3)
+         if len(annotated_tables) <= 3:
+             return [t.id for t in annotated_tables]
+         # If we return empty, the SQL generation will likely fail or be generic.
+         # Let's try to proceed with empty and let the next step handle it (which will result in empty context)
+         logger.warning("AI selected no tables for query: %s", user_query)
+         return []
+    selected = set(selected_ids)
+    return [t.id for t in annotated_tables if t.id in selected]
+
+def _dataset_sql_messages(schema_context: str, user_query: str) -> List[Dict[str, Any]]:
     system = {
         "role": "system",
         "content": "You are a specialized SQL generation assistant. Respond in Simplified Chinese and return valid JSON with fields 'sql' and 'explanation'."
     }
     user = {
         "role": "user",
-        "content": f"I have the following data sources and tables available:\n{schema_context}\n\nUser Request: \"{user_query}\"\n\nPlease generate a valid Oracle SQL query to retrieve the dataset requested by the user. Output JSON with 'sql' and 'explanation'."
+        "content": f"I have the following tables available (column lines: name type -- alias; description):\n{schema_context}\n\nUser Request: \"{user_query}\"\n\nPlease generate a valid Oracle SQL query to retrieve the dataset requested by the user. Output JSON with 'sql' and 'explanation'."
     }
-    result = _call_llm([system, user], schema_hint="dataset_sql")
+    return [system, user]
+
+def _dataset_sql_request(db: Session, data_source_id: int, table_ids: List[int], user_query: str) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """(messages, ids of the tables in the prompt); the schema text comes from the per-datasource cache"""
+    compiled = prompt_context_service.schema(db, data_source_id, table_ids, get_strategy().model())
+    schema_context, _ = compiled.for_query(user_query)
+    return _dataset_sql_messages(schema_context, user_query), [t["id"] for t in compiled.tables]
+
+def generate_dataset_sql(db: Session, data_source_id: int, table_ids: List[int], user_query: str, skip_auto_select: bool = False, use_cache: bool = True) -> Dict[str, Any]:
+    table_ids = _resolve_dataset_tables(db, data_source_id, table_ids, user_query, skip_auto_select, use_cache)
+    messages, relevant_ids = _dataset_sql_request(db, data_source_id, table_ids, user_query)
+    result = _call_llm(messages, schema_hint="dataset_sql", use_cache=use_cache)
     if "error" in result:
-        return {"sql": "-- AI Generation Failed", "explanation": f"生成 SQL 失败：{result['error']}", "relevantTableIds": [t.id for t in tables]}
+        return {"sql": "-- AI Generation Failed", "explanation": f"生成 SQL 失败：{result['error']}", "relevantTableIds": relevant_ids}
     
-    result["relevantTableIds"] = [t.id for t in tables]
+    result["relevantTableIds"] = relevant_ids
     return result
 
-def generate_table_annotations(table_name: str, table_description: Optional[str], columns: List[Dict[str, str]]) -> List[Dict[str, str]]:
+async def stream_dataset_sql(db: Session, data_source_id: int, table_ids: List[int], user_query: str, skip_auto_select: bool = False, use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    generate_dataset_sql as a stream of (event, data): "tables" once the tables are
+    chosen, "delta" per token, "sql" as the SQL string grows, then "result" (same
+    shape as generate_dataset_sql) or "error".
+    """
+    try:
+        # Table selection and the schema lookup hit the DB / LLM synchronously
+        table_ids = await run_in_threadpool(_resolve_dataset_tables, db, data_source_id, table_ids, user_query, skip_auto_select, use_cache)
+        messages, relevant_ids = await run_in_threadpool(_dataset_sql_request, db, data_source_id, table_ids, user_query)
+    except ValueError as e:
+        yield "error", {"detail": str(e)}
+        return
+    except Exception as e:
+        # The client waits for a final event; a DB/LLM failure must not just end the stream
+        logger.exception(f"DATASET_SQL_STREAM_ERROR datasource={data_source_id} err={e}")
+        yield "error", {"detail": f"生成 SQL 失败：{e}"}
+        return
+    yield "tables", {"relevantTableIds": relevant_ids}
+
+    outcome: Dict[str, Any] = {}
+    async for event in _stream_llm(messages, "dataset_sql", outcome, use_cache=use_cache, fields=("sql",)):
+        yield event
+    if "error" in outcome:
+        yield "error", {"detail": f"生成 SQL 失败：{outcome['error']}", "relevantTableIds": relevant_ids}
+        return
+    yield "result", {**outcome["result"], "relevantTableIds": relevant_ids}
+
+def generate_table_annotations(table_name: str, table_description: Optional[str], columns: List[Dict[str, str]], use_cache: bool = True,
+                               db: Optional[Session] = None) -> List[Dict[str, str]]:
+    """
+    Alias/description per column. With `db`, columns the learned column dictionary
+    knows are answered from it and only the rest go to the LLM.
+    """
+    known, unknown = column_dictionary_service.annotate(db, columns)
+    if known:
+        logger.info(f"COLUMN_DICTIONARY table={table_name} hits={len(known)} misses={len(unknown)}")
+    if not unknown:
+        return known
+    annotations = _llm_table_annotations(table_name, table_description, unknown, use_cache)
+    if not known:
+        return annotations
+    # Input column order, dictionary hits and LLM answers interleaved
+    by_column = {a["columnName"]: a for a in annotations}
+    by_column.update((a["columnName"], a) for a in known)
+    return [by_column[c.get("name")] for c in columns if c.get("name") in by_column]
+
+def _llm_table_annotations(table_name: str, table_description: Optional[str], columns: List[Dict[str, str]], use_cache: bool) -> List[Dict[str, str]]:
     system = {
         "role": "system",
         "content": "You are a Data Dictionary Specialist. Respond in Simplified Chinese. Return a JSON object with a key 'annotations' containing an array of objects. Each object must have exactly these keys: 'columnName' (must match input column name exactly), 'alias' (Chinese short name), 'description' (business meaning)."
@@ -204,9 +678,12 @@ def generate_table_annotations(table_name: str, table_description: Optional[str]
         "role": "user",
         "content": f"Table Name: {table_name}\nTable Description: {table_description or 'N/A'}\nColumns: {columns}\n\nGenerate user-friendly metadata for each column."
     }
-    result = _call_llm([system, user], schema_hint="table_annotations")
+    result = _call_llm([system, user], schema_hint="table_annotations", use_cache=use_cache)
     if "error" in result:
         return []
+    return _normalize_annotations(result)
+
+def _normalize_annotations(result: Any) -> List[Dict[str, str]]:
     # Try common keys
     raw_list = []
     if isinstance(result, list):
@@ -232,7 +709,33 @@ def generate_table_annotations(table_name: str, table_description: Optional[str]
             
     return normalized
 
-def generate_data_insight(tables: List[Dict[str, Any]], user_query: str, reference_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def generate_multi_table_annotations(tables: List[Dict[str, Any]], use_cache: bool = True) -> Dict[str, List[Dict[str, str]]]:
+    """
+    generate_table_annotations for several small tables in one prompt. `tables`
+    have name, description and columns; returns annotations by table name.
+    Raises RuntimeError when the LLM call fails.
+    """
+    system = {
+        "role": "system",
+        "content": "You are a Data Dictionary Specialist. Respond in Simplified Chinese. Return a JSON object with a key 'tables' containing an array of objects with keys 'tableName' (must match the input table name exactly) and 'annotations'. 'annotations' is an array of objects with exactly these keys: 'columnName' (must match input column name exactly), 'alias' (Chinese short name), 'description' (business meaning)."
+    }
+    listing = "\n\n".join(
+        f"Table Name: {t['name']}\nTable Description: {t.get('description') or 'N/A'}\nColumns: {t['columns']}" for t in tables
+    )
+    user = {
+        "role": "user",
+        "content": f"{listing}\n\nGenerate user-friendly metadata for each column of every table."
+    }
+    result = _call_llm([system, user], schema_hint="table_annotations_batch", use_cache=use_cache)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    by_table = {}
+    for item in result.get("tables") or []:
+        if isinstance(item, dict) and item.get("tableName"):
+            by_table[item["tableName"]] = _normalize_annotations(item)
+    return by_table
+
+def _data_insight_request(tables: List[Dict[str, Any]], user_query: str, reference_context: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     system = {
         "role": "system",
         "content": "You are a helpful BI assistant. Respond in Simplified Chinese. Return JSON with 'explanation' and optionally 'chartConfig' or 'webComponent'."
@@ -269,11 +772,26 @@ def generate_data_insight(tables: List[Dict[str, Any]], user_query: str, referen
         elif reference_context.get("type") == "component":
             override = _get_provider_override("web_component")
     logger.info(f"generate_data_insight override: {override}")
-    result = _call_llm([system, user], schema_hint="data_insight", provider_override=override)
+    return [system, user], override
+
+def generate_data_insight(tables: List[Dict[str, Any]], user_query: str, reference_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    messages, override = _data_insight_request(tables, user_query, reference_context)
+    result = _call_llm(messages, schema_hint="data_insight", provider_override=override)
     if "error" in result:
         return {"explanation": f"分析失败：{result['error']}"}
     return result
 
+async def stream_data_insight(tables: List[Dict[str, Any]], user_query: str, reference_context: Optional[Dict[str, Any]] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """generate_data_insight as events: "delta", "explanation" as it grows, then "result" or "error" """
+    messages, override = _data_insight_request(tables, user_query, reference_context)
+    outcome: Dict[str, Any] = {}
+    async for event in _stream_llm(messages, "data_insight", outcome, provider_override=override, fields=("explanation",)):
+        yield event
+    if "error" in outcome:
+        yield "error", {"detail": f"分析失败：{outcome['error']}"}
+        return
+    yield "result", outcome["result"]
+
 def generate_chart_template(description: str, image_base64: Optional[str] = None) -> Dict[str, Any]:
     system = {
         "role": "system",
@@ -0,0 +1,301 @@
+"""
+Background annotation of many tables of a datasource. Columns missing an alias
+or description go to the LLM in units: a large table is split into chunks of
+CHUNK_COLUMNS columns, while small tables are packed into one prompt. Units run
+on a shared thread pool, each taking a token from its provider's rate-limit
+bucket first, and every finished unit is written back through datasource_service
+right away, so a cancelled or failed job keeps the work already done. Columns
+the learned column dictionary knows are written when the job starts and never
+reach the LLM.
+
+Jobs live in this process's memory; poll or stream their progress from the
+worker that started them.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.db.session import SessionLocal
+from backend.models.orm import DataSource, TableEntry
+from backend.schemas.base import Column, TableEntryPatch
+from backend.services import ai_service
+import backend.services.column_dictionary_service as column_dictionary_service
+from backend.utils.rate_limit import TokenBucket
+import backend.services.datasource_service as datasource_service
+
+CHUNK_COLUMNS = int(os.getenv("AI_ANNOTATION_CHUNK_COLUMNS", "15"))
+PACK_MAX_TABLES = int(os.getenv("AI_ANNOTATION_PACK_MAX_TABLES", "8"))
+CONCURRENCY = int(os.getenv("AI_ANNOTATION_CONCURRENCY", "4"))
+RATE_LIMIT_RPM = float(os.getenv("AI_RATE_LIMIT_RPM", "60"))
+RATE_LIMIT_BURST = float(os.getenv("AI_RATE_LIMIT_BURST", "5"))
+MAX_JOBS = 50
+PROGRESS_INTERVAL = 0.5
+
+logger = logging.getLogger("llm_client")
+
+_executor = ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="annotation")
+_buckets: Dict[str, TokenBucket] = {}
+_jobs: "OrderedDict[str, AnnotationJob]" = OrderedDict()
+_lock = threading.Lock()
+_write_lock = threading.Lock()  # one writer at a time: units of a table merge into the same column list
+
+def rate_limiter(provider: str) -> TokenBucket:
+    """Requests-per-minute bucket of a provider (AI_RATE_LIMIT_RPM_<PROVIDER> overrides the default)"""
+    with _lock:
+        bucket = _buckets.get(provider)
+        if bucket is None:
+            rpm = float(os.getenv(f"AI_RATE_LIMIT_RPM_{provider.upper()}", RATE_LIMIT_RPM))
+            bucket = _buckets[provider] = TokenBucket(rpm / 60, RATE_LIMIT_BURST)
+        return bucket
+
+class AnnotationJob:
+    def __init__(self, datasource_id: int, overwrite: bool, use_cache: bool, session_factory: Callable[[], Session]):
+        self.id = uuid.uuid4().hex
+        self.datasource_id = datasource_id
+        self.overwrite = overwrite
+        self.use_cache = use_cache
+        self.session_factory = session_factory
+        self.status = "running"
+        self.total_tables = 0
+        self.completed_tables = 0
+        self.total_units = 0
+        self.completed_units = 0
+        self.failed_units = 0
+        self.skipped_units = 0
+        self.annotated_columns = 0
+        self.dictionary_columns = 0  # of annotated_columns, filled from the column dictionary
+        self.errors: List[str] = []
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancelled = False
+        self.version = 0  # bumped on every change; progress streams watch it
+        self._remaining: Dict[int, int] = {}  # table id -> units not finished yet
+        self._lock = threading.Lock()
+
+    def _changed(self):
+        self.version += 1
+        finished = self.completed_units + self.failed_units + self.skipped_units
+        if finished >= self.total_units and self.status == "running":
+            self.status = "cancelled" if self.cancelled else "completed"
+            self.finished_at = time.time()
+
+    def unit_done(self, unit: List[Dict[str, Any]], annotated: int = 0, error: Optional[str] = None, skipped: bool = False):
+        with self._lock:
+            if skipped:
+                self.skipped_units += 1
+            elif error is None:
+                self.completed_units += 1
+                self.annotated_columns += annotated
+            else:
+                self.failed_units += 1
+                self.errors = (self.errors + [error])[-20:]
+            for table_id in {t["id"] for t in unit}:
+                self._remaining[table_id] -= 1
+                if not self._remaining[table_id]:
+                    self.completed_tables += 1
+            self._changed()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            self._changed()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id,
+                "dataSourceId": self.datasource_id,
+                "status": self.status,
+                "totalTables": self.total_tables,
+                "completedTables": self.completed_tables,
+                "totalUnits": self.total_units,
+                "completedUnits": self.completed_units,
+                "failedUnits": self.failed_units,
+                "skippedUnits": self.skipped_units,
+                "annotatedColumns": self.annotated_columns,
+                "dictionaryColumns": self.dictionary_columns,
+                "errors": list(self.errors),
+                "createdAt": self.created_at,
+                "finishedAt": self.finished_at,
+            }
+
+def _needs_annotation(col: Dict[str, Any], overwrite: bool) -> bool:
+    return overwrite or not (col.get("alias") and col.get("description"))
+
+def plan_units(tables: List[Dict[str, Any]], overwrite: bool = False) -> List[List[Dict[str, Any]]]:
+    """
+    Splits tables into LLM calls: tables with more than CHUNK_COLUMNS columns to
+    annotate get one call per chunk, smaller ones share a call up to CHUNK_COLUMNS
+    columns / PACK_MAX_TABLES tables.
+    """
+    units, pack, pack_columns = [], [], 0
+    for t in tables:
+        columns = [
+            {"name": c["name"], "type": c.get("type")}
+            for c in t.get("columns") or [] if isinstance(c, dict) and c.get("name") and _needs_annotation(c, overwrite)
+        ]
+        if not columns:
+            continue
+        if len(columns) > CHUNK_COLUMNS:
+            for start in range(0, len(columns), CHUNK_COLUMNS):
+                units.append([{**t, "columns": columns[start:start + CHUNK_COLUMNS]}])
+            continue
+        if pack and (pack_columns + len(columns) > CHUNK_COLUMNS or len(pack) >= PACK_MAX_TABLES):
+            units.append(pack)
+            pack, pack_columns = [], 0
+        pack.append({**t, "columns": columns})
+        pack_columns += len(columns)
+    if pack:
+        units.append(pack)
+    return units
+
+def _merge(db: Session, job: AnnotationJob, unit: List[Dict[str, Any]], annotations: Dict[str, List[Dict[str, str]]]) -> int:
+    annotated = 0
+    for t in unit:
+        by_column = {a["columnName"]: a for a in annotations.get(t["name"]) or []}
+        if not by_column:
+            continue
+        table = db.get(TableEntry, t["id"])
+        if table is None or table.dataSourceId != job.datasource_id:
+            continue
+        columns = [Column(**c) for c in table.columns or []]
+        changed = 0
+        for col in columns:
+            a = by_column.get(col.name)
+            if not a:
+                continue
+            updated = False
+            for field in ("alias", "description"):
+                if a.get(field) and (job.overwrite or not getattr(col, field)):
+                    setattr(col, field, a[field])
+                    updated = True
+            changed += updated
+        if changed:
+            # Dictionary and LLM answers are not votes: only user edits teach the dictionary
+            datasource_service.patch_table(db, job.datasource_id, t["id"], TableEntryPatch(columns=columns), learn=False)
+            annotated += changed
+    return annotated
+
+def _write_back(job: AnnotationJob, unit: List[Dict[str, Any]], annotations: Dict[str, List[Dict[str, str]]]) -> int:
+    """Merges a unit's annotations into the stored columns; returns how many columns changed"""
+    with _write_lock:
+        db = job.session_factory()
+        try:
+            return _merge(db, job, unit, annotations)
+        finally:
+            db.close()
+
+def _apply_dictionary(db: Session, job: AnnotationJob, tables: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Writes the annotations the column dictionary knows; returns the tables without those columns"""
+    pending = {
+        t["id"]: [c for c in t["columns"] if isinstance(c, dict) and c.get("name") and _needs_annotation(c, job.overwrite)]
+        for t in tables
+    }
+    found = column_dictionary_service.lookup(db, [c for columns in pending.values() for c in columns])
+    if not found:
+        return tables
+    known = {t["name"]: column_dictionary_service.partition(found, pending[t["id"]])[0] for t in tables}
+    with _write_lock:
+        job.dictionary_columns = _merge(db, job, tables, known)
+    job.annotated_columns = job.dictionary_columns
+    remaining = []
+    for t in tables:
+        hits = {a["columnName"] for a in known[t["name"]]}
+        remaining.append({**t, "columns": [c for c in t["columns"] if not (isinstance(c, dict) and c.get("name") in hits)]})
+    return remaining
+
+def _run_unit(job: AnnotationJob, unit: List[Dict[str, Any]]):
+    if job.cancelled or not rate_limiter(ai_service.get_strategy().name).acquire(cancelled=lambda: job.cancelled):
+        job.unit_done(unit, skipped=True)
+        return
+    names = ",".join(t["name"] for t in unit)
+    try:
+        if len(unit) == 1:
+            t = unit[0]
+            result = ai_service.generate_table_annotations(t["name"], t.get("description"), t["columns"], job.use_cache)
+            if not result:
+                raise RuntimeError("no annotations returned")
+            annotations = {t["name"]: result}
+        else:
+            annotations = ai_service.generate_multi_table_annotations(unit, job.use_cache)
+        job.unit_done(unit, annotated=_write_back(job, unit, annotations))
+    except Exception as e:
+        logger.error(f"ANNOTATION_JOB_ERROR job={job.id} tables={names} err={e}")
+        job.unit_done(unit, error=f"{names}: {e}")
+
+def start(db: Session, datasource_id: int, table_ids: Optional[List[int]] = None, overwrite: bool = False,
+          use_cache: bool = True, session_factory: Callable[[], Session] = SessionLocal,
+          use_dictionary: bool = True) -> Dict[str, Any]:
+    """Starts annotating the given tables (all tables of the datasource when none are given)"""
+    if db.get(DataSource, datasource_id) is None:
+        raise ValueError(f"DataSource with id {datasource_id} not found")
+    query = (
+        select(TableEntry.id, TableEntry.name, TableEntry.description, TableEntry.columns)
+        .where(TableEntry.dataSourceId == datasource_id)
+        .order_by(TableEntry.id)
+    )
+    if table_ids:
+        query = query.where(TableEntry.id.in_(table_ids))
+    tables = [
+        {"id": table_id, "name": name, "description": description, "columns": columns if isinstance(columns, list) else []}
+        for table_id, name, description, columns in db.execute(query)
+    ]
+
+    job = AnnotationJob(datasource_id, overwrite, use_cache, session_factory)
+    if use_dictionary:
+        tables = _apply_dictionary(db, job, tables)
+    units = plan_units(tables, overwrite)
+    job.total_tables = len(tables)
+    job.total_units = len(units)
+    for unit in units:
+        for t in unit:
+            job._remaining[t["id"]] = job._remaining.get(t["id"], 0) + 1
+    # Tables with nothing to annotate are done already
+    job.completed_tables = len(tables) - len(job._remaining)
+    job._changed()
+
+    with _lock:
+        _jobs[job.id] = job
+        while len(_jobs) > MAX_JOBS:
+            oldest = next((key for key, j in _jobs.items() if j.status != "running"), None)
+            if oldest is None:
+                break
+            del _jobs[oldest]
+    logger.info(f"ANNOTATION_JOB_START job={job.id} datasource={datasource_id} tables={len(tables)} units={len(units)} dictionary_columns={job.dictionary_columns}")
+    for unit in units:
+        _executor.submit(_run_unit, job, unit)
+    return job.snapshot()
+
+def get(job_id: str) -> Optional[AnnotationJob]:
+    with _lock:
+        return _jobs.get(job_id)
+
+async def stream_progress(job: AnnotationJob) -> AsyncIterator[Tuple[str, Any]]:
+    """("progress", snapshot) whenever the job changes, ending with ("done", snapshot)"""
+    seen = -1
+    while True:
+        if job.version != seen:
+            seen = job.version
+            snapshot = job.snapshot()
+            if snapshot["status"] != "running":
+                yield "done", snapshot
+                return
+            yield "progress", snapshot
+        await asyncio.sleep(PROGRESS_INTERVAL)
+
+def shutdown():
+    """Cancels running jobs and drops their queued units; called on application shutdown"""
+    with _lock:
+        jobs = list(_jobs.values())
+    for job in jobs:
+        job.cancel()
+    _executor.shutdown(wait=False, cancel_futures=True)
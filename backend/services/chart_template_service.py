@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 import time
 from backend.models import Widget
 from backend.schemas import ChartTemplateBase, ChartTemplate
+from backend.services import dashboard_service, version_service, search_service
 
 def map_widget_to_template(widget: Widget) -> ChartTemplate:
     config = widget.config or {}
@@ -51,6 +52,9 @@ def create(db: Session, temp: ChartTemplateBase):
         db_widget.id = temp.id
         
     db.add(db_widget)
+    db.flush()
+    search_service.sync(db, "widget", [db_widget.id])
+    version_service.bump(db, "widget", db_widget.id)
     db.commit()
     db.refresh(db_widget)
     return map_widget_to_template(db_widget)
@@ -78,6 +82,9 @@ def update(db: Session, id: int, temp: ChartTemplateBase):
     
     import time
     db_widget.updatedAt = int(time.time() * 1000)
+    dashboard_service.write_documents(db, dashboard_service.dashboard_ids_for_widget(db, id))
+    search_service.sync(db, "widget", [id])
+    version_service.bump(db, "widget", id)
     
     db.commit()
     db.refresh(db_widget)
@@ -88,6 +95,10 @@ def delete(db: Session, id: int):
     if not db_widget:
         return False
     
+    dashboard_ids = dashboard_service.dashboard_ids_for_widget(db, db_widget.id)
     db.delete(db_widget)
+    dashboard_service.write_documents(db, dashboard_ids)
+    search_service.sync(db, "widget", [id])
+    version_service.bump(db, "widget", id)
     db.commit()
     return True
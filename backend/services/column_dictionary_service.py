@@ -0,0 +1,179 @@
+"""
+Column annotation dictionary learned from saved tables. Each saved column whose
+alias/description is new or changed adds a vote to (normalized name, normalized
+type, alias, description); a column whose key has a clear winner (at least
+MIN_VOTES votes and more than half of all votes for the key) is annotated from
+the dictionary instead of by the LLM. CREATED_BY / CreatedBy / created_by share
+a name key, VARCHAR2(50) / NVARCHAR2(20) a type key.
+"""
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import os
+import re
+import time
+
+from sqlalchemy import and_, bindparam, delete, inspect, select, update
+from sqlalchemy.orm import Session
+
+from backend.models.orm import ColumnAnnotation, TableEntry
+
+MIN_VOTES = int(os.getenv("AI_COLUMN_DICTIONARY_MIN_VOTES", "2"))
+TABLE = ColumnAnnotation.__tablename__
+_BATCH = 500
+
+_TYPE_FAMILIES = {
+    "string": ("CHAR", "VARCHAR", "VARCHAR2", "NCHAR", "NVARCHAR", "NVARCHAR2", "TEXT", "CLOB", "NCLOB", "STRING"),
+    "number": ("NUMBER", "NUMERIC", "DECIMAL", "INT", "INTEGER", "BIGINT", "SMALLINT", "TINYINT", "FLOAT", "DOUBLE", "REAL"),
+    "date": ("DATE", "DATETIME", "TIMESTAMP", "TIME"),
+}
+_FAMILY_BY_TYPE = {name: family for family, names in _TYPE_FAMILIES.items() for name in names}
+
+# database url -> True once the table exists, or the monotonic time it was last
+# found missing; a missing table is re-checked after MISSING_RECHECK_SECONDS
+_available: Dict[str, Any] = {}
+MISSING_RECHECK_SECONDS = 30.0
+
+def is_available(db: Session) -> bool:
+    key = str(db.get_bind().url)
+    state = _available.get(key)
+    if state is True:
+        return True
+    if state is not None and time.monotonic() - state < MISSING_RECHECK_SECONDS:
+        return False
+    exists = inspect(db.connection()).has_table(TABLE)
+    _available[key] = True if exists else time.monotonic()
+    return exists
+
+def normalize_name(name: Any) -> str:
+    return "".join(ch for ch in str(name or "").upper() if ch.isalnum())
+
+def normalize_type(type_: Any) -> str:
+    base = re.split(r"[\s(]", str(type_ or "").strip().upper(), maxsplit=1)[0]
+    return _FAMILY_BY_TYPE.get(base, base.lower())
+
+def _key(col: Dict[str, Any]) -> Tuple[str, str]:
+    return normalize_name(col.get("name")), normalize_type(col.get("type"))
+
+def _as_dict(col: Any) -> Dict[str, Any]:
+    if isinstance(col, dict):
+        return col
+    return col.dict() if hasattr(col, "dict") else {"name": col}
+
+def _annotation(col: Dict[str, Any]) -> Tuple[str, str]:
+    return (col.get("alias") or "").strip(), (col.get("description") or "").strip()
+
+def _votes(columns: Iterable[Any], previous: Iterable[Any] = ()) -> Counter:
+    before = {}
+    for col in previous or []:
+        col = _as_dict(col)
+        before[col.get("name")] = _annotation(col)
+    votes = Counter()
+    for col in columns or []:
+        col = _as_dict(col)
+        alias, description = _annotation(col)
+        name_key, type_key = _key(col)
+        if name_key and (alias or description) and before.get(col.get("name")) != (alias, description):
+            votes[(name_key, type_key, alias, description)] += 1
+    return votes
+
+def learn(db: Session, columns: Iterable[Any], previous: Iterable[Any] = ()):
+    """
+    Votes for annotated saved columns of one table, skipping those annotated the
+    same in `previous`, its columns before the save. Call before the service's commit.
+    """
+    learn_tables(db, [(columns, previous)])
+
+def learn_tables(db: Session, tables: Iterable[Tuple[Iterable[Any], Iterable[Any]]]):
+    """learn() for many saved tables, as (columns, previous) pairs, in one batch of writes"""
+    if is_available(db):
+        votes = Counter()
+        for columns, previous in tables:
+            votes.update(_votes(columns, previous))
+        _add_votes(db, votes)
+
+def _add_votes(db: Session, votes: Counter):
+    if not votes:
+        return
+
+    keys = list(votes)
+    existing = set()
+    for start in range(0, len(keys), _BATCH):
+        names = {k[0] for k in keys[start:start + _BATCH]}
+        existing.update(tuple(row) for row in db.execute(
+            select(ColumnAnnotation.name_key, ColumnAnnotation.type_key, ColumnAnnotation.alias, ColumnAnnotation.description)
+            .where(ColumnAnnotation.name_key.in_(names))
+        ))
+    params = [{"k_name": k[0], "k_type": k[1], "k_alias": k[2], "k_description": k[3], "n": votes[k]} for k in keys if k in existing]
+    if params:
+        table = ColumnAnnotation.__table__
+        db.execute(
+            update(table)
+            .where(and_(
+                table.c.name_key == bindparam("k_name"), table.c.type_key == bindparam("k_type"),
+                table.c.alias == bindparam("k_alias"), table.c.description == bindparam("k_description"),
+            ))
+            .values(count=table.c.count + bindparam("n")),
+            params
+        )
+    db.add_all(
+        ColumnAnnotation(name_key=k[0], type_key=k[1], alias=k[2], description=k[3], count=votes[k])
+        for k in keys if k not in existing
+    )
+    db.flush()
+
+def lookup(db: Session, columns: Iterable[Any]) -> Dict[Tuple[str, str], Dict[str, str]]:
+    """Confident dictionary entries for the given columns, by (normalized name, normalized type)"""
+    if not is_available(db):
+        return {}
+    wanted = {_key(_as_dict(c)) for c in columns}
+    wanted.discard(("", ""))
+    names = sorted({k[0] for k in wanted if k[0]})
+    candidates: Dict[Tuple[str, str], List[Tuple[int, str, str]]] = {}
+    for start in range(0, len(names), _BATCH):
+        rows = db.execute(
+            select(ColumnAnnotation.name_key, ColumnAnnotation.type_key, ColumnAnnotation.alias,
+                   ColumnAnnotation.description, ColumnAnnotation.count)
+            .where(ColumnAnnotation.name_key.in_(names[start:start + _BATCH]))
+        )
+        for name_key, type_key, alias, description, count in rows:
+            if (name_key, type_key) in wanted:
+                candidates.setdefault((name_key, type_key), []).append((count, alias, description))
+    found = {}
+    for key, entries in candidates.items():
+        count, alias, description = max(entries, key=lambda e: (e[0], e[1], e[2]))
+        if count >= MIN_VOTES and count * 2 > sum(e[0] for e in entries):
+            found[key] = {"alias": alias, "description": description}
+    return found
+
+def annotate(db: Optional[Session], columns: List[Dict[str, Any]]) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+    """(annotations the dictionary knows, in generate_table_annotations' shape; columns it doesn't)"""
+    if db is None:
+        return [], list(columns)
+    return partition(lookup(db, columns), columns)
+
+def partition(found: Dict[Tuple[str, str], Dict[str, str]], columns: List[Any]) -> Tuple[List[Dict[str, str]], List[Any]]:
+    """annotate() against entries already fetched with lookup(), e.g. for many tables at once"""
+    known, unknown = [], []
+    for col in columns:
+        entry = found.get(_key(_as_dict(col)))
+        if entry and entry["alias"] and entry["description"]:
+            known.append({"columnName": _as_dict(col).get("name"), **entry})
+        else:
+            unknown.append(col)
+    return known, unknown
+
+def rebuild(db: Session) -> int:
+    """
+    Re-learns the whole dictionary from every saved table; returns the number of
+    entries. Stored columns don't record who wrote them, so annotations filled in
+    by annotation jobs count here like user edits.
+    """
+    db.execute(delete(ColumnAnnotation))
+    votes = Counter()
+    ids = list(db.execute(select(TableEntry.id).order_by(TableEntry.id)).scalars())
+    for start in range(0, len(ids), _BATCH):
+        for columns in db.execute(select(TableEntry.columns).where(TableEntry.id.in_(ids[start:start + _BATCH]))).scalars():
+            votes.update(_votes(columns if isinstance(columns, list) else []))
+    _add_votes(db, votes)
+    db.commit()
+    return db.query(ColumnAnnotation).count()
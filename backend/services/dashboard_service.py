@@ -1,7 +1,12 @@
-from sqlalchemy.orm import Session
-from backend.models import Dashboard, Widget, DashboardWidget
-from backend.schemas import DashboardBase
+from sqlalchemy import select, func, insert
+from sqlalchemy.orm import Session, selectinload, load_only
+from fastapi.encoders import jsonable_encoder
+from backend.models import Dashboard, Widget, DashboardWidget, DashboardDocument
+from backend.schemas import DashboardBase, Dashboard as DashboardSchema
+from backend.services import version_service, search_service
+import hashlib
 import json
+import time
 
 def ensure_config(config, widget):
     if not config:
@@ -21,65 +26,31 @@ def ensure_config(config, widget):
         
     return config
 
-def get_all(db: Session):
-    dashboards = db.query(Dashboard).all()
-    # Serialize logic is handled by Pydantic response_model in router, 
-    # but we need to ensure the 'widgets' property on Dashboard object is populated with layouts.
-    # The property in ORM model returns only Widget objects. 
-    # We need to enrich them or rely on custom serialization.
-    # However, standard Pydantic from_attributes=True reads attributes.
-    # DashboardBase expects widgets: List[DashboardWidget] (which has layout).
-    # Widget ORM model no longer has layout.
-    # So if we return Dashboard ORM object, Pydantic will try to read dashboard.widgets[i].layout -> Fails.
-    
-    # Strategy: We construct the response manually or monkey-patch the objects.
-    # Cleaner: Return a list of dicts or objects that match the schema.
-    
-    results = []
-    for d in dashboards:
-        widgets_with_layout = []
-        for assoc in d.widget_associations:
-            w = assoc.widget
-            # Reconstruct the "DashboardWidget" shape expected by frontend/schema
-            w_dict = {
-                "id": w.id,
-                "datasetId": w.datasetId,
-                "config": ensure_config(w.config, w),
-                "timestamp": w.createdAt, # Map DB createdAt to schema timestamp
-                "layout": assoc.layout, # Get layout from association
-                "name": w.name,
-                "description": w.description
-            }
-            widgets_with_layout.append(w_dict)
-            
-        # Sort widgets by layout index 'i' to ensure consistent order
-        widgets_with_layout.sort(key=lambda x: (x['layout'] or {}).get('i', 0))
-
-        d_dict = d.__dict__.copy()
-        d_dict['widgets'] = widgets_with_layout
-        results.append(d_dict)
-        
-    return results
+def _with_widgets(query):
+    # Two extra SELECT ... IN queries (associations, widgets) regardless of how
+    # many dashboards/widgets are loaded, instead of one lazy load per row
+    return query.options(
+        selectinload(Dashboard.widget_associations).selectinload(DashboardWidget.widget)
+    )
 
-def get_by_id(db: Session, id: int):
-    d = db.query(Dashboard).filter(Dashboard.id == id).first()
-    if not d:
-        return None
-        
+def _serialize(d: Dashboard) -> dict:
+    # DashboardBase expects widgets: List[DashboardWidget] (which has layout), but the
+    # Widget ORM model no longer has layout, so build the response shape from the associations.
     widgets_with_layout = []
     for assoc in d.widget_associations:
         w = assoc.widget
+        # Reconstruct the "DashboardWidget" shape expected by frontend/schema
         w_dict = {
             "id": w.id,
             "datasetId": w.datasetId,
             "config": ensure_config(w.config, w),
-            "timestamp": w.createdAt,
-            "layout": assoc.layout,
+            "timestamp": w.createdAt, # Map DB createdAt to schema timestamp
+            "layout": assoc.layout, # Get layout from association
             "name": w.name,
             "description": w.description
         }
         widgets_with_layout.append(w_dict)
-        
+
     # Sort widgets by layout index 'i' to ensure consistent order
     widgets_with_layout.sort(key=lambda x: (x['layout'] or {}).get('i', 0))
 
@@ -87,93 +58,217 @@ def get_by_id(db: Session, id: int):
     d_dict['widgets'] = widgets_with_layout
     return d_dict
 
-def sync_widgets(db: Session, db_dashboard: Dashboard, widgets_data: list):
+def get_summaries(db: Session, skip: int = 0, limit: int = 50):
+    """Paginated list without widget configs; only the widget count is loaded"""
+    widget_count = (
+        select(func.count(DashboardWidget.widget_id))
+        .where(DashboardWidget.dashboard_id == Dashboard.id)
+        .correlate(Dashboard)
+        .scalar_subquery()
+    )
+    query = db.query(Dashboard, widget_count).options(
+        load_only(Dashboard.id, Dashboard.name, Dashboard.description, Dashboard.createdAt, Dashboard.updatedAt)
+    )
+
+    total = db.query(func.count(Dashboard.id)).scalar()
+    rows = query.order_by(Dashboard.id).offset(skip).limit(limit).all()
+
+    items = [
+        {
+            "id": d.id,
+            "name": d.name,
+            "description": d.description,
+            "widgetCount": count or 0,
+            "createdAt": d.createdAt,
+            "updatedAt": d.updatedAt,
+        }
+        for d, count in rows
+    ]
+    return {"items": items, "total": total, "skip": skip, "limit": limit}
+
+def get_by_id(db: Session, id: int):
+    d = _with_widgets(db.query(Dashboard)).filter(Dashboard.id == id).first()
+    if not d:
+        return None
+    return _serialize(d)
+
+def _encode(data: dict) -> bytes:
+    # Same encoding JSONResponse uses for the response_model path
+    payload = jsonable_encoder(DashboardSchema(**data))
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def write_document(db: Session, id: int):
+    """
+    Re-serializes a dashboard into dashboard_documents and bumps its version.
+    Call before commit so the document is written in the same transaction.
+    """
+    return write_documents(db, [id]).get(id)
+
+def write_documents(db: Session, ids) -> dict:
+    """write_document for several dashboards, loaded together; returns the documents by id"""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    db.flush()
+    # sync_widgets adds associations without touching the loaded collections
+    db.expire_all()
+    dashboards = _with_widgets(db.query(Dashboard)).filter(Dashboard.id.in_(ids)).all()
+    docs = {doc.dashboard_id: doc for doc in db.query(DashboardDocument).filter(DashboardDocument.dashboard_id.in_(ids))}
+    now = int(time.time() * 1000)
+    for d in dashboards:
+        doc = docs.get(d.id)
+        if doc is None:
+            doc = docs[d.id] = DashboardDocument(dashboard_id=d.id, version=0)
+            db.add(doc)
+        doc.body = _encode(_serialize(d))
+        doc.version = (doc.version or 0) + 1
+        doc.updatedAt = now
+        version_service.bump(db, "dashboard", d.id)
+    return {d.id: docs[d.id] for d in dashboards}
+
+def _build_documents(db: Session, ids) -> dict:
+    """Bodies serialized in memory, for dashboards whose document was never written"""
+    dashboards = _with_widgets(db.query(Dashboard)).filter(Dashboard.id.in_(list(ids))).all()
+    return {d.id: _encode(_serialize(d)) for d in dashboards}
+
+def dashboard_ids_for_widget(db: Session, widget_id: int) -> list:
+    rows = db.query(DashboardWidget.dashboard_id).filter(DashboardWidget.widget_id == widget_id).all()
+    return [r[0] for r in rows]
+
+def get_document(db: Session, id: int):
+    """
+    Returns the stored (version, body) for a dashboard. A dashboard without a stored
+    document yet is serialized in memory as version 0; reads never write, the
+    document is persisted by the next write or create_dashboard_documents_table.py.
+    """
+    doc = db.get(DashboardDocument, id)
+    if doc is not None:
+        return doc.version, doc.body
+    body = _build_documents(db, [id]).get(id)
+    if body is None:
+        return None
+    return 0, body
+
+def get_all_documents(db: Session) -> bytes:
+    """The full dashboard list as one JSON array assembled from the stored documents"""
+    rows = (
+        db.query(Dashboard.id, DashboardDocument.body)
+        .outerjoin(DashboardDocument, DashboardDocument.dashboard_id == Dashboard.id)
+        .order_by(Dashboard.id)
+        .all()
+    )
+    missing = [id for id, body in rows if body is None]
+    built = _build_documents(db, missing) if missing else {}
+    bodies = [body if body is not None else built.get(id) for id, body in rows]
+    return b"[" + b",".join(body for body in bodies if body is not None) + b"]"
+
+def _layout_hash(layout) -> str:
+    return hashlib.sha1(json.dumps(layout or {}, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _new_widget_values(w_data) -> dict:
+    ds_id = w_data.datasetId
+    if isinstance(ds_id, str) and ds_id.isdigit():
+         ds_id = int(ds_id)
+    elif isinstance(ds_id, str) and not ds_id:
+         ds_id = None
+
+    # Handle Pydantic model for config
+    config_dict = w_data.config.dict() if hasattr(w_data.config, 'dict') else w_data.config
+
+    # Extract name and description from config (since DashboardWidget doesn't have them directly)
+    w_name = config_dict.get("title", "Untitled")
+    w_desc = config_dict.get("description", "")
+
+    # Ensure defaults in config
+    if "type" not in config_dict: config_dict["type"] = "custom"
+    if "xAxisKey" not in config_dict: config_dict["xAxisKey"] = ""
+    if "dataKeys" not in config_dict: config_dict["dataKeys"] = []
+
+    return {
+        "datasetId": ds_id,
+        "name": w_name,
+        "description": w_desc,
+        "config": config_dict,
+        "type": config_dict.get("type", "custom"),
+        "content": None,
+        "createdAt": w_data.timestamp or 0,
+        "updatedAt": 0
+    }
+
+def _insert_widgets(db: Session, rows: list) -> list:
+    """
+    Multi-row INSERT ... RETURNING (the ORM flushes autoincrement rows one at a time
+    on SQLite); returns the new ids in `rows` order.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name == "sqlite":
+        # SQLite has no insert sentinel, so sort_by_parameter_order would fall back
+        # to one INSERT per row. A single statement holds the write lock and assigns
+        # rowids in VALUES order, so ascending ids are parameter order.
+        return sorted(row[0] for row in db.execute(insert(Widget).returning(Widget.id), rows))
+    # Elsewhere neither RETURNING order nor sequence order is guaranteed to follow
+    # VALUES order; SQLAlchemy correlates the rows back to the parameters.
+    result = db.execute(insert(Widget).returning(Widget.id, sort_by_parameter_order=True), rows)
+    return [row[0] for row in result]
+
+def sync_widgets(db: Session, db_dashboard: Dashboard, widgets_data: list) -> bool:
+    """
+    Diffs the incoming widgets against the dashboard's associations in bulk:
+    one IN query for existing widgets, one multi-row INSERT each for new widgets
+    and their associations, and layout writes only where the layout changed. Returns True if
+    anything was written.
+    """
     # Map existing associations by Widget ID
     existing_assocs_map = {assoc.widget_id: assoc for assoc in db_dashboard.widget_associations}
-    
+
+    # Integer ids may refer to existing widgets (saved components, other dashboards)
+    candidate_ids = {w.id for w in widgets_data if isinstance(w.id, int)}
+    known_ids = set()
+    if candidate_ids:
+        known_ids = {row[0] for row in db.query(Widget.id).filter(Widget.id.in_(candidate_ids))}
+
     incoming_ids = set()
-    
+    new_widgets = [] # (Widget, layout)
+    changed = False
+
     for w_data in widgets_data:
-        ds_id = w_data.datasetId
-        if isinstance(ds_id, str) and ds_id.isdigit():
-             ds_id = int(ds_id)
-        elif isinstance(ds_id, str) and not ds_id:
-             ds_id = None
-
-        # Check if ID is an integer (existing widget ID)
-        if isinstance(w_data.id, int):
-            # Two cases:
-            # 1. Widget is already associated with this dashboard (Update association layout)
-            # 2. Widget exists in DB but not associated (Add association)
-            
-            # Check if widget exists in DB
-            existing_widget = db.query(Widget).get(w_data.id)
-            
-            if existing_widget:
-                # Update/Create Association
-                if w_data.id in existing_assocs_map:
-                    # Update Layout
-                    assoc = existing_assocs_map[w_data.id]
-                    assoc.layout = w_data.layout.dict()
-                else:
-                    # Create Association
-                    new_assoc = DashboardWidget(
-                        dashboard_id=db_dashboard.id,
-                        widget_id=existing_widget.id,
-                        layout=w_data.layout.dict()
-                    )
-                    db.add(new_assoc)
-                
-                incoming_ids.add(w_data.id)
-                continue
-
-        # If we are here, it's a new widget (or ID not found)
-        # Create new widget if it doesn't exist (e.g. from template or new chart)
-        
-        # Prepare Widget data
-        # Handle Pydantic model for config
-        config_dict = w_data.config.dict() if hasattr(w_data.config, 'dict') else w_data.config
-        
-        # Extract name and description from config (since DashboardWidget doesn't have them directly)
-        w_name = config_dict.get("title", "Untitled")
-        w_desc = config_dict.get("description", "")
-        
-        # Ensure defaults in config
-        if "type" not in config_dict: config_dict["type"] = "custom"
-        if "xAxisKey" not in config_dict: config_dict["xAxisKey"] = ""
-        if "dataKeys" not in config_dict: config_dict["dataKeys"] = []
-        
-        widget_data = {
-            "datasetId": w_data.datasetId,
-            "name": w_name,
-            "description": w_desc,
-            "config": config_dict,
-            "type": config_dict.get("type", "custom"),
-            "createdAt": w_data.timestamp or 0,
-            "updatedAt": 0
-        }
+        layout = w_data.layout.dict()
+
+        if isinstance(w_data.id, int) and w_data.id in known_ids:
+            if w_data.id in incoming_ids:
+                continue # Duplicate entry in the payload
+            incoming_ids.add(w_data.id)
+
+            assoc = existing_assocs_map.get(w_data.id)
+            if assoc is None:
+                db.add(DashboardWidget(dashboard_id=db_dashboard.id, widget_id=w_data.id, layout=layout))
+                changed = True
+            elif _layout_hash(assoc.layout) != _layout_hash(layout):
+                assoc.layout = layout
+                changed = True
+            continue
+
+        # New widget (temporary client id, or id not found), e.g. from a template or a new chart
+        new_widgets.append((_new_widget_values(w_data), layout))
+
+    if new_widgets:
+        new_ids = _insert_widgets(db, [values for values, _ in new_widgets])
+        db.execute(insert(DashboardWidget), [
+            {"dashboard_id": db_dashboard.id, "widget_id": new_id, "layout": layout}
+            for new_id, (_, layout) in zip(new_ids, new_widgets)
+        ])
+        search_service.sync(db, "widget", new_ids)
+        version_service.bump_many(db, "widget", new_ids)
+        changed = True
 
-        # Create Widget
-        new_w = Widget(**widget_data)
-        db.add(new_w)
-        db.flush() # Get ID
-        
-        # Create Association
-        new_assoc = DashboardWidget(
-            dashboard_id=db_dashboard.id,
-            widget_id=new_w.id,
-            layout=w_data.layout.dict()
-        )
-        db.add(new_assoc)
-        # No need to add to incoming_ids as it wasn't in existing_assocs_map
-    
     # Remove missing associations (Remove widget from dashboard)
     # Note: We do NOT delete the Widget itself, as it might be used elsewhere or saved.
-    # Unless it's an orphan?
-    # For now, safe approach: just remove association.
     for w_id, assoc in existing_assocs_map.items():
         if w_id not in incoming_ids:
             db.delete(assoc)
+            changed = True
+
+    return changed
 
 def create_or_update(db: Session, dashboard: DashboardBase):
     existing = db.query(Dashboard).filter(Dashboard.id == dashboard.id).first()
@@ -182,8 +277,12 @@ def create_or_update(db: Session, dashboard: DashboardBase):
         existing.name = dashboard.name
         existing.description = dashboard.description
         existing.updatedAt = dashboard.updatedAt
+        # Checked before syncing, since lazy loads may autoflush the change
+        modified = db.is_modified(existing)
         
-        sync_widgets(db, existing, dashboard.widgets)
+        changed = sync_widgets(db, existing, dashboard.widgets)
+        if changed or modified:
+            write_document(db, existing.id)
         
         db.commit()
         db.refresh(existing)
@@ -201,6 +300,7 @@ def create_or_update(db: Session, dashboard: DashboardBase):
     
     # Add widgets
     sync_widgets(db, db_dashboard, dashboard.widgets)
+    write_document(db, db_dashboard.id)
         
     db.commit()
     db.refresh(db_dashboard)
@@ -214,8 +314,11 @@ def update(db: Session, id: int, dashboard: DashboardBase):
     db_dashboard.name = dashboard.name
     db_dashboard.description = dashboard.description
     db_dashboard.updatedAt = dashboard.updatedAt
+    modified = db.is_modified(db_dashboard)
     
-    sync_widgets(db, db_dashboard, dashboard.widgets)
+    changed = sync_widgets(db, db_dashboard, dashboard.widgets)
+    if changed or modified:
+        write_document(db, db_dashboard.id)
     
     db.commit()
     db.refresh(db_dashboard)
@@ -227,5 +330,6 @@ def delete(db: Session, id: int):
         return False
     
     db.delete(db_dashboard)
+    version_service.bump(db, "dashboard", id)
     db.commit()
     return True
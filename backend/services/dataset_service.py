@@ -1,11 +1,34 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 from backend.models.orm import Dataset, DataSource
 from backend.schemas import DatasetBase
-from backend.schemas.base import ExecuteSqlRequest
+from backend.schemas.base import ExecuteSqlRequest, DatasetExecuteOptions
 import backend.services.datasource_service as datasource_service
+import backend.services.sql_builder as sql_builder
+import backend.services.version_service as version_service
+import backend.services.search_service as search_service
+from backend.utils.downsample import downsample_indices, numeric_series, target_points_for_col_span
+from backend.utils.cache import TTLCache
+import hashlib
+import os
+import numpy as np
+
+# Filter widgets switch from a dropdown to a search box above this many distinct values
+DROPDOWN_MAX_VALUES = int(os.getenv("FILTER_DROPDOWN_MAX_VALUES", "200"))
+# Bucketed results return every bucket up to this many rows (a year of days, or
+# a month of hours per group, is well below it); the preview LIMIT does not apply
+TIME_BUCKET_MAX_ROWS = int(os.getenv("DATASET_TIME_BUCKET_MAX_ROWS", "50000"))
+# Downsampling reads the whole series (not the preview) up to this many rows;
+# only the x and y columns are kept, as arrays (~8 bytes per y value)
+DOWNSAMPLE_MAX_ROWS = int(os.getenv("DATASET_DOWNSAMPLE_MAX_ROWS", "500000"))
+# Without a native approximate count, distinct values are counted up to this many
+CARDINALITY_PROBE_MAX = int(os.getenv("FILTER_CARDINALITY_PROBE_MAX", "10000"))
+_column_values_cache = TTLCache(
+    maxsize=int(os.getenv("FILTER_VALUES_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("FILTER_VALUES_CACHE_TTL", "600"))
+)
 
 def get_all(db: Session) -> list[Dataset]:
-    return db.query(Dataset).all()
+    return db.query(Dataset).options(undefer(Dataset.previewData)).all()
 
 def get_by_id(db: Session, id: int) -> Dataset | None:
     return db.query(Dataset).filter(Dataset.id == id).first()
@@ -21,6 +44,9 @@ def create(db: Session, dataset: DatasetBase) -> Dataset:
         createdAt=dataset.createdAt
     )
     db.add(db_dataset)
+    db.flush()
+    search_service.sync(db, "dataset", [db_dataset.id])
+    version_service.bump(db, "dataset", db_dataset.id)
     db.commit()
     db.refresh(db_dataset)
     return db_dataset
@@ -36,6 +62,8 @@ def update(db: Session, id: int, dataset: DatasetBase) -> Dataset | None:
     db_dataset.sql = dataset.sql
     db_dataset.previewData = dataset.previewData.dict() if dataset.previewData else None
     # createdAt usually doesn't change on update, but if we had updatedAt we would set it here
+    search_service.sync(db, "dataset", [id])
+    version_service.bump(db, "dataset", id)
     
     db.commit()
     db.refresh(db_dataset)
@@ -50,14 +78,12 @@ def delete(db: Session, id: int) -> bool:
         raise ValueError(f"无法删除数据集 \"{db_dataset.name}\"，因为它正在被组件使用。")
 
     db.delete(db_dataset)
+    search_service.sync(db, "dataset", [id])
+    version_service.bump(db, "dataset", id)
     db.commit()
     return True
 
-def execute_query(db: Session, dataset_id: int, limit: int = 100) -> dict:
-    dataset = get_by_id(db, dataset_id)
-    if not dataset:
-        raise ValueError(f"Dataset with id {dataset_id} not found")
-    
+def _build_execute_request(db: Session, dataset: Dataset, sql: str, limit: int = 100) -> ExecuteSqlRequest:
     data_source = db.query(DataSource).filter(DataSource.id == dataset.dataSourceId).first()
     if not data_source:
         raise ValueError(f"DataSource with id {dataset.dataSourceId} not found")
@@ -65,7 +91,7 @@ def execute_query(db: Session, dataset_id: int, limit: int = 100) -> dict:
     config = data_source.config
     
     # Ensure required fields are strings
-    request = ExecuteSqlRequest(
+    return ExecuteSqlRequest(
         type=str(config.get('type')),
         host=str(config.get('host')),
         port=str(config.get('port')),
@@ -73,8 +99,185 @@ def execute_query(db: Session, dataset_id: int, limit: int = 100) -> dict:
         password=str(config.get('password', '')),
         serviceName=config.get('serviceName'),
         database=config.get('database'),
-        sql=dataset.sql,
+        sql=sql,
         limit=limit
     )
+
+def execute_query(db: Session, dataset_id: int, limit: int = 100, options: DatasetExecuteOptions | None = None) -> dict:
+    dataset = get_by_id(db, dataset_id)
+    if not dataset:
+        raise ValueError(f"Dataset with id {dataset_id} not found")
     
-    return datasource_service.execute_sql(request)
+    request = _build_execute_request(db, dataset, dataset.sql, limit)
+
+    if options and options.timeBucket:
+        # Push bucketing + aggregation down so the database returns one row per bucket
+        tb = options.timeBucket
+        try:
+            request.sql = sql_builder.build_time_bucket_sql(
+                request.type,
+                dataset.sql,
+                tb.column,
+                tb.unit,
+                [m.dict() for m in tb.metrics],
+                timezone=tb.timezone,
+                source_timezone=tb.sourceTimezone,
+                group_by=tb.groupBy
+            )
+        except ValueError as e:
+            return {"success": False, "message": str(e), "rows": []}
+        # One extra row tells whether the cap cut buckets off
+        request.limit = TIME_BUCKET_MAX_ROWS + 1
+
+    if options and options.downsample:
+        return _execute_downsampled(request, options.downsample)
+
+    result = datasource_service.execute_sql(request)
+
+    if options and options.timeBucket and result.get("success"):
+        result["truncated"] = len(result["rows"]) > TIME_BUCKET_MAX_ROWS
+        result["rows"] = result["rows"][:TIME_BUCKET_MAX_ROWS]
+
+    return result
+
+def _execute_downsampled(request: ExecuteSqlRequest, ds) -> dict:
+    """
+    Streams the full series (no preview LIMIT) and returns only the points LTTB/minmax
+    keep. Each batch is reduced to the x values and the y columns as float arrays
+    as it arrives, so the other columns of the result are never accumulated.
+    """
+    wanted = list(dict.fromkeys([ds.xColumn] + list(ds.yColumns)))
+    x_parts, y_parts, total, truncated = [], [[] for _ in ds.yColumns], 0, False
+    batches = datasource_service.iter_sql_chunks(request)
+    try:
+        for columns, batch in batches:
+            missing = [c for c in wanted if c not in columns]
+            if missing:
+                return {"success": False, "message": f"列不存在: {', '.join(missing)}", "rows": []}
+            if total + len(batch) > DOWNSAMPLE_MAX_ROWS:
+                truncated = True
+                batch = batch[:DOWNSAMPLE_MAX_ROWS - total]
+            x_index = columns.index(ds.xColumn)
+            x_parts.append(np.array([r[x_index] for r in batch], dtype=object))
+            for parts, col in zip(y_parts, ds.yColumns):
+                y_index = columns.index(col)
+                parts.append(numeric_series([r[y_index] for r in batch]))
+            total += len(batch)
+            if truncated:
+                break
+    except ValueError as e:
+        return {"success": False, "message": str(e), "rows": []}
+    except Exception as e:
+        msg = str(e)
+        if "ORA-01017" in msg:
+            msg = "Oracle 用户名或密码错误"
+        return {"success": False, "message": msg, "rows": []}
+    finally:
+        batches.close()
+
+    x = np.concatenate(x_parts) if x_parts else np.array([], dtype=object)
+    ys = {col: np.concatenate(parts) if parts else np.array([]) for col, parts in zip(ds.yColumns, y_parts)}
+    method = ds.method or "lttb"
+    target = ds.targetPoints or target_points_for_col_span(ds.colSpan)
+    keep = downsample_indices(x, list(ys.values()), target, method)
+    return {
+        "success": True,
+        "message": "OK",
+        "columns": wanted,
+        "rows": [
+            {ds.xColumn: x[i], **{col: _point_value(ys[col][i]) for col in ds.yColumns if col != ds.xColumn}}
+            for i in keep
+        ],
+        "downsampled": {"method": method, "originalRows": total, "returnedRows": len(keep)},
+        "truncated": truncated,
+    }
+
+def _point_value(value):
+    return None if np.isnan(value) else float(value)
+
+def get_execute_request(db: Session, dataset_id: int) -> tuple[Dataset, ExecuteSqlRequest]:
+    dataset = get_by_id(db, dataset_id)
+    if not dataset:
+        raise ValueError(f"Dataset with id {dataset_id} not found")
+    return dataset, _build_execute_request(db, dataset, dataset.sql)
+
+def _dataset_version(dataset: Dataset) -> str:
+    """Identifies the dataset content: results change only when the source or SQL do"""
+    return hashlib.sha256(f"{dataset.dataSourceId}:{dataset.sql}".encode("utf-8")).hexdigest()[:16]
+
+def _estimate_cardinality(request: ExecuteSqlRequest, sql: str, column: str) -> tuple[int, bool]:
+    """Returns (estimate, is_lower_bound) using the database's own HLL when available"""
+    approx_sql = sql_builder.build_approx_count_distinct_sql(request.type, sql, column)
+    if approx_sql:
+        result = datasource_service.execute_sql(request.copy(update={"sql": approx_sql, "limit": 1, "params": None}))
+        if result.get("success") and result["rows"]:
+            return int(list(result["rows"][0].values())[0] or 0), False
+
+    # Bounded probe: the database counts at most CARDINALITY_PROBE_MAX + 1 distinct
+    # values, enough to pick the widget, instead of shipping them all to Python
+    probe = request.copy(update={
+        "sql": sql_builder.build_distinct_count_probe_sql(request.type, sql, column),
+        "limit": 1,
+        "params": {"cap": CARDINALITY_PROBE_MAX + 1},
+    })
+    result = datasource_service.execute_sql(probe)
+    if not result.get("success") or not result["rows"]:
+        raise RuntimeError(result.get("message") or "cardinality probe failed")
+    count = int(list(result["rows"][0].values())[0] or 0)
+    if count > CARDINALITY_PROBE_MAX:
+        return CARDINALITY_PROBE_MAX, True
+    return count, False
+
+def get_column_values(db: Session, dataset_id: int, column: str, prefix: str | None = None, limit: int = 100) -> dict:
+    dataset = get_by_id(db, dataset_id)
+    if not dataset:
+        raise ValueError(f"Dataset with id {dataset_id} not found")
+
+    version = _dataset_version(dataset)
+    cache_key = (dataset_id, version, column, prefix or "", limit)
+    cached = _column_values_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Fetch one extra group to know whether the list is complete
+    request = _build_execute_request(db, dataset, dataset.sql, limit + 1)
+    try:
+        request.sql = sql_builder.build_distinct_values_sql(request.type, dataset.sql, column, with_prefix=bool(prefix))
+    except ValueError as e:
+        return {"success": False, "message": str(e), "values": []}
+    if prefix:
+        request.params = {"prefix": sql_builder.escape_like_prefix(prefix)}
+    result = datasource_service.execute_sql(request)
+    if not result.get("success"):
+        return result
+
+    value_key = result["columns"][0]
+    count_key = result["columns"][1]
+    values = [{"value": r[value_key], "count": r[count_key]} for r in result["rows"]]
+    truncated = len(values) > limit
+    values = values[:limit]
+
+    # Cardinality describes the whole column, so it is cached without the prefix
+    card_key = (dataset_id, version, column, "__cardinality__")
+    cardinality = _column_values_cache.get(card_key)
+    if cardinality is None:
+        if not truncated and not prefix:
+            cardinality = {"estimate": len(values), "exact": True, "lowerBound": False}
+        else:
+            estimate, lower_bound = _estimate_cardinality(request, dataset.sql, column)
+            cardinality = {"estimate": estimate, "exact": False, "lowerBound": lower_bound}
+        _column_values_cache.set(card_key, cardinality)
+
+    response = {
+        "success": True,
+        "message": "OK",
+        "column": column,
+        "values": values,
+        "truncated": truncated,
+        "cardinality": cardinality["estimate"],
+        "cardinalityExact": cardinality["exact"],
+        "widget": "dropdown" if cardinality["estimate"] <= DROPDOWN_MAX_VALUES else "search",
+        "version": version,
+    }
+    _column_values_cache.set(cache_key, response)
+    return response
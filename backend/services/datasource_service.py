@@ -1,9 +1,16 @@
-from sqlalchemy import create_engine, text, inspect
-from sqlalchemy.orm import Session
-from backend.schemas.base import ExecuteSqlRequest, PreviewTableRequest, TestConnectionRequest, ConnectionTestResult, DataSourceBase
+from sqlalchemy import create_engine, text, inspect, select, func
+from sqlalchemy.orm import Session, load_only, selectinload, undefer_group
+from backend.schemas.base import ExecuteSqlRequest, PreviewTableRequest, TestConnectionRequest, ConnectionTestResult, DataSourceBase, Column, TableEntryPatch, ColumnPatch
 from backend.models.orm import DataSource, TableEntry
+import backend.services.version_service as version_service
+import backend.services.search_service as search_service
+import backend.services.prompt_context_service as prompt_context_service
+import backend.services.column_dictionary_service as column_dictionary_service
+from backend.utils.cache import TTLCache
 import pandas as pd
+import hashlib
 import json
+import os
 
 def _simplify_text(text: str) -> str:
     """Helper to extract simple text from potential JSON string"""
@@ -49,6 +56,38 @@ def _generate_simple_annotation(table_name: str, table_desc: str, columns: list)
         
     return "\n".join(lines)
 
+_simple_annotation_cache = TTLCache(
+    maxsize=int(os.getenv("SIMPLE_ANNOTATION_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("SIMPLE_ANNOTATION_CACHE_TTL", "3600"))
+)
+
+def _annotation_inputs(table_name: str, table_desc: str, columns: list) -> list:
+    return [table_name, table_desc, [[c.name, c.alias, c.type, c.description] for c in columns]]
+
+def _simple_annotation(table_name: str, table_desc: str, columns: list) -> str:
+    """_generate_simple_annotation memoized by the hash of its inputs"""
+    key = _hash_json(_annotation_inputs(table_name, table_desc, columns))
+    cached = _simple_annotation_cache.get(key)
+    if cached is None:
+        cached = _generate_simple_annotation(table_name, table_desc, columns)
+        _simple_annotation_cache.set(key, cached)
+    return cached
+
+def _hash_json(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+def _table_content_hash(table_name: str, table_desc: str, columns: list, rows) -> str:
+    """Hash over everything a table save writes; equal hashes mean the row can be skipped"""
+    return _hash_json(_annotation_inputs(table_name, table_desc, columns) + [rows or []])
+
+def _apply_table_content(db_table: TableEntry, table_name: str, table_desc: str, columns: list, rows):
+    db_table.name = table_name
+    db_table.description = table_desc
+    db_table.simple_description = _simple_annotation(table_name, table_desc, columns)
+    db_table.columns = [c.dict() for c in columns]
+    db_table.rows = rows
+    db_table.content_hash = _table_content_hash(table_name, table_desc, columns, rows)
+
 def _get_connection_url(type, user, password, host, port, database=None, serviceName=None):
     password = password or ""
     if type == 'mysql':
@@ -67,6 +106,29 @@ def _get_connect_args(type):
         return {'connect_timeout': 10}
     return {}
 
+def _check_sql_safety(sql: str) -> str | None:
+    """Returns an error message if the SQL contains a forbidden (write/DDL) keyword"""
+    forbidden_keywords = ["DROP ", "DELETE ", "TRUNCATE ", "ALTER ", "UPDATE ", "INSERT ", "GRANT ", "REVOKE "]
+    upper_sql = sql.upper()
+    for kw in forbidden_keywords:
+        if kw in upper_sql:
+            return f"为了安全起见，禁止执行 {kw.strip()} 操作"
+    return None
+
+def _strip_sql(sql: str) -> str:
+    sql = sql.strip()
+    if sql.endswith(';'):
+        sql = sql[:-1]
+    return sql
+
+def _normalize_value(val):
+    if isinstance(val, bytes):
+        try:
+            return val.decode('utf-8')
+        except:
+            return str(val)
+    return val
+
 def test_connection(request: TestConnectionRequest) -> ConnectionTestResult:
     try:
         url = _get_connection_url(request.type, request.username, request.password, request.host, request.port, request.database, request.serviceName)
@@ -195,11 +257,11 @@ def execute_sql(request: ExecuteSqlRequest) -> dict:
     limit = request.limit or 100
 
     # Basic safety check: prevent obviously dangerous commands
-    forbidden_keywords = ["DROP ", "DELETE ", "TRUNCATE ", "ALTER ", "UPDATE ", "INSERT ", "GRANT ", "REVOKE "]
-    upper_sql = sql.upper()
-    for kw in forbidden_keywords:
-        if kw in upper_sql:
-             return {"success": False, "message": f"为了安全起见，禁止执行 {kw.strip()} 操作", "rows": []}
+    forbidden_message = _check_sql_safety(sql)
+    if forbidden_message:
+        return {"success": False, "message": forbidden_message, "rows": []}
+
+    from backend.services.sql_estimate_service import check_guard
 
     try:
         url = _get_connection_url(db_type, user, password, host, port, request.database, request.serviceName)
@@ -231,6 +293,17 @@ def execute_sql(request: ExecuteSqlRequest) -> dict:
         else:
              return {"success": False, "message": f"Unsupported database type: {db_type}", "rows": []}
 
+        if request.params:
+            # :lim is the preview cap; a caller's value would silently lift it
+            if "lim" in request.params:
+                return {"success": False, "message": "参数名 lim 为预览行数保留，请改用其他参数名", "rows": []}
+            params = {**request.params, "lim": limit}
+
+        # Estimate what actually runs: the preview LIMIT keeps large tables cheap
+        tripped = check_guard(request, wrapped_sql, params)
+        if tripped and tripped["guard"]["action"] == "block":
+            return {"success": False, "message": f"查询代价过高，已拦截：{tripped['guard']['message']}", "rows": [], "estimate": tripped}
+
         engine = create_engine(url, connect_args=connect_args)
         
         rows = []
@@ -243,16 +316,14 @@ def execute_sql(request: ExecuteSqlRequest) -> dict:
             for r in result.fetchall():
                 row_dict = {}
                 for i, col in enumerate(columns):
-                    val = r[i]
-                    if isinstance(val, bytes):
-                        try:
-                            val = val.decode('utf-8')
-                        except:
-                            val = str(val)
-                    row_dict[col] = val
+                    row_dict[col] = _normalize_value(r[i])
                 rows.append(row_dict)
                 
-        return {"success": True, "message": "OK", "rows": rows, "columns": column_names}
+        result = {"success": True, "message": "OK", "rows": rows, "columns": column_names}
+        if tripped:
+            result["warning"] = tripped["guard"]["message"]
+            result["estimate"] = tripped
+        return result
             
     except Exception as e:
         msg = str(e)
@@ -260,8 +331,83 @@ def execute_sql(request: ExecuteSqlRequest) -> dict:
             msg = "Oracle 用户名或密码错误"
         return {"success": False, "message": msg, "rows": []}
 
+def iter_sql_chunks(request: ExecuteSqlRequest, chunk_size: int = 5000):
+    """
+    Runs the SQL without the preview LIMIT and yields (columns, rows) batches
+    from a server-side cursor, so callers can stream arbitrarily large results
+    with constant memory. Always yields at least one batch (possibly empty).
+    """
+    forbidden_message = _check_sql_safety(request.sql)
+    if forbidden_message:
+        raise ValueError(forbidden_message)
+
+    from backend.services.sql_estimate_service import check_guard
+    tripped = check_guard(request)  # unlimited: exports read every row
+    if tripped and tripped["guard"]["action"] == "block":
+        raise ValueError(f"查询代价过高，已拦截：{tripped['guard']['message']}")
+
+    url = _get_connection_url(request.type, request.username, request.password, request.host, request.port, request.database, request.serviceName)
+    engine = create_engine(url, connect_args=_get_connect_args(request.type))
+    try:
+        with engine.connect() as conn:
+            # stream_results -> psycopg2 named cursor / pymysql SSCursor / oracledb arraysize fetches
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(text(_strip_sql(request.sql)), request.params or {})
+            columns = list(result.keys())
+            emitted = False
+            for partition in result.partitions(chunk_size):
+                emitted = True
+                yield columns, [[_normalize_value(v) for v in r] for r in partition]
+            if not emitted:
+                yield columns, []
+    finally:
+        engine.dispose()
+
+def _with_tables(query):
+    # Full payload: tables in one SELECT ... IN with their deferred columns/rows
+    return query.options(selectinload(DataSource.tables).undefer_group("payload"))
+
 def get_all(db: Session):
-    return db.query(DataSource).all()
+    return _with_tables(db.query(DataSource)).all()
+
+def get_by_id(db: Session, datasource_id: int):
+    return _with_tables(db.query(DataSource)).filter(DataSource.id == datasource_id).first()
+
+def get_summaries(db: Session, skip: int = 0, limit: int = 50, include_tables: bool = False):
+    """
+    Paginated list without the per-table columns/rows JSON, which dominates the
+    full payload. Table counts come from a correlated subquery.
+    """
+    table_count = (
+        select(func.count(TableEntry.id))
+        .where(TableEntry.dataSourceId == DataSource.id)
+        .correlate(DataSource)
+        .scalar_subquery()
+    )
+    query = db.query(DataSource, table_count).options(
+        load_only(DataSource.id, DataSource.name, DataSource.description, DataSource.config)
+    )
+    if include_tables:
+        query = query.options(
+            selectinload(DataSource.tables).load_only(TableEntry.id, TableEntry.name, TableEntry.description)
+        )
+
+    total = db.query(func.count(DataSource.id)).scalar()
+    rows = query.order_by(DataSource.id).offset(skip).limit(limit).all()
+
+    items = []
+    for ds, count in rows:
+        item = {
+            "id": ds.id,
+            "name": ds.name,
+            "description": ds.description,
+            "type": (ds.config or {}).get("type"),
+            "tableCount": count or 0,
+        }
+        if include_tables:
+            item["tables"] = [{"id": t.id, "name": t.name, "description": t.description} for t in ds.tables]
+        items.append(item)
+
+    return {"items": items, "total": total, "skip": skip, "limit": limit}
 
 def create(db: Session, datasource: DataSourceBase):
     # Convert Pydantic model to DB model
@@ -276,18 +422,17 @@ def create(db: Session, datasource: DataSourceBase):
     
     # We can add tables directly to relationship, SQLAlchemy handles IDs
     for table in datasource.tables:
-        db_table = TableEntry(
-            name=table.name,
-            description=table.description,
-            simple_description=_generate_simple_annotation(table.name, table.description, table.columns),
-            columns=[c.dict() for c in table.columns],
-            rows=table.rows
-        )
+        db_table = TableEntry()
+        _apply_table_content(db_table, table.name, table.description, table.columns, table.rows)
         db_datasource.tables.append(db_table)
         
+    column_dictionary_service.learn_tables(db, [(t.columns, []) for t in datasource.tables])
+    db.flush()
+    search_service.sync(db, "table", [t.id for t in db_datasource.tables])
+    version_service.bump(db, "datasource", db_datasource.id)
     db.commit()
-    db.refresh(db_datasource)
-    return db_datasource
+    prompt_context_service.invalidate(db, db_datasource.id)
+    return get_by_id(db, db_datasource.id)
 
 def update(db: Session, datasource_id: int, datasource: DataSourceBase):
     print(f"[Update] Updating datasource {datasource_id}")
@@ -301,8 +446,14 @@ def update(db: Session, datasource_id: int, datasource: DataSourceBase):
     db_ds.config = datasource.config.dict()
     
     # Smart update for tables to preserve IDs and avoid duplicates
-    # 1. Fetch existing tables
-    existing_tables = db.query(TableEntry).filter(TableEntry.dataSourceId == datasource_id).all()
+    # 1. Fetch existing tables. Only the hash is needed to detect changes, so the
+    #    columns/rows JSON stays deferred and is never read back.
+    existing_tables = (
+        db.query(TableEntry)
+        .options(load_only(TableEntry.id, TableEntry.name, TableEntry.content_hash))
+        .filter(TableEntry.dataSourceId == datasource_id)
+        .all()
+    )
     print(f"[Update] Found {len(existing_tables)} existing tables for DS {datasource_id}")
     
     existing_map_by_id = {t.id: t for t in existing_tables}
@@ -310,6 +461,10 @@ def update(db: Session, datasource_id: int, datasource: DataSourceBase):
     
     # Track which existing tables are kept/updated
     processed_ids = set()
+    unchanged = 0
+    written = [] # Updated or inserted tables, re-indexed for search
+    learned = [] # (new columns, previous columns) per written table, for the column dictionary
+    changed = [] # (existing table, incoming data) whose hash differs
     
     for table_data in datasource.tables:
         # Try to find existing table by ID first (handle if ID is string/int/None)
@@ -328,45 +483,113 @@ def update(db: Session, datasource_id: int, datasource: DataSourceBase):
             db_table = existing_map_by_name.get(table_data.name)
             if db_table:
                 print(f"[Update] Table match by NAME: '{table_data.name}' (ID mismatch: incoming={table_data.id}, existing={db_table.id})")
-        else:
-            print(f"[Update] Table match by ID: '{table_data.id}' (name: {table_data.name})")
             
+        content_hash = _table_content_hash(table_data.name, table_data.description, table_data.columns, table_data.rows)
         if db_table:
-            # Update existing
-            db_table.name = table_data.name
-            db_table.description = table_data.description
-            db_table.simple_description = _generate_simple_annotation(table_data.name, table_data.description, table_data.columns)
-            db_table.columns = [c.dict() for c in table_data.columns]
-            db_table.rows = table_data.rows
             processed_ids.add(db_table.id)
+            if db_table.content_hash == content_hash:
+                unchanged += 1
+                continue
+            changed.append((db_table, table_data))
         else:
             # Insert new
             print(f"[Update] Inserting NEW table: '{table_data.name}'")
-            db_table = TableEntry(
-                name=table_data.name,
-                description=table_data.description,
-                simple_description=_generate_simple_annotation(table_data.name, table_data.description, table_data.columns),
-                columns=[c.dict() for c in table_data.columns],
-                rows=table_data.rows,
-                dataSourceId=datasource_id
-            )
+            db_table = TableEntry(dataSourceId=datasource_id)
+            _apply_table_content(db_table, table_data.name, table_data.description, table_data.columns, table_data.rows)
             db.add(db_table)
+            written.append(db_table)
+            learned.append((table_data.columns, []))
+
+    # Update existing. Only changed tables have their old columns read, in batches,
+    # so re-saving an annotation the dictionary already counted doesn't vote again.
+    for start in range(0, len(changed), 500):
+        batch = changed[start:start + 500]
+        previous = dict(db.execute(
+            select(TableEntry.id, TableEntry.columns).where(TableEntry.id.in_([t.id for t, _ in batch]))
+        ).all())
+        for db_table, table_data in batch:
+            learned.append((table_data.columns, previous.get(db_table.id) or []))
+            _apply_table_content(db_table, table_data.name, table_data.description, table_data.columns, table_data.rows)
+            written.append(db_table)
             
     # Delete tables that are no longer present
+    deleted_ids = []
     for t in existing_tables:
         if t.id not in processed_ids:
             print(f"[Update] Deleting orphaned table: '{t.name}' (ID: {t.id})")
+            deleted_ids.append(t.id)
             db.delete(t)
             
+    column_dictionary_service.learn_tables(db, learned)
+    db.flush()
+    search_service.sync(db, "table", [t.id for t in written] + deleted_ids)
+    version_service.bump(db, "datasource", datasource_id)
     db.commit()
-    db.refresh(db_ds)
-    print(f"[Update] Successfully updated datasource {datasource_id}")
-    return db_ds
+    prompt_context_service.invalidate(db, datasource_id)
+    print(f"[Update] Successfully updated datasource {datasource_id} ({unchanged} tables unchanged)")
+    return get_by_id(db, datasource_id)
+
+def _find_table(db: Session, datasource_id: int, table_id: int):
+    return db.query(TableEntry).filter(TableEntry.id == table_id, TableEntry.dataSourceId == datasource_id).first()
+
+def patch_table(db: Session, datasource_id: int, table_id: int, patch: TableEntryPatch, learn: bool = True):
+    """
+    Updates only the given fields of one table instead of rewriting the whole
+    datasource. learn=False for annotations written by the machine (dictionary or
+    LLM), which must not vote in the column dictionary.
+    """
+    db_table = _find_table(db, datasource_id, table_id)
+    if not db_table:
+        return None
+
+    data = patch.dict(exclude_unset=True)
+    name = data.get("name") or db_table.name
+    description = data.get("description", db_table.description)
+    columns = patch.columns if patch.columns is not None else [Column(**c) for c in db_table.columns or []]
+    rows = data.get("rows", db_table.rows)
+
+    if _table_content_hash(name, description, columns, rows) != db_table.content_hash:
+        if learn:
+            column_dictionary_service.learn(db, columns, db_table.columns)
+        _apply_table_content(db_table, name, description, columns, rows)
+        search_service.sync(db, "table", [table_id])
+        version_service.bump(db, "datasource", datasource_id)
+        db.commit()
+        prompt_context_service.invalidate(db, datasource_id)
+        db.refresh(db_table)
+    return db_table
+
+def patch_column(db: Session, datasource_id: int, table_id: int, column_name: str, patch: ColumnPatch):
+    """Updates alias/description/type of a single column"""
+    db_table = _find_table(db, datasource_id, table_id)
+    if not db_table:
+        return None
+
+    columns = [Column(**c) for c in db_table.columns or []]
+    target = next((c for c in columns if c.name == column_name), None)
+    if target is None:
+        return None
+    for key, value in patch.dict(exclude_unset=True).items():
+        setattr(target, key, value)
+
+    if _table_content_hash(db_table.name, db_table.description, columns, db_table.rows) != db_table.content_hash:
+        column_dictionary_service.learn(db, [target], [c for c in db_table.columns or [] if c.get("name") == column_name])
+        _apply_table_content(db_table, db_table.name, db_table.description, columns, db_table.rows)
+        search_service.sync(db, "table", [table_id])
+        version_service.bump(db, "datasource", datasource_id)
+        db.commit()
+        prompt_context_service.invalidate(db, datasource_id)
+        db.refresh(db_table)
+    return db_table
 
 def delete(db: Session, datasource_id: int):
     db_obj = db.query(DataSource).filter(DataSource.id == datasource_id).first()
     if not db_obj:
         return False
+    table_ids = [row[0] for row in db.query(TableEntry.id).filter(TableEntry.dataSourceId == datasource_id)]
     db.delete(db_obj)
+    search_service.sync(db, "table", table_ids)
+    version_service.bump(db, "datasource", datasource_id)
     db.commit()
+    prompt_context_service.invalidate(db, datasource_id)
     return True
@@ -0,0 +1,189 @@
+from typing import Iterable, Iterator, List, Tuple
+from backend.db.session import DATA_DIR
+import csv
+import io
+import os
+import tempfile
+import time
+import zlib
+import hashlib
+
+EXPORT_DIR = os.path.join(DATA_DIR, "exports")
+EXPORT_CHUNK_SIZE = int(os.getenv("DATASET_EXPORT_CHUNK_SIZE", "5000"))
+# Stored exports are reused for this long so interrupted downloads can resume with Range
+EXPORT_TTL_SECONDS = int(os.getenv("DATASET_EXPORT_TTL", "3600"))
+XLSX_MAX_ROWS = 1048576
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+Batch = Tuple[List[str], List[list]]
+
+def csv_chunks(batches: Iterable[Batch]) -> Iterator[bytes]:
+    """Encodes (columns, rows) batches as CSV, one chunk per batch"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    header_written = False
+    for columns, rows in batches:
+        if not header_written:
+            # BOM so Excel opens Chinese content as UTF-8
+            buf.write("\ufeff")
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        data = buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+        if data:
+            yield data.encode("utf-8")
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Streams chunks through a single gzip member"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+def _write_xlsx(path: str, batches: Iterable[Batch]):
+    try:
+        from openpyxl import Workbook  # type: ignore
+    except Exception:
+        raise ValueError("导出 Excel 需要安装 openpyxl")
+
+    # write_only mode keeps memory flat regardless of row count
+    wb = Workbook(write_only=True)
+    ws = None
+    sheet_rows = 0
+
+    def new_sheet(columns):
+        sheet = wb.create_sheet(title=f"Sheet{len(wb.worksheets) + 1}")
+        sheet.append(columns)
+        return sheet
+
+    for columns, rows in batches:
+        if ws is None:
+            # Header-only sheet for an empty result
+            ws, sheet_rows = new_sheet(columns), 1
+        for row in rows:
+            # Roll over to a new sheet at Excel's per-sheet row limit
+            if sheet_rows >= XLSX_MAX_ROWS:
+                ws, sheet_rows = new_sheet(columns), 1
+            ws.append(row)
+            sheet_rows += 1
+    wb.save(path)
+
+def _arrow_column(pa, values: list):
+    """Inferred Arrow array; values of mixed types fall back to strings"""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+def _widen(pa, current, incoming):
+    """Schema able to hold both: ints and floats become float64, other conflicts string"""
+    fields = []
+    for field in current:
+        other = incoming.field(field.name).type if field.name in incoming.names else pa.null()
+        if other == field.type or pa.types.is_null(other):
+            fields.append(field)
+        elif pa.types.is_integer(field.type) and pa.types.is_integer(other):
+            fields.append(pa.field(field.name, pa.int64()))
+        elif (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)) and \
+                (pa.types.is_integer(other) or pa.types.is_floating(other)):
+            fields.append(pa.field(field.name, pa.float64()))
+        else:
+            fields.append(pa.field(field.name, pa.string()))
+    return pa.schema(fields)
+
+def _write_parquet(path: str, batches: Iterable[Batch]):
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+    except Exception:
+        raise ValueError("导出 Parquet 需要安装 pyarrow")
+
+    writer = None
+    try:
+        for columns, rows in batches:
+            table = pa.table({col: _arrow_column(pa, [r[i] for r in rows]) for i, col in enumerate(columns)})
+            if writer is None:
+                # Columns that are all NULL in the first batch have no usable type yet
+                schema = pa.schema([
+                    pa.field(f.name, pa.string() if pa.types.is_null(f.type) else f.type)
+                    for f in table.schema
+                ])
+                writer = pq.ParquetWriter(path, schema, compression="zstd")
+            else:
+                schema = _widen(pa, writer.schema, table.schema)
+                if schema != writer.schema:
+                    # A later batch disagrees with the types guessed so far (NULLs then
+                    # ints, ints then floats): rewrite what was written with the wider types
+                    writer.close()
+                    written = f"{path}.widen"
+                    os.replace(path, written)
+                    writer = pq.ParquetWriter(path, schema, compression="zstd")
+                    try:
+                        for batch in pq.ParquetFile(written).iter_batches():
+                            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+                    finally:
+                        os.remove(written)
+            writer.write_table(table.cast(writer.schema))
+    except pa.ArrowException as e:
+        raise ValueError(f"导出 Parquet 失败：{e}")
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export_file_path(dataset_id: int, sql: str, fmt: str, compress: bool) -> str:
+    digest = hashlib.sha256(sql.encode("utf-8")).hexdigest()[:16]
+    ext = EXPORT_FORMATS[fmt][1] + (".gz" if compress else "")
+    return os.path.join(EXPORT_DIR, f"dataset-{dataset_id}-{digest}.{ext}")
+
+def is_fresh(path: str) -> bool:
+    return os.path.exists(path) and time.time() - os.path.getmtime(path) < EXPORT_TTL_SECONDS
+
+def prune_expired():
+    """Deletes stored exports (and temp files of crashed writers) past EXPORT_TTL_SECONDS"""
+    cutoff = time.time() - EXPORT_TTL_SECONDS
+    with os.scandir(EXPORT_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # removed by a concurrent request
+
+def build_export_file(path: str, fmt: str, compress: bool, batches: Iterable[Batch]) -> str:
+    """
+    Writes the export to a stored file (atomically) so it can be served with Range
+    support and reused by resumed downloads while it is fresh. Each call writes its
+    own temp file, so concurrent requests for the same export never share one.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    prune_expired()
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        if fmt == "csv":
+            chunks = csv_chunks(batches)
+            if compress:
+                chunks = gzip_chunks(chunks)
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        elif fmt == "xlsx":
+            _write_xlsx(tmp_path, batches)
+        elif fmt == "parquet":
+            _write_parquet(tmp_path, batches)
+        else:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
@@ -0,0 +1,184 @@
+"""
+Long-lived HTTP clients for the LLM providers. Each provider gets one pooled,
+keep-alive client (requests.Session or OpenAI SDK client), created on first use
+and shared by all request threads, so calls after the first skip DNS/TCP/TLS setup.
+"""
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+import json
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from starlette.concurrency import iterate_in_threadpool
+
+logger = logging.getLogger("llm_client")
+
+POOL_MAXSIZE = int(os.getenv("LLM_HTTP_POOL_MAXSIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("LLM_HTTP_READ_TIMEOUT", "120"))
+RETRIES = int(os.getenv("LLM_HTTP_RETRIES", "2"))
+BACKOFF = float(os.getenv("LLM_HTTP_BACKOFF", "0.5"))
+
+_sessions: Dict[str, requests.Session] = {}
+_openai_clients: Dict[Tuple[str, str, str], Any] = {}
+_async_openai_clients: Dict[Tuple[str, str, str], Any] = {}
+_lock = threading.Lock()
+
+def timeouts(read_timeout: Optional[float] = None) -> Tuple[float, float]:
+    """(connect, read) tuple for requests"""
+    return (CONNECT_TIMEOUT, read_timeout or READ_TIMEOUT)
+
+def _retry_policy(retries: int, backoff: float) -> Retry:
+    # POST is retried too: these are idempotent completions, and 429/5xx are common on the shared endpoints.
+    # Read timeouts are not: a stalled provider would otherwise hold the request for (retries + 1) x READ_TIMEOUT
+    return Retry(
+        total=retries,
+        read=0,
+        connect=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["POST"]),
+        raise_on_status=False,
+    )
+
+def get_session(provider: str, retries: Optional[int] = None, backoff: Optional[float] = None) -> requests.Session:
+    """Pooled keep-alive session for a provider; retry settings apply when it is first created"""
+    session = _sessions.get(provider)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(provider)
+        if session is None:
+            adapter = HTTPAdapter(
+                pool_connections=POOL_MAXSIZE,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=_retry_policy(RETRIES if retries is None else retries, BACKOFF if backoff is None else backoff),
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[provider] = session
+            logger.info(f"LLM_HTTP_POOL provider={provider} maxsize={POOL_MAXSIZE}")
+        return session
+
+def get_openai_client(provider: str, base_url: str, api_key: str, read_timeout: Optional[float] = None):
+    """Shared OpenAI SDK client (its httpx pool) per provider/endpoint/key"""
+    key = (provider, base_url, api_key)
+    client = _openai_clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            import httpx  # installed with the openai SDK
+            from openai import OpenAI
+            client = OpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                max_retries=RETRIES,
+                timeout=httpx.Timeout(read_timeout or READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_MAXSIZE)
+                ),
+            )
+            _openai_clients[key] = client
+        return client
+
+def get_async_openai_client(provider: str, base_url: str, api_key: str, read_timeout: Optional[float] = None):
+    """Shared AsyncOpenAI client per provider/endpoint/key, for streaming"""
+    key = (provider, base_url, api_key)
+    client = _async_openai_clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _async_openai_clients.get(key)
+        if client is None:
+            import httpx
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                max_retries=RETRIES,
+                timeout=httpx.Timeout(read_timeout or READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_MAXSIZE)
+                ),
+            )
+            _async_openai_clients[key] = client
+        return client
+
+def _async_sdk_available() -> bool:
+    try:
+        import httpx  # noqa: F401
+        from openai import AsyncOpenAI  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+def _iter_sse_deltas(provider: str, url: str, api_key: str, payload: Dict[str, Any], read_timeout: Optional[float]) -> Iterator[str]:
+    """Blocking fallback: streams an OpenAI-compatible completion over the pooled session"""
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json", "Accept": "text/event-stream"}
+    resp = get_session(provider).post(url, json=payload, headers=headers, stream=True, timeout=timeouts(read_timeout))
+    try:
+        resp.raise_for_status()
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or []
+            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+            if delta:
+                yield delta
+    finally:
+        resp.close()
+
+async def stream_chat(provider: str, base_url: str, api_key: str, payload: Dict[str, Any],
+                      read_timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Yields the content deltas of a streamed chat completion. Uses the AsyncOpenAI
+    client when the SDK is installed, otherwise the pooled requests session read
+    from the threadpool.
+    """
+    payload = dict(payload)
+    extra_body = payload.pop("extra_body", None) or {}
+    if _async_sdk_available():
+        client = get_async_openai_client(provider, base_url, api_key, read_timeout)
+        stream = await client.chat.completions.create(**payload, stream=True, extra_body=extra_body or None)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        return
+    url = base_url.rstrip("/") + "/chat/completions"
+    deltas = _iter_sse_deltas(provider, url, api_key, {**payload, **extra_body, "stream": True}, read_timeout)
+    async for delta in iterate_in_threadpool(deltas):
+        yield delta
+
+async def aclose_all() -> None:
+    """Closes the async clients; the sync pools are closed by close_all()"""
+    with _lock:
+        clients = list(_async_openai_clients.values())
+        _async_openai_clients.clear()
+    for client in clients:
+        try:
+            await client.close()
+        except Exception:
+            pass
+
+def close_all() -> None:
+    """Closes every pooled client; called on application shutdown"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        for client in _openai_clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _sessions.clear()
+        _openai_clients.clear()
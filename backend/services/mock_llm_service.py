@@ -0,0 +1,133 @@
+"""
+Local stand-in for the LLM providers (AI_PROVIDER=mock), for load tests and
+benchmarks without an API key. Answers are derived from the prompt only, so the
+same request always gets the same, schema-valid response; latency and errors are
+drawn from a seeded random sequence so runs are reproducible.
+
+    MOCK_LLM_LATENCY     time to first token in ms: "fixed:200", "uniform:100,500",
+                         "normal:300,50" or "lognormal:300,0.6" (median, sigma)
+    MOCK_LLM_TOKEN_MS    delay between streamed chunks (also added to non-streaming calls)
+    MOCK_LLM_CHUNK_CHARS characters per streamed chunk
+    MOCK_LLM_ERROR_RATE  probability (0-1) that a call fails
+    MOCK_LLM_SEED        seed of the latency / error sequence
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+DEFAULT_MODEL = "mock"
+LATENCY = os.getenv("MOCK_LLM_LATENCY", "fixed:0")
+TOKEN_MS = float(os.getenv("MOCK_LLM_TOKEN_MS", "0"))
+CHUNK_CHARS = int(os.getenv("MOCK_LLM_CHUNK_CHARS", "4"))
+ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+SEED = int(os.getenv("MOCK_LLM_SEED", "0"))
+
+logger = logging.getLogger("llm_client")
+
+_rng = random.Random(SEED)
+_rng_lock = threading.Lock()
+
+def reseed(seed: int = SEED) -> None:
+    with _rng_lock:
+        _rng.seed(seed)
+
+def parse_latency(spec: str) -> Tuple[str, List[float]]:
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+    if kind not in expected or len(values) != expected[kind]:
+        raise ValueError(f"Invalid MOCK_LLM_LATENCY '{spec}'")
+    return kind, values
+
+def _draw(spec: str) -> Tuple[float, bool]:
+    """(latency in seconds, whether to fail) for the next call"""
+    kind, values = parse_latency(spec)
+    with _rng_lock:
+        if kind == "fixed":
+            ms = values[0]
+        elif kind == "uniform":
+            ms = _rng.uniform(values[0], values[1])
+        elif kind == "normal":
+            ms = _rng.gauss(values[0], values[1])
+        else:
+            ms = _rng.lognormvariate(0, values[1]) * values[0]
+        failed = _rng.random() < ERROR_RATE
+    return max(ms, 0) / 1000, failed
+
+def _prompt(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, list):
+            content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+        parts.append(str(content or ""))
+    return "\n".join(parts)
+
+def _quoted(text: str, marker: str) -> str:
+    match = re.search(r'%s: "([^"]*)"' % marker, text) or re.search(r"%s: (.*)" % marker, text)
+    return match.group(1).strip() if match else ""
+
+def _annotations(table: str, columns_text: str) -> List[Dict[str, str]]:
+    columns = re.findall(r"'name': '([^']+)'", columns_text)
+    return [{"columnName": c, "alias": f"{c}字段", "description": f"{table}.{c} 的模拟说明"} for c in columns]
+
+def respond(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> Dict[str, Any]:
+    """The mock answer for a prompt, shaped like the real providers' JSON for `schema_hint`"""
+    prompt = _prompt(messages)
+    if schema_hint == "table_selection":
+        ids = [int(i) for i in re.findall(r"ID: (\d+),", prompt)]
+        return {"relevant_table_ids": ids[:3]}
+    if schema_hint == "dataset_sql":
+        tables = re.findall(r"^TABLE (\S+)", prompt, re.M)
+        query = _quoted(prompt, "User Request")
+        if not tables:
+            return {"sql": "SELECT 1 FROM DUAL", "explanation": f"模拟结果：没有可用的表（{query}）"}
+        sql = f"SELECT * FROM {tables[0]}"
+        for i, name in enumerate(tables[1:], start=1):
+            sql += f" CROSS JOIN {name} t{i}"
+        return {"sql": sql, "explanation": f"模拟结果：从 {', '.join(tables)} 查询（{query}）"}
+    if schema_hint == "table_annotations":
+        return {"annotations": _annotations(_quoted(prompt, "Table Name"), prompt.split("Columns:", 1)[-1])}
+    if schema_hint == "table_annotations_batch":
+        blocks = re.findall(r"Table Name: (.*)\n(?:.*\n)*?Columns: (.*)", prompt)
+        return {"tables": [{"tableName": name.strip(), "annotations": _annotations(name.strip(), cols)} for name, cols in blocks]}
+    if schema_hint == "data_insight":
+        return {"explanation": f"模拟分析：{_quoted(prompt, 'User Query')}"}
+    if schema_hint == "chart_template":
+        return {"name": "模拟图表", "description": _quoted(prompt, "Description"), "type": "bar", "customSpec": None}
+    if schema_hint == "web_component":
+        return {
+            "name": "模拟组件",
+            "description": _quoted(prompt, "Description"),
+            "code": "const MockComponent = ({ data }) => <div className=\"p-4\">{JSON.stringify(data)}</div>; return MockComponent;",
+        }
+    return {"content": prompt[-200:]}
+
+def _chunks(text: str) -> List[str]:
+    return [text[i:i + CHUNK_CHARS] for i in range(0, len(text), CHUNK_CHARS)] or [""]
+
+def call_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> Dict[str, Any]:
+    logger.info(f"LLM_REQUEST provider=mock messages={len(messages)} schema={schema_hint or ''}")
+    latency, failed = _draw(LATENCY)
+    result = respond(messages, schema_hint)
+    time.sleep(latency + TOKEN_MS / 1000 * len(_chunks(json.dumps(result, ensure_ascii=False))))
+    if failed:
+        return {"error": "Mock LLM injected error"}
+    return result
+
+async def stream_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> AsyncIterator[str]:
+    logger.info(f"LLM_STREAM provider=mock messages={len(messages)} schema={schema_hint or ''}")
+    latency, failed = _draw(LATENCY)
+    await asyncio.sleep(latency)
+    if failed:
+        raise RuntimeError("Mock LLM injected error")
+    for i, chunk in enumerate(_chunks(json.dumps(respond(messages, schema_hint), ensure_ascii=False))):
+        if i and TOKEN_MS:
+            await asyncio.sleep(TOKEN_MS / 1000)
+        yield chunk
@@ -1,8 +1,9 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 import os
 import logging
 import time
 import json
+from backend.services import llm_http
 
 MODELSCOPE_BASE_URL = os.getenv("MODELSCOPE_API_URL", "https://api-inference.modelscope.cn/v1")
 DEFAULT_MODEL = os.getenv("MODESCOPE_MODEL", "")
@@ -18,13 +19,11 @@ if not logger.handlers:
     logger.addHandler(_h)
 
 try:
-    from openai import OpenAI  # type: ignore
+    from openai import OpenAI  # type: ignore  # noqa: F401
     _OPENAI_AVAILABLE = True
 except Exception:
     _OPENAI_AVAILABLE = False
-    import requests
-    from requests.adapters import HTTPAdapter
-    from urllib3.util import Retry
+    # Settings for the HTTP fallback's pooled session
     READ_TIMEOUT = int(os.getenv("MODELSCOPE_TIMEOUT", os.getenv("SILICONFLOW_TIMEOUT", "40")))
     RETRIES = int(os.getenv("MODELSCOPE_RETRIES", os.getenv("SILICONFLOW_RETRIES", "2")))
     BACKOFF = float(os.getenv("MODELSCOPE_BACKOFF", os.getenv("SILICONFLOW_BACKOFF", "0.5")))
@@ -38,7 +37,7 @@ def call_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None)
         # Avoid logging full message content which may contain base64 images
         logger.info(f"LLM_REQUEST provider=modelscope base_url={MODELSCOPE_BASE_URL} model={DEFAULT_MODEL} messages_count={len(messages)} schema={schema_hint or ''}")
         if _OPENAI_AVAILABLE:
-            client = OpenAI(base_url=MODELSCOPE_BASE_URL, api_key=API_KEY)
+            client = llm_http.get_openai_client("modelscope", MODELSCOPE_BASE_URL, API_KEY)
             resp = client.chat.completions.create(
                 model=DEFAULT_MODEL,
                 messages=messages,
@@ -59,21 +58,8 @@ def call_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None)
                 "stream": False,
                 "extra_body": extra_body
             }
-            session = requests.Session()
-            retry = Retry(
-                total=RETRIES,
-                read=RETRIES,
-                connect=RETRIES,
-                status=RETRIES,
-                backoff_factor=BACKOFF,
-                status_forcelist=[429, 500, 502, 503, 504],
-                allowed_methods=frozenset(["POST"]),
-                raise_on_status=False,
-            )
-            adapter = HTTPAdapter(max_retries=retry)
-            session.mount("https://", adapter)
-            session.mount("http://", adapter)
-            r = session.post(url, json=payload, headers=headers, timeout=(5, READ_TIMEOUT))
+            session = llm_http.get_session("modelscope", retries=RETRIES, backoff=BACKOFF)
+            r = session.post(url, json=payload, headers=headers, timeout=llm_http.timeouts(READ_TIMEOUT))
             r.raise_for_status()
             data = r.json()
             # Try OpenAI-like shape
@@ -119,6 +105,19 @@ def call_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None)
         logger.error(f"LLM_ERROR provider=modelscope err={str(e)}")
         return {"error": str(e)}
 
+async def stream_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> AsyncIterator[str]:
+    """Streams the answer text; reasoning deltas are not forwarded"""
+    if not API_KEY:
+        raise RuntimeError("Missing MODELSCOPE_API_KEY")
+    payload: Dict[str, Any] = {
+        "model": DEFAULT_MODEL,
+        "messages": messages,
+        "extra_body": {"enable_thinking": ENABLE_THINKING},
+    }
+    logger.info(f"LLM_STREAM provider=modelscope model={DEFAULT_MODEL} messages_count={len(messages)} schema={schema_hint or ''}")
+    async for delta in llm_http.stream_chat("modelscope", MODELSCOPE_BASE_URL, API_KEY, payload):
+        yield delta
+
 class ModelScopeClient:
     def __init__(self):
         self.base_url = MODELSCOPE_BASE_URL
@@ -0,0 +1,123 @@
+"""
+Schema context for the SQL prompts, written as compact DDL-like text instead of
+a repr of nested dicts:
+
+    TABLE ORDERS -- 订单表
+      ORDER_ID NUMBER -- 订单号
+      AMOUNT NUMBER(12,2) -- 金额; 含税
+
+Empty aliases and descriptions are left out. When the text exceeds the token
+budget, tables are shortened starting with the least relevant to the question:
+column descriptions go, then all but the matching columns, and finally the
+table is only listed by name.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+import os
+
+from backend.utils.bm25 import BM25Index
+from backend.utils.token_count import count_tokens
+from backend.utils.tokenizer import tokenize
+
+SCHEMA_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_SCHEMA_TOKEN_BUDGET", "8000"))
+
+# Detail levels, from full to listed by name only
+FULL, NO_DESCRIPTIONS, MATCHING_COLUMNS, NAME_ONLY = range(4)
+
+logger = logging.getLogger("llm_client")
+
+def _clean(value: Any) -> str:
+    return " ".join(str(value).split()) if value not in (None, "") else ""
+
+def _column_line(col: Dict[str, Any], with_notes: bool) -> str:
+    line = "  " + " ".join(p for p in (_clean(col.get("name")), _clean(col.get("type"))) if p)
+    if with_notes:
+        notes = list(dict.fromkeys(n for n in (_clean(col.get("alias")), _clean(col.get("description"))) if n))
+        if notes:
+            line += " -- " + "; ".join(notes)
+    return line
+
+def _column_matches(col: Dict[str, Any], query_tokens: set) -> bool:
+    return any(t in query_tokens for field in ("name", "alias", "description") for t in tokenize(col.get(field)))
+
+def render_table(table: Dict[str, Any], level: int = FULL, query_tokens: Optional[set] = None) -> str:
+    """One table as DDL-like text; `table` has name, description and columns (name/type/alias/description)"""
+    header = f"TABLE {_clean(table.get('name'))}"
+    if _clean(table.get("description")):
+        header += f" -- {_clean(table['description'])}"
+    columns = [c for c in table.get("columns") or [] if isinstance(c, dict) and _clean(c.get("name"))]
+    if level == MATCHING_COLUMNS:
+        shown = [c for c in columns if _column_matches(c, query_tokens or set())]
+        lines = [_column_line(c, with_notes=False) for c in shown]
+        if len(shown) < len(columns):
+            lines.append(f"  -- {len(columns) - len(shown)} more columns")
+        return "\n".join([header] + lines)
+    return "\n".join([header] + [_column_line(c, with_notes=level == FULL) for c in columns])
+
+def _relevance_order(tables: Sequence[Dict[str, Any]], query_tokens: List[str]) -> List[int]:
+    """Table positions, most relevant to the query first; ties keep the given order"""
+    index = BM25Index()
+    for i, t in enumerate(tables):
+        texts = [t.get("name"), t.get("description")]
+        for c in t.get("columns") or []:
+            if isinstance(c, dict):
+                texts.extend([c.get("name"), c.get("alias"), c.get("description")])
+        index.add(i, [tok for text in texts for tok in tokenize(text)])
+    scores = dict(index.search(query_tokens, top_k=len(tables)))
+    return sorted(range(len(tables)), key=lambda i: (-scores.get(i, 0.0), i))
+
+def _render(tables: Sequence[Dict[str, Any]], levels: List[int], query_tokens: set) -> str:
+    blocks = [render_table(t, lvl, query_tokens) for t, lvl in zip(tables, levels) if lvl != NAME_ONLY]
+    listed = [_clean(t.get("name")) for t, lvl in zip(tables, levels) if lvl == NAME_ONLY]
+    if listed:
+        blocks.append("-- Other tables: " + ", ".join(listed))
+    return "\n\n".join(blocks)
+
+class CompiledSchema:
+    """
+    Full-detail rendering of a fixed table set, computed once; for_query() only
+    trims (and so only depends on the question) when it is over budget. Tables
+    are kept in the given order, so the same set always renders identically.
+    """
+    def __init__(self, tables: Sequence[Dict[str, Any]], model: str = ""):
+        self.tables = list(tables)
+        self.model = model
+        blocks = [render_table(t) for t in self.tables]
+        self.costs = [count_tokens(b, model) + 1 for b in blocks]
+        self.text = "\n\n".join(blocks)
+        self.tokens = count_tokens(self.text, model)
+
+    def for_query(self, query: str, budget: Optional[int] = None) -> Tuple[str, int]:
+        """(schema text, its token count), trimmed by relevance to fit `budget` tokens where possible"""
+        budget = SCHEMA_TOKEN_BUDGET if budget is None else budget
+        if sum(self.costs) <= budget:
+            logger.info(f"LLM_PROMPT_SCHEMA tables={len(self.tables)} tokens={self.tokens} budget={budget} trimmed=0")
+            return self.text, self.tokens
+        tables, model = self.tables, self.model
+        query_list = tokenize(query)
+        query_tokens = set(query_list)
+        levels = [FULL] * len(tables)
+        costs = list(self.costs)
+        total = sum(costs)
+        order = _relevance_order(tables, query_list)
+        for i in reversed(order):
+            # The most relevant table keeps at least its matching columns
+            steps = (NO_DESCRIPTIONS, MATCHING_COLUMNS) if i == order[0] else (NO_DESCRIPTIONS, MATCHING_COLUMNS, NAME_ONLY)
+            for level in steps:
+                if total <= budget:
+                    break
+                levels[i] = level
+                text = _clean(tables[i].get("name")) if level == NAME_ONLY else render_table(tables[i], level, query_tokens)
+                cost = count_tokens(text, model) + 1
+                total += cost - costs[i]
+                costs[i] = cost
+        text = _render(tables, levels, query_tokens)
+        tokens = count_tokens(text, model)
+        trimmed = sum(1 for lvl in levels if lvl != FULL)
+        logger.info(f"LLM_PROMPT_SCHEMA tables={len(tables)} tokens={tokens} budget={budget} trimmed={trimmed}")
+        return text, tokens
+
+def build_schema_context(tables: Sequence[Dict[str, Any]], query: str, model: str = "",
+                         budget: Optional[int] = None) -> Tuple[str, int]:
+    """(schema text, its token count), trimmed by relevance to fit `budget` tokens where possible"""
+    return CompiledSchema(tables, model).for_query(query, budget)
@@ -0,0 +1,90 @@
+"""
+Prompt inputs compiled once per datasource and reused until it changes: the
+annotated-table summaries for table selection, and the rendered schema of each
+table set sent for SQL generation. Entries remember the datasource version they
+were built from; datasource_service drops them on every write, and the version
+check catches writes made by other worker processes.
+"""
+from typing import List, NamedTuple, Sequence
+import os
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.models.orm import TableEntry
+from backend.services.prompt_builder import CompiledSchema
+from backend.utils.cache import TTLCache
+import backend.services.version_service as version_service
+
+_cache = TTLCache(
+    maxsize=int(os.getenv("AI_PROMPT_CONTEXT_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("AI_PROMPT_CONTEXT_CACHE_TTL", "3600"))
+)
+
+class TableSummary(NamedTuple):
+    id: int
+    name: str
+    description: str
+
+def _scope(db: Session, datasource_id: int) -> tuple:
+    # Keyed by database too: ids are only unique within one metadata DB
+    return (str(db.get_bind().url), datasource_id)
+
+def _cached(key: tuple, version: int):
+    hit = _cache.get(key)
+    return hit[1] if hit is not None and hit[0] == version else None
+
+def annotated_tables(db: Session, datasource_id: int) -> List[TableSummary]:
+    """Tables of the datasource that have a simple description, in id order"""
+    version = version_service.get_version(db, "datasource", datasource_id)
+    key = ("tables",) + _scope(db, datasource_id)
+    summaries = _cached(key, version)
+    if summaries is None:
+        rows = db.execute(
+            select(TableEntry.id, TableEntry.name, TableEntry.simple_description)
+            .where(TableEntry.dataSourceId == datasource_id)
+            .order_by(TableEntry.id)
+        ).all()
+        summaries = [TableSummary(*row) for row in rows if row[2]]
+        _cache.set(key, (version, summaries))
+    return summaries
+
+def schema(db: Session, datasource_id: int, table_ids: Sequence[int], model: str = "") -> CompiledSchema:
+    """
+    Rendered schema of the given tables of the datasource, in id order so the
+    prompt prefix is identical for every question about the same tables.
+    """
+    ids = tuple(sorted({int(i) for i in table_ids}))
+    version = version_service.get_version(db, "datasource", datasource_id)
+    key = ("schema",) + _scope(db, datasource_id) + (ids, model)
+    compiled = _cached(key, version)
+    if compiled is not None:
+        return compiled
+
+    rows = db.execute(
+        select(TableEntry.id, TableEntry.name, TableEntry.simple_description, TableEntry.columns)
+        .where(TableEntry.dataSourceId == datasource_id, TableEntry.id.in_(ids))
+        .order_by(TableEntry.id)
+    ).all()
+    if not rows and ids:
+        raise ValueError(f"No valid tables found for ids {list(ids)}")
+    tables = []
+    for table_id, name, simple_description, columns in rows:
+        if not simple_description:
+            raise ValueError(f"Table '{name}' is missing simple_description. Please save table annotations first.")
+        tables.append({
+            "id": table_id,
+            "name": name,
+            "description": simple_description,
+            "columns": columns if isinstance(columns, list) else []
+        })
+    compiled = CompiledSchema(tables, model)
+    _cache.set(key, (version, compiled))
+    return compiled
+
+def invalidate(db: Session, datasource_id: int):
+    scope = _scope(db, datasource_id)
+    _cache.invalidate(lambda key: key[1:3] == scope)
+
+def clear():
+    _cache.invalidate()
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from backend.models.orm import Widget
 from backend.schemas.base import SavedComponentCreate
+from backend.services import dashboard_service, version_service, search_service
 import time
 
 def get_all(db: Session):
@@ -43,6 +44,9 @@ def create(db: Session, comp: SavedComponentCreate):
         createdAt=int(time.time() * 1000)
     )
     db.add(db_comp)
+    db.flush()
+    search_service.sync(db, "widget", [db_comp.id])
+    version_service.bump(db, "widget", db_comp.id)
     db.commit()
     db.refresh(db_comp)
     
@@ -60,6 +64,10 @@ def delete(db: Session, id: int):
     if not db_comp:
         return False
     
+    dashboard_ids = dashboard_service.dashboard_ids_for_widget(db, db_comp.id)
     db.delete(db_comp)
+    dashboard_service.write_documents(db, dashboard_ids)
+    search_service.sync(db, "widget", [id])
+    version_service.bump(db, "widget", id)
     db.commit()
     return True
@@ -0,0 +1,236 @@
+from sqlalchemy import select, text, inspect, bindparam
+from sqlalchemy.orm import Session
+from backend.models.orm import TableEntry, Dataset, Widget
+from backend.utils.tokenizer import tokenize, unique_tokens, is_cjk
+import time
+
+INDEX_TABLE = "search_index"
+
+# Documents are keyed by resource id * stride + kind, so an update is a delete by
+# primary key (FTS5 rowid) followed by an insert
+KINDS = {"table": 0, "dataset": 1, "widget": 2}
+_KIND_STRIDE = 4
+_BATCH_SIZE = 500
+
+# bm25 / ts_rank weights: name > description > column text
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5(
+        name, description, columns,
+        kind UNINDEXED, resource_id UNINDEXED, datasource_id UNINDEXED,
+        display_name UNINDEXED, display_description UNINDEXED,
+        tokenize = 'unicode61', prefix = '1 2 3'
+    )"""
+]
+_SQLITE_RANK = "bm25(search_index, 10.0, 4.0, 2.0)"
+
+_POSTGRES_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS {INDEX_TABLE} (
+        doc_id BIGINT PRIMARY KEY,
+        kind VARCHAR(16) NOT NULL,
+        resource_id BIGINT NOT NULL,
+        datasource_id BIGINT,
+        display_name TEXT,
+        display_description TEXT,
+        document TSVECTOR NOT NULL
+    )""",
+    f"CREATE INDEX IF NOT EXISTS ix_{INDEX_TABLE}_document ON {INDEX_TABLE} USING GIN (document)",
+]
+
+# database url -> True once the index table exists, or the monotonic time it was
+# last found missing; a missing table is re-checked after MISSING_RECHECK_SECONDS,
+# so an index created while the server runs is picked up without a restart
+_available = {}
+MISSING_RECHECK_SECONDS = 30.0
+
+def _is_sqlite(conn) -> bool:
+    return conn.dialect.name == "sqlite"
+
+def create_index(bind):
+    """Creates the index table (FTS5 on SQLite, tsvector + GIN elsewhere)"""
+    with bind.begin() as conn:
+        for ddl in (_SQLITE_DDL if _is_sqlite(conn) else _POSTGRES_DDL):
+            conn.execute(text(ddl))
+    _available[str(bind.url)] = True
+
+def is_available(db: Session) -> bool:
+    key = str(db.get_bind().url)
+    state = _available.get(key)
+    if state is True:
+        return True
+    if state is not None and time.monotonic() - state < MISSING_RECHECK_SECONDS:
+        return False
+    exists = inspect(db.connection()).has_table(INDEX_TABLE)
+    _available[key] = True if exists else time.monotonic()
+    return exists
+
+def _doc_id(kind: str, resource_id: int) -> int:
+    return int(resource_id) * _KIND_STRIDE + KINDS[kind]
+
+def _terms(*texts) -> list[str]:
+    terms = []
+    for t in texts:
+        terms.extend(tokenize(t))
+    return terms
+
+def _column_texts(columns) -> list:
+    texts = []
+    for col in columns or []:
+        if isinstance(col, dict):
+            texts.extend([col.get("name"), col.get("alias"), col.get("description")])
+    return texts
+
+def _table_docs(db: Session, ids):
+    rows = db.execute(
+        select(TableEntry.id, TableEntry.name, TableEntry.description, TableEntry.simple_description,
+               TableEntry.columns, TableEntry.dataSourceId)
+        .where(TableEntry.id.in_(ids))
+    )
+    for tid, name, description, simple_description, columns, ds_id in rows:
+        yield {
+            "kind": "table", "resource_id": tid, "datasource_id": ds_id,
+            "display_name": name, "display_description": simple_description or description,
+            "name": _terms(name), "description": _terms(description, simple_description),
+            "columns": _terms(*_column_texts(columns)),
+        }
+
+def _dataset_docs(db: Session, ids):
+    rows = db.execute(
+        select(Dataset.id, Dataset.name, Dataset.description, Dataset.dataSourceId).where(Dataset.id.in_(ids))
+    )
+    for did, name, description, ds_id in rows:
+        yield {
+            "kind": "dataset", "resource_id": did, "datasource_id": ds_id,
+            "display_name": name, "display_description": description,
+            "name": _terms(name), "description": _terms(description), "columns": [],
+        }
+
+def _widget_docs(db: Session, ids):
+    rows = db.execute(select(Widget.id, Widget.name, Widget.description).where(Widget.id.in_(ids)))
+    for wid, name, description in rows:
+        yield {
+            "kind": "widget", "resource_id": wid, "datasource_id": None,
+            "display_name": name, "display_description": description,
+            "name": _terms(name), "description": _terms(description), "columns": [],
+        }
+
+_DOC_BUILDERS = {"table": _table_docs, "dataset": _dataset_docs, "widget": _widget_docs}
+
+def _tsvector_literal(doc) -> str:
+    # Built as a literal rather than with to_tsvector() so Postgres stores exactly
+    # our terms (CJK bigrams included) regardless of its text search parser
+    positions = {}
+    pos = 0
+    for field, weight in (("name", "A"), ("description", "B"), ("columns", "C")):
+        for term in doc[field]:
+            pos = min(pos + 1, 16383)
+            positions.setdefault(term, []).append(f"{pos}{weight}")
+    return " ".join(f"'{term}':{','.join(p[:256])}" for term, p in positions.items())
+
+def _write_docs(db: Session, docs):
+    if not docs:
+        return
+    if _is_sqlite(db.connection()):
+        db.execute(text(
+            f"INSERT INTO {INDEX_TABLE} (rowid, name, description, columns, kind, resource_id, "
+            "datasource_id, display_name, display_description) VALUES (:doc_id, :name, :description, "
+            ":columns, :kind, :resource_id, :datasource_id, :display_name, :display_description)"
+        ), [
+            {**d, "name": " ".join(d["name"]), "description": " ".join(d["description"]),
+             "columns": " ".join(d["columns"])}
+            for d in docs
+        ])
+    else:
+        db.execute(text(
+            f"INSERT INTO {INDEX_TABLE} (doc_id, kind, resource_id, datasource_id, display_name, "
+            "display_description, document) VALUES (:doc_id, :kind, :resource_id, :datasource_id, "
+            ":display_name, :display_description, CAST(:document AS tsvector))"
+        ), [
+            {key: d[key] for key in ("doc_id", "kind", "resource_id", "datasource_id", "display_name", "display_description")}
+            | {"document": _tsvector_literal(d)}
+            for d in docs
+        ])
+
+def sync(db: Session, kind: str, resource_ids):
+    """
+    Re-indexes the given resources from their current rows; ids that no longer
+    exist are dropped. Call before the service's commit, next to version_service.bump,
+    so the index changes in the same transaction as the data.
+    """
+    ids = sorted({int(i) for i in resource_ids if i is not None})
+    if not ids or not is_available(db):
+        return
+    db.flush()
+    key_column = "rowid" if _is_sqlite(db.connection()) else "doc_id"
+    delete = text(f"DELETE FROM {INDEX_TABLE} WHERE {key_column} IN :doc_ids").bindparams(
+        bindparam("doc_ids", expanding=True)
+    )
+    for start in range(0, len(ids), _BATCH_SIZE):
+        batch = ids[start:start + _BATCH_SIZE]
+        db.execute(delete, {"doc_ids": [_doc_id(kind, i) for i in batch]})
+        docs = [{**d, "doc_id": _doc_id(kind, d["resource_id"])} for d in _DOC_BUILDERS[kind](db, batch)]
+        _write_docs(db, docs)
+
+def rebuild(db: Session) -> dict:
+    """Re-indexes everything from scratch; returns document counts per kind"""
+    db.execute(text(f"DELETE FROM {INDEX_TABLE}"))
+    counts = {}
+    for kind, model in (("table", TableEntry), ("dataset", Dataset), ("widget", Widget)):
+        ids = db.execute(select(model.id).order_by(model.id)).scalars().all()
+        sync(db, kind, ids)
+        counts[kind] = len(ids)
+    if _is_sqlite(db.connection()):
+        db.execute(text(f"INSERT INTO {INDEX_TABLE}({INDEX_TABLE}) VALUES ('optimize')"))
+    db.commit()
+    return counts
+
+def _query_terms(q: str) -> list[tuple[str, bool]]:
+    """(term, is_prefix): the last word is matched as a prefix for type-ahead, as are lone CJK characters"""
+    terms = unique_tokens(q)
+    return [
+        (term, (i == len(terms) - 1 and not is_cjk(term)) or (is_cjk(term) and len(term) == 1))
+        for i, term in enumerate(terms)
+    ]
+
+def search(db: Session, q: str, kind: str | None = None, datasource_id: int | None = None,
+           skip: int = 0, limit: int = 20) -> dict:
+    """Ranked full-text search; all query terms must match"""
+    page = {"items": [], "total": 0, "skip": skip, "limit": limit}
+    terms = _query_terms(q)
+    if not terms:
+        return page
+
+    params = {"kind": kind, "datasource_id": datasource_id, "skip": skip, "limit": limit}
+    filters = ""
+    if kind:
+        filters += " AND kind = :kind"
+    if datasource_id is not None:
+        filters += " AND datasource_id = :datasource_id"
+
+    if _is_sqlite(db.connection()):
+        params["match"] = " ".join(f'"{term}"' + ("*" if prefix else "") for term, prefix in terms)
+        where = f"{INDEX_TABLE} MATCH :match{filters}"
+        score = f"-{_SQLITE_RANK}"
+        order = _SQLITE_RANK
+    else:
+        params["match"] = " & ".join(f"'{term}'" + (":*" if prefix else "") for term, prefix in terms)
+        where = f"document @@ CAST(:match AS tsquery){filters}"
+        score = "ts_rank(document, CAST(:match AS tsquery))"
+        order = f"{score} DESC"
+
+    page["total"] = db.execute(text(f"SELECT count(*) FROM {INDEX_TABLE} WHERE {where}"), params).scalar()
+    rows = db.execute(text(
+        f"SELECT kind, resource_id, datasource_id, display_name, display_description, {score} AS score "
+        f"FROM {INDEX_TABLE} WHERE {where} ORDER BY {order} LIMIT :limit OFFSET :skip"
+    ), params)
+    page["items"] = [
+        {
+            "kind": row.kind,
+            "id": int(row.resource_id),
+            "datasourceId": row.datasource_id,
+            "name": row.display_name,
+            "description": row.display_description,
+            "score": float(row.score or 0),
+        }
+        for row in rows
+    ]
+    return page
@@ -1,11 +1,12 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 import os
-import requests
 import logging
 import time
 import json
+from backend.services import llm_http
 
 SILICONFLOW_API_URL = "https://api.siliconflow.cn/v1/chat/completions"
+SILICONFLOW_BASE_URL = SILICONFLOW_API_URL.rsplit("/chat/completions", 1)[0]
 DEFAULT_MODEL = os.getenv("SILICONFLOW_MODEL", "deepseek-ai/DeepSeek-V3.2")
 API_KEY = os.getenv("SILICONFLOW_API_KEY", "")
 
@@ -37,7 +38,7 @@ def call_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None)
     try:
         _start = time.time()
         logger.info(f"LLM_REQUEST url={SILICONFLOW_API_URL} model={DEFAULT_MODEL} messages={len(messages)} schema={schema_hint or ''}")
-        resp = requests.post(SILICONFLOW_API_URL, json=payload, headers=headers, timeout=120)
+        resp = llm_http.get_session("siliconflow").post(SILICONFLOW_API_URL, json=payload, headers=headers, timeout=llm_http.timeouts())
         resp.raise_for_status()
         data = resp.json()
         content = data["choices"][0]["message"]["content"]
@@ -69,3 +70,17 @@ def call_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None)
     except Exception as e:
         logger.error(f"LLM_ERROR provider=siliconflow err={str(e)}")
         return {"error": str(e)}
+
+async def stream_llm(messages: List[Dict[str, Any]], schema_hint: Optional[str] = None) -> AsyncIterator[str]:
+    """Streams the raw completion text (the JSON document, possibly fenced) as it is generated"""
+    if not API_KEY:
+        raise RuntimeError("Missing SILICONFLOW_API_KEY")
+    payload: Dict[str, Any] = {
+        "model": DEFAULT_MODEL,
+        "messages": messages,
+        "temperature": 0.3,
+        "response_format": {"type": "json_object"},
+    }
+    logger.info(f"LLM_STREAM provider=siliconflow model={DEFAULT_MODEL} messages={len(messages)} schema={schema_hint or ''}")
+    async for delta in llm_http.stream_chat("siliconflow", SILICONFLOW_BASE_URL, API_KEY, payload):
+        yield delta
@@ -0,0 +1,159 @@
+from typing import List, Optional
+import re
+
+TIME_BUCKET_UNITS = ("minute", "hour", "day", "week", "month")
+AGGREGATIONS = {"sum": "SUM", "avg": "AVG", "min": "MIN", "max": "MAX", "count": "COUNT"}
+
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z_\u4e00-\u9fff][\w$#\u4e00-\u9fff]*$')
+_TIMEZONE_RE = re.compile(r'^[A-Za-z0-9_+\-:/]+$')
+
+_ORACLE_TRUNC_FORMATS = {"minute": "MI", "hour": "HH24", "day": "DD", "week": "IW", "month": "MM"}
+_MYSQL_DATE_FORMATS = {
+    "minute": "%Y-%m-%d %H:%i:00",
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d",
+    "month": "%Y-%m-01",
+}
+
+def quote_identifier(db_type: str, name: str) -> str:
+    """
+    Quotes a result column name for use in a wrapping query. Names are validated
+    because they come from the request, not from the database.
+    """
+    if not name or not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"Invalid column name: {name}")
+    if db_type == 'mysql':
+        return f"`{name}`"
+    if db_type == 'oracle' and name == name.lower():
+        # SQLAlchemy reports case-insensitive (upper case) Oracle names in lower case,
+        # so they must stay unquoted to resolve back to the original column.
+        return name
+    return f'"{name}"'
+
+def _check_timezone(tz: str) -> str:
+    if not _TIMEZONE_RE.match(tz):
+        raise ValueError(f"Invalid timezone: {tz}")
+    return tz
+
+def _convert_timezone(db_type: str, expr: str, source_tz: Optional[str], target_tz: Optional[str]) -> str:
+    """Converts a naive timestamp stored in source_tz into naive local time in target_tz"""
+    if not target_tz or target_tz == source_tz:
+        return expr
+    src = _check_timezone(source_tz or "UTC")
+    dst = _check_timezone(target_tz)
+    if db_type == 'postgres':
+        return f"(({expr}) AT TIME ZONE '{src}') AT TIME ZONE '{dst}'"
+    if db_type == 'oracle':
+        return f"CAST(FROM_TZ(CAST({expr} AS TIMESTAMP), '{src}') AT TIME ZONE '{dst}' AS DATE)"
+    if db_type == 'mysql':
+        return f"CONVERT_TZ({expr}, '{src}', '{dst}')"
+    raise ValueError(f"Unsupported database type: {db_type}")
+
+def time_bucket_expression(db_type: str, column: str, unit: str, timezone: Optional[str] = None, source_timezone: Optional[str] = "UTC") -> str:
+    """Dialect-native truncation of a timestamp column to the start of its bucket"""
+    if unit not in TIME_BUCKET_UNITS:
+        raise ValueError(f"Unsupported time bucket: {unit}")
+    expr = _convert_timezone(db_type, quote_identifier(db_type, column), source_timezone, timezone)
+
+    if db_type == 'postgres':
+        return f"date_trunc('{unit}', {expr})"
+    if db_type == 'oracle':
+        return f"TRUNC({expr}, '{_ORACLE_TRUNC_FORMATS[unit]}')"
+    if db_type == 'mysql':
+        if unit == "week":
+            # ISO weeks start on Monday, matching date_trunc('week') and TRUNC(..., 'IW')
+            return f"DATE_FORMAT(DATE_SUB({expr}, INTERVAL WEEKDAY({expr}) DAY), '%Y-%m-%d')"
+        return f"DATE_FORMAT({expr}, '{_MYSQL_DATE_FORMATS[unit]}')"
+    raise ValueError(f"Unsupported database type: {db_type}")
+
+def build_time_bucket_sql(db_type: str, sql: str, column: str, unit: str, metrics: List[dict],
+                          timezone: Optional[str] = None, source_timezone: Optional[str] = "UTC",
+                          group_by: Optional[List[str]] = None) -> str:
+    """
+    Wraps the dataset SQL so the database returns one aggregated row per time bucket
+    (and per group_by combination). The bucket keeps the time column's name so the
+    chart's xAxisKey still matches.
+    """
+    bucket = time_bucket_expression(db_type, column, unit, timezone, source_timezone)
+    group_cols = [quote_identifier(db_type, g) for g in (group_by or [])]
+
+    select_parts = [f"{bucket} AS {quote_identifier(db_type, column)}"] + group_cols
+    if metrics:
+        for m in metrics:
+            agg = (m.get("agg") or "sum").lower()
+            if agg not in AGGREGATIONS:
+                raise ValueError(f"Unsupported aggregation: {agg}")
+            col = quote_identifier(db_type, m["column"])
+            select_parts.append(f"{AGGREGATIONS[agg]}({col}) AS {col}")
+    else:
+        select_parts.append(f"COUNT(*) AS {quote_identifier(db_type, 'row_count')}")
+
+    sql = sql.strip()
+    if sql.endswith(';'):
+        sql = sql[:-1]
+
+    return (
+        f"SELECT {', '.join(select_parts)} FROM ({sql}) sub_bucket"
+        f" WHERE {quote_identifier(db_type, column)} IS NOT NULL"
+        f" GROUP BY {', '.join([bucket] + group_cols)}"
+        f" ORDER BY {', '.join([bucket] + group_cols)}"
+    )
+
+def _as_text(db_type: str, expr: str) -> str:
+    if db_type == 'postgres':
+        return f"CAST({expr} AS TEXT)"
+    if db_type == 'oracle':
+        return f"TO_CHAR({expr})"
+    if db_type == 'mysql':
+        return f"CAST({expr} AS CHAR)"
+    raise ValueError(f"Unsupported database type: {db_type}")
+
+def escape_like_prefix(prefix: str) -> str:
+    """Escapes LIKE wildcards with '!' (portable across Oracle/Postgres/MySQL) and appends %"""
+    return prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+
+def build_distinct_values_sql(db_type: str, sql: str, column: str, with_prefix: bool = False) -> str:
+    """
+    Distinct values of a result column with their row counts, most frequent first.
+    With with_prefix the query expects a :prefix bind built by escape_like_prefix.
+    """
+    col = quote_identifier(db_type, column)
+    where = f"{col} IS NOT NULL"
+    if with_prefix:
+        where += f" AND UPPER({_as_text(db_type, col)}) LIKE UPPER(:prefix) ESCAPE '!'"
+
+    sql = sql.strip()
+    if sql.endswith(';'):
+        sql = sql[:-1]
+
+    count_alias = quote_identifier(db_type, "value_count")
+    return (
+        f"SELECT {col} AS {col}, COUNT(*) AS {count_alias} FROM ({sql}) sub_values"
+        f" WHERE {where} GROUP BY {col} ORDER BY COUNT(*) DESC, {col}"
+    )
+
+def build_distinct_count_probe_sql(db_type: str, sql: str, column: str) -> str:
+    """
+    Number of distinct non-NULL values, counted only up to the :cap bind: the
+    database stops after cap distinct values instead of scanning them all.
+    """
+    col = quote_identifier(db_type, column)
+    sql = sql.strip()
+    if sql.endswith(';'):
+        sql = sql[:-1]
+    distinct = f"SELECT DISTINCT {col} FROM ({sql}) sub_distinct WHERE {col} IS NOT NULL"
+    if db_type == 'oracle':
+        distinct = f"SELECT * FROM ({distinct}) WHERE ROWNUM <= :cap"
+    else:
+        distinct += " LIMIT :cap"
+    return f"SELECT COUNT(*) AS distinct_count FROM ({distinct}) sub_probe"
+
+def build_approx_count_distinct_sql(db_type: str, sql: str, column: str) -> Optional[str]:
+    """Native HyperLogLog-based estimate where the database has one (Oracle 12c+)"""
+    if db_type != 'oracle':
+        return None
+    col = quote_identifier(db_type, column)
+    sql = sql.strip()
+    if sql.endswith(';'):
+        sql = sql[:-1]
+    return f"SELECT APPROX_COUNT_DISTINCT({col}) AS approx_distinct FROM ({sql}) sub_distinct"
@@ -0,0 +1,173 @@
+from typing import Any, Dict, List, Optional
+from sqlalchemy import create_engine, text
+from backend.schemas.base import ExecuteSqlRequest
+import backend.services.datasource_service as datasource_service
+import os
+import json
+import uuid
+import logging
+
+logger = logging.getLogger("api_logger")
+
+# off / warn / block
+COST_GUARD_MODE = os.getenv("SQL_COST_GUARD", "off").lower()
+# Planner cost units are dialect-specific, so the cost threshold is only meaningful per database
+COST_GUARD_MAX_COST = float(os.getenv("SQL_COST_GUARD_MAX_COST", "0") or 0)
+COST_GUARD_MAX_ROWS = float(os.getenv("SQL_COST_GUARD_MAX_ROWS", "0") or 0)
+COST_GUARD_BLOCK_FULL_SCAN = os.getenv("SQL_COST_GUARD_FULL_SCAN", "false").lower() == "true"
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def summarize_postgres_plan(plan: Any) -> Dict[str, Any]:
+    """Summarizes the output of EXPLAIN (FORMAT JSON)"""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+
+    full_scans = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        # "Parallel Seq Scan" is a Seq Scan with "Parallel Aware" in newer versions
+        if node.get("Node Type") in ("Seq Scan", "Parallel Seq Scan"):
+            full_scans.append(node.get("Relation Name"))
+        stack.extend(node.get("Plans", []))
+
+    return {
+        "estimatedRows": _to_float(root.get("Plan Rows")),
+        "estimatedCost": _to_float(root.get("Total Cost")),
+        "fullScans": full_scans,
+    }
+
+def summarize_mysql_plan(plan: Any) -> Dict[str, Any]:
+    """Summarizes the output of EXPLAIN FORMAT=JSON"""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    query_block = plan.get("query_block", {})
+
+    # Tables appear at arbitrary depth (nested_loop, ordering_operation, subqueries...);
+    # the last one visited in document order is the final join output.
+    tables = []
+    def walk(node):
+        if isinstance(node, dict):
+            table = node.get("table")
+            if isinstance(table, dict):
+                tables.append(table)
+            for v in node.values():
+                walk(v)
+        elif isinstance(node, list):
+            for v in node:
+                walk(v)
+    walk(query_block)
+
+    rows = None
+    if tables:
+        last = tables[-1]
+        rows = _to_float(last.get("rows_produced_per_join", last.get("rows_examined_per_scan")))
+
+    return {
+        "estimatedRows": rows,
+        "estimatedCost": _to_float(query_block.get("cost_info", {}).get("query_cost")),
+        "fullScans": [t.get("table_name") for t in tables if t.get("access_type") == "ALL"],
+    }
+
+def summarize_oracle_plan(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarizes PLAN_TABLE rows (id, operation, options, object_name, cardinality, cost)"""
+    root = next((r for r in rows if r.get("id") == 0), rows[0] if rows else {})
+    return {
+        "estimatedRows": _to_float(root.get("cardinality")),
+        "estimatedCost": _to_float(root.get("cost")),
+        "fullScans": [
+            r.get("object_name") for r in rows
+            if r.get("operation") == "TABLE ACCESS" and r.get("options") == "FULL"
+        ],
+    }
+
+def _explain(conn, db_type: str, sql: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    params = params or {}
+    if db_type == 'postgres':
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+        return summarize_postgres_plan(plan)
+    if db_type == 'mysql':
+        plan = conn.execute(text(f"EXPLAIN FORMAT=JSON {sql}"), params).scalar()
+        return summarize_mysql_plan(plan)
+    if db_type == 'oracle':
+        # STATEMENT_ID is VARCHAR2(30)
+        statement_id = f"AIDI_{uuid.uuid4().hex[:20]}"
+        conn.execute(text(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql}"), params)
+        result = conn.execute(
+            text("SELECT id, operation, options, object_name, cardinality, cost FROM plan_table WHERE statement_id = :sid ORDER BY id"),
+            {"sid": statement_id}
+        )
+        rows = [dict(r._mapping) for r in result]
+        conn.execute(text("DELETE FROM plan_table WHERE statement_id = :sid"), {"sid": statement_id})
+        conn.commit()
+        return summarize_oracle_plan(rows)
+    raise ValueError(f"Unsupported database type: {db_type}")
+
+def evaluate_guard(estimate: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Returns {'action': 'warn'|'block', 'message': ...} if the estimate exceeds the configured limits"""
+    if COST_GUARD_MODE not in ("warn", "block"):
+        return None
+
+    reasons = []
+    cost = estimate.get("estimatedCost")
+    rows = estimate.get("estimatedRows")
+    if COST_GUARD_MAX_COST and cost is not None and cost > COST_GUARD_MAX_COST:
+        reasons.append(f"预估代价 {cost:.0f} 超过上限 {COST_GUARD_MAX_COST:.0f}")
+    if COST_GUARD_MAX_ROWS and rows is not None and rows > COST_GUARD_MAX_ROWS:
+        reasons.append(f"预估行数 {rows:.0f} 超过上限 {COST_GUARD_MAX_ROWS:.0f}")
+    if COST_GUARD_BLOCK_FULL_SCAN and estimate.get("fullScans"):
+        reasons.append(f"存在全表扫描: {', '.join(str(t) for t in estimate['fullScans'])}")
+
+    if not reasons:
+        return None
+    return {"action": COST_GUARD_MODE, "message": "；".join(reasons)}
+
+def estimate_sql(request: ExecuteSqlRequest, sql: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    EXPLAINs request.sql with request.params, or `sql`/`params` when given (the
+    statement that actually runs, e.g. wrapped in the preview LIMIT).
+    """
+    forbidden_message = datasource_service._check_sql_safety(request.sql)
+    if forbidden_message:
+        return {"success": False, "message": forbidden_message}
+
+    try:
+        url = datasource_service._get_connection_url(request.type, request.username, request.password, request.host, request.port, request.database, request.serviceName)
+        engine = create_engine(url, connect_args=datasource_service._get_connect_args(request.type))
+        try:
+            with engine.connect() as conn:
+                estimate = _explain(
+                    conn, request.type,
+                    sql if sql is not None else datasource_service._strip_sql(request.sql),
+                    params if params is not None else request.params
+                )
+        finally:
+            engine.dispose()
+    except Exception as e:
+        msg = str(e)
+        if "ORA-01017" in msg:
+            msg = "Oracle 用户名或密码错误"
+        return {"success": False, "message": msg}
+
+    estimate["hasFullScan"] = bool(estimate["fullScans"])
+    estimate["guard"] = evaluate_guard(estimate)
+    return {"success": True, "message": "OK", **estimate}
+
+def check_guard(request: ExecuteSqlRequest, sql: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Runs the estimate when the cost guard is enabled and returns the estimate if it
+    tripped. Estimation failures never block execution.
+    """
+    if COST_GUARD_MODE not in ("warn", "block"):
+        return None
+    estimate = estimate_sql(request, sql, params)
+    if not estimate.get("success"):
+        logger.warning(f"SQL cost estimate failed, skipping guard: {estimate.get('message')}")
+        return None
+    return estimate if estimate.get("guard") else None
@@ -0,0 +1,91 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from backend.models.orm import TableEntry
+from backend.utils.bm25 import BM25Index
+from backend.utils.tokenizer import tokenize
+import os
+import threading
+
+# Tables passed on to the LLM table selection; schemas at or below this size skip retrieval
+TOP_K = int(os.getenv("AI_TABLE_RETRIEVAL_TOP_K", "30"))
+
+class _DatasourceIndex:
+    def __init__(self):
+        self.bm25 = BM25Index()
+        self.hashes = {}  # table id -> content_hash the indexed tokens came from
+        self.lock = threading.Lock()
+
+_indexes: dict[int, _DatasourceIndex] = {}
+_indexes_lock = threading.Lock()
+
+def _table_tokens(name, simple_description, columns) -> list[str]:
+    texts = [name, name, simple_description]  # name counted twice: it is short and precise
+    for col in columns or []:
+        if isinstance(col, dict):
+            texts.extend([col.get("name"), col.get("alias")])
+    tokens = []
+    for t in texts:
+        tokens.extend(tokenize(t))
+    return tokens
+
+def _get_index(datasource_id: int) -> _DatasourceIndex:
+    with _indexes_lock:
+        index = _indexes.get(datasource_id)
+        if index is None:
+            index = _indexes[datasource_id] = _DatasourceIndex()
+        return index
+
+def refresh(db: Session, datasource_id: int) -> BM25Index:
+    """
+    Brings the datasource's index up to date. Only (id, content_hash) is read for
+    every table; name, annotation and columns are loaded and re-tokenized just for
+    tables that are new or whose hash changed since they were indexed.
+    """
+    index = _get_index(datasource_id)
+    current = dict(db.execute(
+        select(TableEntry.id, TableEntry.content_hash).where(TableEntry.dataSourceId == datasource_id)
+    ).all())
+    with index.lock:
+        for table_id in [tid for tid in index.hashes if tid not in current]:
+            index.bm25.remove(table_id)
+            del index.hashes[table_id]
+        # Rows without a hash (saved before content hashes existed) are indexed once:
+        # every save through datasource_service writes a hash, which marks them stale
+        stale = [tid for tid, h in current.items() if tid not in index.hashes or index.hashes[tid] != h]
+        for start in range(0, len(stale), 500):
+            rows = db.execute(
+                select(TableEntry.id, TableEntry.name, TableEntry.simple_description, TableEntry.columns)
+                .where(TableEntry.id.in_(stale[start:start + 500]))
+            )
+            for table_id, name, simple_description, columns in rows:
+                index.bm25.add(table_id, _table_tokens(name, simple_description, columns))
+                index.hashes[table_id] = current[table_id]
+    return index.bm25
+
+def rank_tables(db: Session, datasource_id: int, user_query: str, tables: list, top_k: int | None = None) -> list:
+    """
+    Narrows `tables` (TableEntry rows of the datasource) to the top_k most relevant
+    to the query by BM25, best first. Slots the query's terms don't fill are padded
+    with the remaining tables in id order, so the LLM always sees top_k candidates.
+    """
+    top_k = top_k or TOP_K
+    if len(tables) <= top_k:
+        return tables
+
+    by_id = {t.id: t for t in tables}
+    bm25 = refresh(db, datasource_id)
+    index = _get_index(datasource_id)
+    with index.lock:
+        hits = bm25.search(tokenize(user_query), top_k=top_k, allowed=by_id)
+    ranked = [by_id[table_id] for table_id, _ in hits]
+    if len(ranked) < top_k:
+        chosen = {t.id for t in ranked}
+        ranked.extend(sorted((t for t in tables if t.id not in chosen), key=lambda t: t.id)[:top_k - len(ranked)])
+    return ranked
+
+def clear(datasource_id: int | None = None):
+    with _indexes_lock:
+        if datasource_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(datasource_id, None)
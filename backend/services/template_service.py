@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from backend.models import orm as models
 from backend.schemas import base as schemas
+from backend.services import version_service
 import time
 
 class TemplateService:
@@ -25,6 +26,8 @@ class TemplateService:
             updatedAt=int(time.time() * 1000)
         )
         db.add(db_template)
+        db.flush()
+        version_service.bump(db, "template", db_template.id)
         db.commit()
         db.refresh(db_template)
         return db_template
@@ -44,6 +47,7 @@ class TemplateService:
             setattr(db_template, key, value)
             
         db_template.updatedAt = int(time.time() * 1000)
+        version_service.bump(db, "template", template_id)
         
         db.commit()
         db.refresh(db_template)
@@ -56,5 +60,6 @@ class TemplateService:
             return None
         
         db.delete(db_template)
+        version_service.bump(db, "template", template_id)
         db.commit()
         return db_template
@@ -0,0 +1,64 @@
+from sqlalchemy import select, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from backend.models import ResourceVersion
+
+COLLECTION = "*"
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+_BATCH = 500
+
+def _bump_keys(db: Session, kind: str, keys):
+    """
+    +1 for each key, creating missing rows at 1. A single INSERT ... ON CONFLICT DO
+    UPDATE where the dialect has one, so concurrent first bumps don't collide on
+    the primary key.
+    """
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        for start in range(0, len(keys), _BATCH):
+            stmt = dialect_insert(ResourceVersion).values(
+                [{"kind": kind, "resource_id": k, "version": 1} for k in keys[start:start + _BATCH]]
+            )
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[ResourceVersion.kind, ResourceVersion.resource_id],
+                set_={"version": ResourceVersion.version + 1},
+            ))
+        return
+
+    db.execute(
+        update(ResourceVersion)
+        .where(ResourceVersion.kind == kind, ResourceVersion.resource_id.in_(keys))
+        .values(version=ResourceVersion.version + 1)
+    )
+    present = set(db.execute(
+        select(ResourceVersion.resource_id)
+        .where(ResourceVersion.kind == kind, ResourceVersion.resource_id.in_(keys))
+    ).scalars())
+    missing = [k for k in keys if k not in present]
+    if missing:
+        db.execute(insert(ResourceVersion), [{"kind": kind, "resource_id": k, "version": 1} for k in missing])
+
+def bump(db: Session, kind: str, resource_id=None):
+    """
+    Increments the version of a resource and of its collection. Call before the
+    service's commit so the counters change in the same transaction as the data.
+    """
+    if resource_id is not None:
+        _bump_keys(db, kind, [str(resource_id)])
+    _bump_keys(db, kind, [COLLECTION])
+
+def bump_many(db: Session, kind: str, resource_ids):
+    """bump() for many resources with a constant number of statements"""
+    keys = sorted({str(r) for r in resource_ids})
+    if keys:
+        _bump_keys(db, kind, keys)
+    _bump_keys(db, kind, [COLLECTION])
+
+def get_version(db: Session, kind: str, resource_id=None) -> int:
+    """Single-row lookup used for conditional GETs; never loads ORM entities"""
+    key = COLLECTION if resource_id is None else str(resource_id)
+    version = db.execute(
+        select(ResourceVersion.version)
+        .where(ResourceVersion.kind == kind, ResourceVersion.resource_id == key)
+    ).scalar()
+    return version or 0
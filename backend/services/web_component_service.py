@@ -1,6 +1,7 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 from backend.models import Widget
 from backend.schemas import WebComponentTemplateBase, WebComponentTemplate
+from backend.services import dashboard_service, version_service, search_service
 import time
 
 def map_widget_to_template(widget: Widget) -> WebComponentTemplate:
@@ -14,7 +15,7 @@ def map_widget_to_template(widget: Widget) -> WebComponentTemplate:
 
 def get_all(db: Session):
     # Only fetch widgets with a name (templates)
-    widgets = db.query(Widget).filter(Widget.type == 'web', Widget.name != None).all()
+    widgets = db.query(Widget).options(undefer(Widget.content)).filter(Widget.type == 'web', Widget.name != None).all()
     return [map_widget_to_template(w) for w in widgets]
 
 def get_by_id(db: Session, id: int):
@@ -36,6 +37,9 @@ def create_or_update(db: Session, comp: WebComponentTemplateBase):
         existing.datasetId = comp.datasetId
         existing.updatedAt = int(time.time() * 1000)
         # componentType should already be 'web'
+        dashboard_service.write_documents(db, dashboard_service.dashboard_ids_for_widget(db, existing.id))
+        search_service.sync(db, "widget", [existing.id])
+        version_service.bump(db, "widget", existing.id)
         
         db.commit()
         db.refresh(existing)
@@ -56,6 +60,9 @@ def create_or_update(db: Session, comp: WebComponentTemplateBase):
         db_widget.id = comp.id
 
     db.add(db_widget)
+    db.flush()
+    search_service.sync(db, "widget", [db_widget.id])
+    version_service.bump(db, "widget", db_widget.id)
     db.commit()
     db.refresh(db_widget)
     return map_widget_to_template(db_widget)
@@ -65,6 +72,10 @@ def delete(db: Session, id: int):
     if not widget:
         return False
     
+    dashboard_ids = dashboard_service.dashboard_ids_for_widget(db, widget.id)
     db.delete(widget)
+    dashboard_service.write_documents(db, dashboard_ids)
+    search_service.sync(db, "widget", [id])
+    version_service.bump(db, "widget", id)
     db.commit()
     return True
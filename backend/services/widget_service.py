@@ -1,10 +1,11 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 from backend.models import Widget
 from backend.schemas import WidgetCreate, WidgetUpdate
+from backend.services import dashboard_service, version_service, search_service
 import time
 
 def get_all(db: Session, type: str = None):
-    query = db.query(Widget)
+    query = db.query(Widget).options(undefer(Widget.content))
     if type:
         query = query.filter(Widget.type == type)
     return query.all()
@@ -23,6 +24,9 @@ def create(db: Session, widget: WidgetCreate):
         createdAt=int(time.time() * 1000)
     )
     db.add(db_widget)
+    db.flush()
+    search_service.sync(db, "widget", [db_widget.id])
+    version_service.bump(db, "widget", db_widget.id)
     db.commit()
     db.refresh(db_widget)
     return db_widget
@@ -41,6 +45,9 @@ def update(db: Session, widget_id: int, widget: WidgetUpdate):
     # but here we are replacing it.
     
     db_widget.updatedAt = int(time.time() * 1000)
+    dashboard_service.write_documents(db, dashboard_service.dashboard_ids_for_widget(db, widget_id))
+    search_service.sync(db, "widget", [widget_id])
+    version_service.bump(db, "widget", widget_id)
     
     db.commit()
     db.refresh(db_widget)
@@ -51,6 +58,10 @@ def delete(db: Session, widget_id: int):
     if not db_widget:
         return False
     
+    dashboard_ids = dashboard_service.dashboard_ids_for_widget(db, db_widget.id)
     db.delete(db_widget)
+    dashboard_service.write_documents(db, dashboard_ids)
+    search_service.sync(db, "widget", [widget_id])
+    version_service.bump(db, "widget", widget_id)
     db.commit()
     return True
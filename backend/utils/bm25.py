@@ -0,0 +1,63 @@
+import heapq
+import math
+from collections import Counter
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 over pre-tokenized documents. Documents can be added,
+    replaced and removed one at a time; a query only touches the postings of
+    its own terms.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict] = {}   # term -> {doc_id: term frequency}
+        self._doc_terms: dict = {}             # doc_id -> Counter of its terms
+        self._doc_len: dict = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self._doc_len
+
+    def add(self, doc_id, tokens) -> None:
+        """Indexes a document, replacing any previous version with the same id"""
+        self.remove(doc_id)
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        self._doc_terms[doc_id] = counts
+        self._doc_len[doc_id] = sum(counts.values())
+        self._total_len += self._doc_len[doc_id]
+
+    def remove(self, doc_id) -> None:
+        counts = self._doc_terms.pop(doc_id, None)
+        if counts is None:
+            return
+        for term in counts:
+            posting = self._postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    def search(self, query_tokens, top_k: int = 10, allowed=None) -> list[tuple]:
+        """(doc_id, score) pairs, best first; `allowed` optionally restricts the candidate ids"""
+        n = len(self._doc_len)
+        if not n:
+            return []
+        avg_len = self._total_len / n or 1
+        scores: dict = {}
+        for term in set(query_tokens):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
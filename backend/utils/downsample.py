@@ -0,0 +1,117 @@
+from typing import Any, Dict, List, Optional
+import os
+import numpy as np
+import pandas as pd
+
+# Dashboard grid is 12 columns wide (grid-cols-12); a full-width widget gets
+# roughly one point per horizontal pixel.
+GRID_COLUMNS = 12
+POINTS_PER_COLUMN = int(os.getenv("DOWNSAMPLE_POINTS_PER_COLUMN", "100"))
+MIN_POINTS = 20
+
+def target_points_for_col_span(col_span: Optional[int]) -> int:
+    span = min(max(int(col_span or 6), 1), GRID_COLUMNS)
+    return max(span * POINTS_PER_COLUMN, MIN_POINTS)
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets. Bucket averages are computed in one pass with
+    cumulative sums; each bucket's triangle areas are evaluated as a vector. Only
+    the walk over buckets is sequential, since each pick depends on the previous one.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.nan_to_num(y.astype(float))
+    # threshold - 2 buckets over the interior points [1, n - 1)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    starts, ends = edges[:-1], edges[1:]
+
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.maximum(ends - starts, 1)
+    avg_x = (cx[ends] - cx[starts]) / counts
+    avg_y = (cy[ends] - cy[starts]) / counts
+    # The "next bucket" of the last bucket is the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = starts[i], max(ends[i], starts[i] + 1)
+        xs, ys = x[start:end], y[start:end]
+        area = np.abs((x[a] - next_x[i]) * (ys - y[a]) - (x[a] - xs) * (next_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return np.unique(selected)
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Min/max envelope: keeps the extreme points of each bucket, fully vectorized"""
+    n = len(y)
+    buckets = threshold // 2
+    if n <= threshold or buckets < 1:
+        return np.arange(n)
+
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y.astype(float)
+    grid = padded.reshape(buckets, size)
+    missing = np.isnan(grid)
+    offsets = np.arange(buckets) * size
+    imin = np.where(missing, np.inf, grid).argmin(axis=1) + offsets
+    imax = np.where(missing, -np.inf, grid).argmax(axis=1) + offsets
+    idx = np.concatenate((imin, imax, [0, n - 1]))
+    return np.unique(idx[idx < n])
+
+def _numeric_axis(values: List[Any]) -> np.ndarray:
+    """Maps x values onto a numeric axis: numbers as-is, timestamps as epoch ms, else position"""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return np.asarray(values, dtype="datetime64[ms]").astype("int64").astype(float)
+    except (TypeError, ValueError):
+        return np.arange(len(values), dtype=float)
+
+def numeric_series(values: List[Any]) -> np.ndarray:
+    """Values as float; None and anything non-numeric become NaN"""
+    try:
+        # Numbers, Decimals and None (-> NaN) convert in one C-level pass
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+
+def downsample_indices(x_values: List[Any], y_series: List[List[Any]], target: int, method: str = "lttb") -> np.ndarray:
+    """
+    Indices of the points to keep, in x order, so that every y series keeps its
+    visual shape with roughly `target` points in total. The per-series budget is
+    split so the union stays near the target.
+    """
+    x = _numeric_axis(x_values)
+    order = np.argsort(x, kind="stable")
+    if len(x_values) <= target or not y_series:
+        return order
+    x = x[order]
+    per_series = max(target // len(y_series), 3)
+
+    keep = []
+    for values in y_series:
+        y = numeric_series(values)[order]
+        if method == "minmax":
+            keep.append(minmax_indices(y, per_series))
+        else:
+            keep.append(lttb_indices(x, y, per_series))
+    return order[np.unique(np.concatenate(keep))]
+
+def downsample_rows(rows: List[Dict[str, Any]], x_column: str, y_columns: List[str], target: int, method: str = "lttb") -> List[Dict[str, Any]]:
+    """downsample_indices over row dicts"""
+    if len(rows) <= target or not y_columns:
+        return rows
+    keep = downsample_indices(
+        [r.get(x_column) for r in rows], [[r.get(col) for r in rows] for col in y_columns], target, method
+    )
+    return [rows[i] for i in keep]
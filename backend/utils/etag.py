@@ -0,0 +1,38 @@
+from fastapi import Request, Response
+from typing import Optional
+import hashlib
+
+def make_etag(kind: str, version: int, resource_id=None, variant: Optional[str] = None) -> str:
+    """
+    Strong ETag from a resource (or collection) version. variant distinguishes
+    responses of the same collection, e.g. different query parameters.
+    """
+    parts = [kind, "*" if resource_id is None else str(resource_id), str(version)]
+    if variant:
+        parts.append(hashlib.sha1(variant.encode("utf-8")).hexdigest()[:12])
+    return '"' + "-".join(parts) + '"'
+
+def matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # Let browsers keep the body but revalidate on every navigation
+    response.headers["Cache-Control"] = "no-cache"
+
+def conditional(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Returns a 304 response when the client already has etag, else tags response and returns None"""
+    if matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return None
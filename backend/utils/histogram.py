@@ -0,0 +1,54 @@
+import bisect
+import threading
+
+class LatencyHistogram:
+    """
+    Log-spaced latency buckets (ms). Counts are halved every `half_life`
+    observations so quantiles follow recent behaviour rather than all history.
+    """
+    def __init__(self, min_ms: float = 10, max_ms: float = 600_000, buckets_per_decade: int = 10, half_life: int = 500):
+        self.bounds = []
+        bound = float(min_ms)
+        step = 10 ** (1 / buckets_per_decade)
+        while bound < max_ms:
+            self.bounds.append(bound)
+            bound *= step
+        self.bounds.append(float(max_ms))
+        self.counts = [0.0] * (len(self.bounds) + 1)  # last bucket: above max_ms
+        self.half_life = half_life
+        self.total = 0.0
+        self.observations = 0
+        self._since_decay = 0
+        self._lock = threading.Lock()
+
+    def record(self, ms: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+            self.total += 1
+            self.observations += 1
+            self._since_decay += 1
+            if self._since_decay >= self.half_life:
+                self.counts = [c / 2 for c in self.counts]
+                self.total /= 2
+                self._since_decay = 0
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile; None before any observation"""
+        with self._lock:
+            if not self.total:
+                return None
+            target = q * self.total
+            seen = 0.0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= target and count:
+                    return self.bounds[min(i, len(self.bounds) - 1)]
+            return self.bounds[-1]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.observations,
+            "p50Ms": self.quantile(0.50),
+            "p90Ms": self.quantile(0.90),
+            "p99Ms": self.quantile(0.99),
+        }
@@ -0,0 +1,41 @@
+import re
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+def extract_string_field(text: str, field: str) -> tuple[str | None, bool]:
+    """
+    Reads a JSON string field out of a possibly truncated JSON document (e.g. an
+    LLM response still streaming). Returns (value so far, whether the closing
+    quote has arrived); value is None until the field's opening quote is seen.
+    Markdown fences or text around the object don't matter.
+    """
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(field), text)
+    if not match:
+        return None, False
+    out = []
+    i = match.end()
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            return "".join(out), True
+        if ch != "\\":
+            out.append(ch)
+            i += 1
+            continue
+        if i + 1 >= n:
+            break  # escape split across chunks
+        esc = text[i + 1]
+        if esc == "u":
+            code = text[i + 2:i + 6]
+            if len(code) < 4:
+                break
+            try:
+                out.append(chr(int(code, 16)))
+            except ValueError:
+                out.append(code)
+            i += 6
+            continue
+        out.append(_ESCAPES.get(esc, esc))
+        i += 2
+    return "".join(out), False
@@ -0,0 +1,38 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second refill a bucket holding at
+    most `capacity`. acquire() blocks until enough tokens are available.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Takes the tokens and returns 0, or returns the seconds to wait before they are available"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1, cancelled=None) -> bool:
+        """Blocks until the tokens are taken; returns False if `cancelled()` turns true meanwhile"""
+        tokens = min(tokens, self.capacity)
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return True
+            if cancelled is not None and cancelled():
+                return False
+            time.sleep(min(wait, 0.5))
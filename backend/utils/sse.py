@@ -0,0 +1,14 @@
+from typing import Any, AsyncIterator, Tuple
+import json
+
+# Proxies (nginx) buffer responses unless told otherwise, which would hold back every event
+HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+MEDIA_TYPE = "text/event-stream"
+
+def format_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def encode(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    """Turns (event, data) pairs into Server-Sent Events frames"""
+    async for event, data in events:
+        yield format_event(event, data)
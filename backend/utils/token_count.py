@@ -0,0 +1,57 @@
+import math
+import re
+from functools import lru_cache
+
+from backend.utils.tokenizer import _CJK
+
+_CJK_CHAR = re.compile(f"[{_CJK}]")
+
+# Tokens per character (latin, CJK) by model family, from the providers'
+# published estimates; used when the model's own tokenizer isn't installed.
+_RATIOS = [
+    ("deepseek", 0.3, 0.6),
+    ("qwen", 0.28, 0.7),
+    ("glm", 0.28, 0.7),
+    ("gemini", 0.25, 0.5),
+    ("gpt", 0.25, 0.9),
+]
+_DEFAULT_RATIO = (0.3, 0.8)
+
+@lru_cache(maxsize=16)
+def _tiktoken_encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return None
+
+def _ratios(model: str) -> tuple[float, float]:
+    model = (model or "").lower()
+    for family, latin, cjk in _RATIOS:
+        if family in model:
+            return latin, cjk
+    return _DEFAULT_RATIO
+
+def count_tokens(text: str, model: str = "") -> int:
+    """Token count of `text` for `model`: exact with tiktoken for OpenAI models, estimated otherwise"""
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding(model.rsplit("/", 1)[-1]) if model else None
+    if encoding is not None:
+        return len(encoding.encode(text))
+    latin, cjk = _ratios(model)
+    cjk_chars = len(_CJK_CHAR.findall(text))
+    return math.ceil((len(text) - cjk_chars) * latin + cjk_chars * cjk)
+
+def count_message_tokens(messages: list, model: str = "") -> int:
+    """Prompt tokens of a chat request, including a few tokens of framing per message"""
+    total = 0
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, list):
+            content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+        total += count_tokens(str(content or ""), model) + 4
+    return total
@@ -0,0 +1,47 @@
+import re
+
+# Han, kana and Hangul have no spaces between words, so they are indexed as
+# overlapping character bigrams (a lone character stays a unigram).
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_SEGMENT = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+_CJK_RUN = re.compile(f"^[{_CJK}]+$")
+# camelCase / PascalCase / ACRONYMWord / digits
+_IDENT_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+def is_cjk(token: str) -> bool:
+    return bool(_CJK_RUN.match(token))
+
+def _cjk_tokens(run: str) -> list[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+def _word_tokens(word: str) -> list[str]:
+    if not word.isascii():
+        return [word.lower()]
+    parts = [p.lower() for p in _IDENT_PART.findall(word)]
+    whole = word.lower()
+    if len(parts) > 1:
+        # "orderId" matches both "order id" and "orderid"
+        return parts + [whole]
+    return [whole]
+
+def tokenize(text) -> list[str]:
+    """
+    Splits names, descriptions and queries into index terms: lowercased words
+    with identifiers split on case and underscores, plus CJK bigrams. Terms
+    contain only word characters, so they are safe to quote in FTS queries.
+    """
+    if not text:
+        return []
+    tokens = []
+    for segment in _SEGMENT.findall(str(text)):
+        if is_cjk(segment):
+            tokens.extend(_cjk_tokens(segment))
+        else:
+            tokens.extend(_word_tokens(segment))
+    return tokens
+
+def unique_tokens(text) -> list[str]:
+    """tokenize() without repeats, in first-seen order"""
+    return list(dict.fromkeys(tokenize(text)))
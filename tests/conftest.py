@@ -0,0 +1,46 @@
+import contextlib
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from backend.db.session import Base
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+@pytest.fixture
+def count_queries():
+    """Counts the SQL statements an engine executes inside the block:
+
+        with count_queries(engine) as counter:
+            dashboard_service.get_all_documents(db)
+        assert counter.count == 1
+    """
+    @contextlib.contextmanager
+    def _count(engine):
+        counter = QueryCounter()
+
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            counter.statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _before)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, "before_cursor_execute", _before)
+
+    return _count
+
+@pytest.fixture
+def db(tmp_path):
+    """Session on a fresh SQLite metadata database; its engine is db.get_bind()"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'metadata.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
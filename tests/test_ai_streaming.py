@@ -0,0 +1,121 @@
+import asyncio
+import json
+from backend.apis import ai as ai_api
+from backend.schemas import DataSourceBase
+from backend.services import ai_service, datasource_service, llm_http
+from backend.utils.cache import SQLiteCache
+from backend.utils.partial_json import extract_string_field
+
+ANSWER = '```json\n{"sql": "SELECT \\"ID\\" FROM T0", "explanation": "查询全部编号"}\n```'
+
+class _StreamingStrategy(ai_service.LLMStrategy):
+    name = "fake"
+
+    def __init__(self):
+        self.streams = 0
+
+    async def stream(self, messages, schema_hint=None):
+        self.streams += 1
+        for i in range(0, len(ANSWER), 4):
+            yield ANSWER[i:i + 4]
+
+def _datasource(db):
+    return datasource_service.create(db, DataSourceBase(
+        id=0, name="warehouse",
+        config={"type": "oracle", "name": "warehouse", "host": "h", "port": "1521", "username": "u"},
+        tables=[{"id": 0, "name": "T0", "description": "订单", "columns": [{"name": "ID", "type": "number"}], "rows": []}],
+    ))
+
+def _collect(agen):
+    async def run():
+        return [event async for event in agen]
+    return asyncio.run(run())
+
+def test_extract_string_field_from_partial_json():
+    assert extract_string_field('{"sq', "sql") == (None, False)
+    assert extract_string_field('{"sql": "SELECT \\"A', "sql") == ('SELECT "A', False)
+    assert extract_string_field('{"sql": "a\\nb", "x"', "sql") == ("a\nb", True)
+    assert extract_string_field('{"sql": "x\\u4e', "sql") == ("x", False)
+
+def test_stream_dataset_sql_emits_sql_before_result(db, tmp_path, monkeypatch):
+    ds = _datasource(db)
+    strategy = _StreamingStrategy()
+    monkeypatch.setattr(ai_service, "get_strategy", lambda: strategy)
+    monkeypatch.setattr(ai_service, "llm_cache", SQLiteCache(str(tmp_path / "llm.db")))
+    table_ids = [t.id for t in ds.tables]
+
+    events = _collect(ai_service.stream_dataset_sql(db, ds.id, table_ids, "所有编号"))
+    names = [name for name, _ in events]
+    assert names[0] == "tables" and names[-1] == "result"
+    sql_events = [data for name, data in events if name == "sql"]
+    assert sql_events[-1] == {"sql": 'SELECT "ID" FROM T0', "complete": True}
+    assert len(sql_events) > 2  # grew over several chunks
+    # The complete SQL arrives while the explanation is still streaming
+    complete_at = next(i for i, (name, data) in enumerate(events) if name == "sql" and data["complete"])
+    last_delta_at = max(i for i, name in enumerate(names) if name == "delta")
+    assert complete_at < last_delta_at - 3
+    result = events[-1][1]
+    assert result["explanation"] == "查询全部编号" and result["relevantTableIds"] == table_ids
+
+    # A repeated question is answered from the cache without streaming
+    cached = _collect(ai_service.stream_dataset_sql(db, ds.id, table_ids, "所有编号"))
+    assert strategy.streams == 1
+    assert [name for name, _ in cached] == ["tables", "sql", "result"]
+    ai_service.llm_cache.close()
+
+def test_stream_dataset_sql_ends_with_error_on_unexpected_failure(db, monkeypatch):
+    ds = _datasource(db)
+
+    def broken(*args):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(ai_service, "_dataset_sql_request", broken)
+    events = _collect(ai_service.stream_dataset_sql(db, ds.id, [t.id for t in ds.tables], "q", skip_auto_select=True))
+    assert [name for name, _ in events] == ["error"]
+    assert "database is locked" in events[0][1]["detail"]
+
+def test_sse_endpoint_frames(db, tmp_path, monkeypatch):
+    ds = _datasource(db)
+    monkeypatch.setattr(ai_service, "get_strategy", lambda: _StreamingStrategy())
+    monkeypatch.setattr(ai_service, "llm_cache", SQLiteCache(str(tmp_path / "llm.db")))
+
+    async def run():
+        response = await ai_api.generate_dataset_sql_stream(
+            {"dataSourceId": ds.id, "tableIds": [t.id for t in ds.tables], "userQuery": "q", "useCache": False}, db
+        )
+        assert response.media_type == "text/event-stream"
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    frames = [f for f in asyncio.run(run()).split("\n\n") if f]
+    assert frames[0].startswith("event: tables\ndata: ")
+    last_event, last_data = frames[-1].split("\n")
+    assert last_event == "event: result"
+    assert json.loads(last_data[len("data: "):])["sql"] == 'SELECT "ID" FROM T0'
+    ai_service.llm_cache.close()
+
+def test_requests_fallback_parses_sse_deltas(monkeypatch):
+    class _Resp:
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self, decode_unicode=True):
+            yield 'data: {"choices": [{"delta": {"role": "assistant"}}]}'
+            yield ""
+            yield 'data: {"choices": [{"delta": {"content": "{\\"sql\\""}}]}'
+            yield 'data: {"choices": [{"delta": {"content": ": \\"S\\"}"}}]}'
+            yield "data: [DONE]"
+
+        def close(self):
+            pass
+
+    class _Session:
+        def post(self, url, **kwargs):
+            assert kwargs["stream"] is True and kwargs["json"]["stream"] is True
+            assert kwargs["json"]["enable_thinking"] is False
+            return _Resp()
+
+    monkeypatch.setattr(llm_http, "_async_sdk_available", lambda: False)
+    monkeypatch.setattr(llm_http, "get_session", lambda provider: _Session())
+    payload = {"model": "m", "messages": [], "extra_body": {"enable_thinking": False}}
+    deltas = _collect(llm_http.stream_chat("p", "https://example.com/v1", "k", payload))
+    assert "".join(deltas) == '{"sql": "S"}'
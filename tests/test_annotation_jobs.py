@@ -0,0 +1,98 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy.orm import sessionmaker
+from backend.models import ColumnAnnotation, TableEntry
+from backend.schemas import DataSourceBase
+from backend.services import annotation_job_service, datasource_service, mock_llm_service
+from backend.utils.rate_limit import TokenBucket
+
+@pytest.fixture
+def warehouse(db, monkeypatch):
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    monkeypatch.setattr(mock_llm_service, "LATENCY", "fixed:0")
+    monkeypatch.setattr(mock_llm_service, "ERROR_RATE", 0)
+    monkeypatch.setattr(annotation_job_service, "_buckets", {"mock": TokenBucket(1000, 1000)})
+    tables = [{"id": 0, "name": "WIDE", "description": "宽表",
+               "columns": [{"name": f"C{i}", "type": "number"} for i in range(40)], "rows": []}]
+    tables += [{"id": i, "name": f"SMALL{i}", "description": None,
+                "columns": [{"name": "ID", "type": "number"}, {"name": "NAME", "type": "string"}], "rows": []}
+               for i in range(1, 6)]
+    tables[1]["columns"][0].update(alias="主键", description="人工填写")
+    ds = datasource_service.create(db, DataSourceBase(
+        id=0, name="warehouse",
+        config={"type": "oracle", "name": "warehouse", "host": "h", "port": "1521", "username": "u"},
+        tables=tables,
+    ))
+    return db, sessionmaker(bind=db.get_bind()), ds
+
+def _wait(job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        snapshot = annotation_job_service.get(job_id).snapshot()
+        if snapshot["status"] != "running":
+            return snapshot
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() == 0 and bucket.try_acquire() == 0
+    assert 0 < bucket.try_acquire() <= 0.1
+    start = time.perf_counter()
+    assert bucket.acquire()
+    assert time.perf_counter() - start >= 0.05
+    assert not bucket.acquire(cancelled=lambda: True)
+
+def test_plan_packs_small_tables_and_chunks_wide_ones(monkeypatch):
+    monkeypatch.setattr(annotation_job_service, "CHUNK_COLUMNS", 10)
+    monkeypatch.setattr(annotation_job_service, "PACK_MAX_TABLES", 3)
+    small = [{"id": i, "name": f"S{i}", "columns": [{"name": "A"}, {"name": "B", "alias": "b", "description": "d"}]} for i in range(4)]
+    wide = {"id": 9, "name": "W", "columns": [{"name": f"C{i}"} for i in range(25)]}
+    units = annotation_job_service.plan_units(small[:2] + [wide] + small[2:])
+    assert [[t["id"] for t in u] for u in units] == [[9], [9], [9], [0, 1, 2], [3]]
+    assert [len(u[0]["columns"]) for u in units[:3]] == [10, 10, 5]
+    assert units[3][0]["columns"] == [{"name": "A", "type": None}]  # annotated columns are skipped
+    assert len(annotation_job_service.plan_units(small, overwrite=True)[0][0]["columns"]) == 2
+
+def test_job_annotates_incrementally_and_keeps_manual_annotations(warehouse, monkeypatch):
+    db, factory, ds = warehouse
+    monkeypatch.setattr(annotation_job_service, "CHUNK_COLUMNS", 15)
+    snapshot = annotation_job_service.start(db, ds.id, use_cache=False, session_factory=factory)
+    assert snapshot["totalTables"] == 6 and snapshot["totalUnits"] == 4  # 3 chunks of WIDE + 1 pack of 5 small tables
+    done = _wait(snapshot["id"])
+    assert done["status"] == "completed" and done["failedUnits"] == 0
+    assert done["completedTables"] == 6 and done["annotatedColumns"] == 49
+
+    db.expire_all()
+    tables = {t.name: t for t in db.query(TableEntry).filter(TableEntry.dataSourceId == ds.id)}
+    assert all(c["alias"] and c["description"] for t in tables.values() for c in t.columns)
+    assert tables["SMALL1"].columns[0]["alias"] == "主键"
+    assert tables["SMALL1"].columns[0]["description"] == "人工填写"
+    assert tables["WIDE"].columns[39]["description"] == "WIDE.C39 的模拟说明"
+    # Only the manual annotation is a dictionary vote; the model's answers are not
+    assert [(e.name_key, e.count) for e in db.query(ColumnAnnotation)] == [("ID", 1)]
+
+    # Nothing left to annotate: the job finishes immediately
+    again = annotation_job_service.start(db, ds.id, use_cache=False, session_factory=factory)
+    assert again["status"] == "completed" and again["totalUnits"] == 0
+
+def test_progress_stream_and_cancel(warehouse, monkeypatch):
+    db, factory, ds = warehouse
+    monkeypatch.setattr(annotation_job_service, "PROGRESS_INTERVAL", 0.01)
+    monkeypatch.setattr(annotation_job_service, "_buckets", {"mock": TokenBucket(0.5, 1)})
+    snapshot = annotation_job_service.start(db, ds.id, use_cache=False, session_factory=factory)
+    job = annotation_job_service.get(snapshot["id"])
+
+    async def collect():
+        events = []
+        async for event in annotation_job_service.stream_progress(job):
+            events.append(event)
+            if event[0] == "progress" and event[1]["completedUnits"]:
+                job.cancel()
+        return events
+
+    events = asyncio.run(collect())
+    assert events[-1][0] == "done" and events[-1][1]["status"] == "cancelled"
+    assert events[-1][1]["completedUnits"] == 1
+    assert events[-1][1]["skippedUnits"] == snapshot["totalUnits"] - 1
@@ -0,0 +1,121 @@
+import time
+from sqlalchemy.orm import sessionmaker
+from backend.models import ColumnAnnotation, TableEntry
+from backend.schemas import ColumnPatch, DataSourceBase
+from backend.services import ai_service, annotation_job_service, column_dictionary_service, datasource_service
+from backend.utils.rate_limit import TokenBucket
+
+CONFIG = {"type": "oracle", "name": "warehouse", "host": "h", "port": "1521", "username": "u"}
+CREATED_BY = {"alias": "创建人", "description": "记录创建人的工号"}
+
+def _datasource(db):
+    # The same audit column, spelled differently, annotated on two tables
+    tables = [
+        {"id": 1, "name": "ORDERS", "description": None, "rows": [],
+         "columns": [{"name": "CREATED_BY", "type": "VARCHAR2(50)", **CREATED_BY}, {"name": "AMOUNT", "type": "NUMBER"}]},
+        {"id": 2, "name": "ITEMS", "description": None, "rows": [],
+         "columns": [{"name": "created_by", "type": "NVARCHAR2(20)", **CREATED_BY}, {"name": "SKU", "type": "VARCHAR2(10)"}]},
+    ]
+    return datasource_service.create(db, DataSourceBase(id=0, name="warehouse", config=CONFIG, tables=tables))
+
+def _count(db, name_key):
+    return sum(e.count for e in db.query(ColumnAnnotation).filter(ColumnAnnotation.name_key == name_key))
+
+def test_normalization():
+    assert column_dictionary_service.normalize_name("Created_By") == column_dictionary_service.normalize_name("CREATEDBY")
+    assert column_dictionary_service.normalize_type("VARCHAR2(50)") == column_dictionary_service.normalize_type("nvarchar2(20)")
+    assert column_dictionary_service.normalize_type("NUMBER(10,2)") != column_dictionary_service.normalize_type("DATE")
+
+def test_saves_learn_and_unchanged_columns_do_not_revote(db):
+    ds = _datasource(db)
+    assert _count(db, "CREATEDBY") == 2
+    assert column_dictionary_service.lookup(db, [{"name": "CreatedBy", "type": "varchar(8)"}]) == {("CREATEDBY", "string"): CREATED_BY}
+    # Same name, other type family: unknown
+    assert column_dictionary_service.lookup(db, [{"name": "CREATED_BY", "type": "NUMBER"}]) == {}
+
+    orders = next(t for t in ds.tables if t.name == "ORDERS")
+    datasource_service.patch_column(db, ds.id, orders.id, "AMOUNT", ColumnPatch(alias="金额"))
+    assert _count(db, "CREATEDBY") == 2 and _count(db, "AMOUNT") == 1
+    assert column_dictionary_service.lookup(db, [{"name": "AMOUNT", "type": "NUMBER"}]) == {}  # a single vote is not enough
+
+    # A conflicting annotation only wins with a majority; a tie is not used
+    items = next(t for t in ds.tables if t.name == "ITEMS")
+    datasource_service.patch_column(db, ds.id, orders.id, "CREATED_BY", ColumnPatch(description="下单人"))
+    assert column_dictionary_service.lookup(db, [{"name": "CREATED_BY", "type": "VARCHAR2"}]) == {("CREATEDBY", "string"): CREATED_BY}
+    datasource_service.patch_column(db, ds.id, items.id, "created_by", ColumnPatch(description="下单人"))
+    assert column_dictionary_service.lookup(db, [{"name": "CREATED_BY", "type": "VARCHAR2"}]) == {}
+    # Rebuilding keeps only what the tables carry now: both columns say 下单人
+    assert column_dictionary_service.rebuild(db) == 2
+    assert column_dictionary_service.lookup(db, [{"name": "CREATED_BY", "type": "VARCHAR2"}]) == {
+        ("CREATEDBY", "string"): {"alias": "创建人", "description": "下单人"}
+    }
+
+def test_resaving_a_datasource_does_not_revote(db):
+    ds = _datasource(db)
+    tables = [{"id": t.id, "name": t.name, "description": t.description, "rows": t.rows, "columns": t.columns} for t in ds.tables]
+    # Every table changes (a new column) but CREATED_BY keeps its annotation
+    for i in range(3):
+        for t in tables:
+            t["columns"] = t["columns"] + [{"name": f"EXTRA_{i}", "type": "NUMBER"}]
+        datasource_service.update(db, ds.id, DataSourceBase(id=ds.id, name="warehouse", config=CONFIG, tables=tables))
+    assert _count(db, "CREATEDBY") == 2
+
+    tables[0]["columns"][0] = {**tables[0]["columns"][0], "description": "下单人"}
+    datasource_service.update(db, ds.id, DataSourceBase(id=ds.id, name="warehouse", config=CONFIG, tables=tables))
+    assert _count(db, "CREATEDBY") == 3
+
+def test_table_created_later_is_picked_up(db, monkeypatch):
+    engine = db.get_bind()
+    ColumnAnnotation.__table__.drop(bind=engine)
+    column_dictionary_service._available.clear()
+    assert column_dictionary_service.is_available(db) is False
+    db.rollback()
+    ColumnAnnotation.__table__.create(bind=engine)
+    assert column_dictionary_service.is_available(db) is False  # within the recheck window
+    monkeypatch.setattr(column_dictionary_service, "MISSING_RECHECK_SECONDS", 0)
+    assert column_dictionary_service.is_available(db) is True
+
+def test_only_unknown_columns_go_to_the_llm(db, monkeypatch):
+    ds = _datasource(db)
+    prompts = []
+
+    def fake_call(messages, schema_hint=None, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return {"annotations": [{"columnName": "PRICE", "alias": "价格", "description": "单价"}]}
+
+    monkeypatch.setattr(ai_service, "_call_llm", fake_call)
+    columns = [{"name": "PRICE", "type": "NUMBER"}, {"name": "CreatedBy", "type": "VARCHAR2(30)"}]
+    result = ai_service.generate_table_annotations("PRODUCTS", None, columns, db=db)
+    assert [a["columnName"] for a in result] == ["PRICE", "CreatedBy"]
+    assert result[1]["alias"] == "创建人"
+    assert len(prompts) == 1 and "PRICE" in prompts[0] and "CreatedBy" not in prompts[0]
+
+    prompts.clear()
+    assert ai_service.generate_table_annotations("AUDIT", None, columns[1:], db=db) == [{"columnName": "CreatedBy", **CREATED_BY}]
+    assert prompts == []
+
+def test_job_fills_dictionary_hits_without_llm_calls(db, monkeypatch):
+    ds = _datasource(db)
+    monkeypatch.setattr(annotation_job_service, "_buckets", {"mock": TokenBucket(1000, 1000)})
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    datasource_service.update(db, ds.id, DataSourceBase(id=ds.id, name="warehouse", config=CONFIG, tables=[
+        {"id": 99, "name": "LOG", "description": None, "rows": [], "columns": [{"name": "CREATED_BY", "type": "VARCHAR2(8)"}]},
+    ] + [{"id": t.id, "name": t.name, "description": t.description, "rows": t.rows, "columns": t.columns} for t in ds.tables]))
+    calls = []
+    monkeypatch.setattr(ai_service, "generate_multi_table_annotations", lambda unit, use_cache=True: calls.append(unit) or {})
+
+    snapshot = annotation_job_service.start(db, ds.id, use_cache=False, session_factory=sessionmaker(bind=db.get_bind()))
+    assert snapshot["dictionaryColumns"] == 1
+    # LOG was answered by the dictionary; AMOUNT and SKU still need the model
+    assert snapshot["totalUnits"] == 1
+    deadline = time.time() + 5
+    while annotation_job_service.get(snapshot["id"]).snapshot()["status"] == "running" and time.time() < deadline:
+        time.sleep(0.02)
+    assert [t["name"] for t in calls[0]] == ["ORDERS", "ITEMS"]
+    assert [c["name"] for t in calls[0] for c in t["columns"]] == ["AMOUNT", "SKU"]
+
+    db.expire_all()
+    log = db.query(TableEntry).filter(TableEntry.name == "LOG").one()
+    assert {k: log.columns[0][k] for k in ("alias", "description")} == CREATED_BY
+    # Filling LOG from the dictionary is not another vote for the entry
+    assert _count(db, "CREATEDBY") == 2
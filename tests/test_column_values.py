@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import MagicMock
+from backend.models.orm import Dataset
+from backend.services import dataset_service, sql_builder
+
+def test_escape_like_prefix():
+    assert sql_builder.escape_like_prefix("50%_a!") == "50!%!_a!!%"
+
+def test_build_distinct_values_sql_with_prefix():
+    sql = sql_builder.build_distinct_values_sql("postgres", "SELECT * FROM p", "name", with_prefix=True)
+    assert "UPPER(CAST(\"name\" AS TEXT)) LIKE UPPER(:prefix) ESCAPE '!'" in sql
+    assert sql.endswith("GROUP BY \"name\" ORDER BY COUNT(*) DESC, \"name\"")
+
+def _mock_db():
+    db = MagicMock()
+    dataset = Dataset(id=1, name="ds", dataSourceId=9, sql="SELECT * FROM projects")
+    db.query.return_value.filter.return_value.first.return_value = dataset
+    return db
+
+def test_get_column_values_small_column_is_dropdown_and_cached(monkeypatch):
+    dataset_service._column_values_cache.invalidate()
+    calls = []
+    def fake_execute(request):
+        calls.append(request)
+        return {"success": True, "columns": ["status", "value_count"], "rows": [
+            {"status": "Open", "value_count": 10}, {"status": "Closed", "value_count": 3}
+        ]}
+    monkeypatch.setattr(dataset_service, "_build_execute_request", lambda db, ds, sql, limit: dataset_service.ExecuteSqlRequest(
+        type="postgres", host="h", port="1", username="u", sql=sql, limit=limit))
+    monkeypatch.setattr(dataset_service.datasource_service, "execute_sql", fake_execute)
+
+    first = dataset_service.get_column_values(_mock_db(), 1, "status")
+    second = dataset_service.get_column_values(_mock_db(), 1, "status")
+
+    assert first == second
+    assert len(calls) == 1
+    assert first["widget"] == "dropdown"
+    assert first["cardinalityExact"] is True
+    assert first["values"][0] == {"value": "Open", "count": 10}
+
+def test_get_column_values_high_cardinality_uses_bounded_probe(monkeypatch):
+    dataset_service._column_values_cache.invalidate()
+    monkeypatch.setattr(dataset_service, "_build_execute_request", lambda db, ds, sql, limit: dataset_service.ExecuteSqlRequest(
+        type="mysql", host="h", port="1", username="u", sql=sql, limit=limit))
+    monkeypatch.setattr(dataset_service, "CARDINALITY_PROBE_MAX", 1000)
+    probes = []
+
+    def fake_execute(request):
+        if "distinct_count" in request.sql:
+            probes.append(request)
+            # The database stops at :cap distinct values
+            return {"success": True, "columns": ["distinct_count"], "rows": [{"distinct_count": min(30_000, request.params["cap"])}]}
+        return {"success": True, "columns": ["name", "value_count"],
+                "rows": [{"name": f"p{i}", "value_count": 1} for i in range(request.limit)]}
+
+    monkeypatch.setattr(dataset_service.datasource_service, "execute_sql", fake_execute)
+    monkeypatch.setattr(dataset_service.datasource_service, "iter_sql_chunks", lambda *a, **k: pytest.fail("values streamed to Python"))
+
+    result = dataset_service.get_column_values(_mock_db(), 1, "name", limit=50)
+
+    assert result["truncated"] is True
+    assert len(result["values"]) == 50
+    assert result["widget"] == "search"
+    assert result["cardinality"] == 1000 and result["cardinalityExact"] is False
+    assert len(probes) == 1 and probes[0].params == {"cap": 1001}
+    assert "SELECT DISTINCT `name`" in probes[0].sql and probes[0].sql.count("LIMIT :cap") == 1
+
+def test_distinct_count_probe_sql_for_oracle():
+    sql = sql_builder.build_distinct_count_probe_sql("oracle", "SELECT * FROM p;", "NAME")
+    assert "WHERE ROWNUM <= :cap" in sql and "LIMIT" not in sql
@@ -0,0 +1,47 @@
+from sqlalchemy import inspect, text
+
+from backend.models.orm import DataSource, TableEntry, Widget
+from backend.models.types import compress_bytes, decompress_bytes
+
+
+def test_compress_round_trip_and_legacy_values():
+    payload = ("列" * 500).encode("utf-8")
+    packed = compress_bytes(payload)
+    assert len(packed) < len(payload)
+    assert decompress_bytes(packed) == payload
+    assert decompress_bytes(compress_bytes(b"[]")) == b"[]"
+    # Values written before the migration are plain text/JSON
+    assert decompress_bytes('{"a": 1}') == b'{"a": 1}'
+    assert decompress_bytes(b'{"a": 1}') == b'{"a": 1}'
+
+
+def test_default_codec_is_readable_everywhere():
+    # zstd needs the optional zstandard package on every reader, so it is opt-in
+    assert compress_bytes(("列" * 500).encode("utf-8"))[:3] == b"\x00zl"
+
+
+def test_blob_columns_are_compressed_and_deferred(db):
+    engine = db.get_bind()
+    rows = [{"id": i, "name": f"name {i}"} for i in range(200)]
+    ds = DataSource(name="ds", config={})
+    ds.tables.append(TableEntry(name="t", columns=[{"name": "id", "type": "number"}], rows=rows))
+    db.add(ds)
+    db.add(Widget(name="w", type="web", content="<div>hello</div>" * 100))
+    db.commit()
+
+    with engine.connect() as conn:
+        raw = conn.execute(text("SELECT rows FROM tables")).scalar()
+    assert isinstance(raw, bytes) and raw.startswith(b"\x00")
+    assert len(raw) < len(str(rows))
+
+    db.expunge_all()
+    table = db.query(TableEntry).one()
+    assert "rows" in inspect(table).unloaded
+    assert table.rows == rows
+
+    # Legacy uncompressed text is still readable
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE widgets SET content = 'plain'"))
+    db.expunge_all()
+    assert db.query(Widget).one().content == "plain"
+    db.close()
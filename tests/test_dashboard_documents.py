@@ -0,0 +1,67 @@
+import json
+from fastapi.encoders import jsonable_encoder
+import backend.schemas as schemas
+from backend.models import Dashboard, DashboardDocument
+from backend.schemas import DashboardBase, WidgetUpdate
+from backend.services import dashboard_service, widget_service
+
+def _dashboard(widgets):
+    return DashboardBase(
+        id=1, name="sales", createdAt=1,
+        widgets=[
+            {
+                "id": f"tmp-{i}",
+                "config": {"type": "bar", "xAxisKey": "x", "dataKeys": ["y"], "title": title, "description": ""},
+                "timestamp": 0,
+                "layout": {"colSpan": 6, "height": 300, "i": i},
+            }
+            for i, title in enumerate(widgets)
+        ],
+    )
+
+def test_document_rebuilt_on_dashboard_write(db):
+    dashboard_service.create_or_update(db, _dashboard(["b", "a"]))
+
+    version, body = dashboard_service.get_document(db, 1)
+    doc = json.loads(body)
+    assert version == 1
+    assert [w["config"]["title"] for w in doc["widgets"]] == ["b", "a"]
+    # Same payload the response_model path would have produced
+    assert doc == jsonable_encoder(schemas.Dashboard(**dashboard_service.get_by_id(db, 1)))
+
+    dashboard_service.update(db, 1, _dashboard(["c"]))
+    version, body = dashboard_service.get_document(db, 1)
+    assert version == 2
+    assert [w["config"]["title"] for w in json.loads(body)["widgets"]] == ["c"]
+
+def test_document_follows_widget_update_and_delete(db):
+    created = dashboard_service.create_or_update(db, _dashboard(["a", "b"]))
+    first, second = (w["id"] for w in created["widgets"])
+
+    config = dict(created["widgets"][0]["config"], title="renamed")
+    widget_service.update(db, first, WidgetUpdate(config=config))
+    version, body = dashboard_service.get_document(db, 1)
+    assert version == 2
+    assert json.loads(body)["widgets"][0]["config"]["title"] == "renamed"
+
+    widget_service.delete(db, second)
+    version, body = dashboard_service.get_document(db, 1)
+    assert version == 3
+    assert [w["id"] for w in json.loads(body)["widgets"]] == [first]
+
+def test_reads_build_missing_documents_without_writing(db):
+    db.add(Dashboard(id=5, name="legacy", createdAt=0))
+    db.commit()
+
+    docs = json.loads(dashboard_service.get_all_documents(db))
+    assert [(d["id"], d["widgets"]) for d in docs] == [(5, [])]
+    version, body = dashboard_service.get_document(db, 5)
+    assert version == 0 and json.loads(body)["name"] == "legacy"
+    assert dashboard_service.get_document(db, 6) is None
+    # Persisting is left to the write paths / backfill script
+    assert not db.new and not db.dirty
+    assert db.get(DashboardDocument, 5) is None
+
+    dashboard_service.write_documents(db, [5])
+    db.commit()
+    assert db.get(DashboardDocument, 5).version == 1
@@ -0,0 +1,51 @@
+import json
+import pytest
+from backend.models import Dashboard, Widget, DashboardWidget
+from backend.services import dashboard_service
+
+def _seed(db, dashboards, widgets_per_dashboard):
+    widget_id = 1
+    for d in range(1, dashboards + 1):
+        db.add(Dashboard(id=d, name=f"d{d}", createdAt=0))
+        for i in range(widgets_per_dashboard):
+            db.add(Widget(id=widget_id, name=f"w{widget_id}", config={"type": "bar"}, createdAt=0))
+            db.add(DashboardWidget(dashboard_id=d, widget_id=widget_id, layout={"i": i, "colSpan": 6, "height": 4}))
+            widget_id += 1
+    db.commit()
+    db.expunge_all()
+
+@pytest.mark.parametrize("dashboards, per", [(2, 1), (20, 15)])
+@pytest.mark.parametrize("stored, expected", [
+    (True, 1),   # documents joined to dashboards, nothing serialized
+    (False, 4),  # + dashboards, associations, widgets for the ones without a document
+])
+def test_list_endpoint_query_count_is_constant(db, count_queries, dashboards, per, stored, expected):
+    _seed(db, dashboards, per)
+    if stored:
+        dashboard_service.write_documents(db, range(1, dashboards + 1))
+        db.commit()
+        db.expunge_all()
+    with count_queries(db.get_bind()) as counter:
+        result = json.loads(dashboard_service.get_all_documents(db))
+    assert counter.count == expected
+    assert [d["id"] for d in result] == list(range(1, dashboards + 1))
+    assert all(len(d["widgets"]) == per for d in result)
+
+def test_list_endpoint_mixes_stored_and_missing_documents(db, count_queries):
+    _seed(db, 10, 3)
+    dashboard_service.write_documents(db, [2, 5])
+    db.commit()
+    db.expunge_all()
+    with count_queries(db.get_bind()) as counter:
+        result = json.loads(dashboard_service.get_all_documents(db))
+    assert counter.count == 4
+    assert [d["id"] for d in result] == list(range(1, 11))
+    assert all(len(d["widgets"]) == 3 for d in result)
+
+def test_get_by_id_eager_loads_widgets(db, count_queries):
+    _seed(db, 3, 5)
+    with count_queries(db.get_bind()) as counter:
+        d = dashboard_service.get_by_id(db, 2)
+    assert counter.count == 3
+    assert [w["layout"]["i"] for w in d["widgets"]] == [0, 1, 2, 3, 4]
+    assert d["widgets"][0]["config"]["title"] == "w6"
@@ -0,0 +1,68 @@
+from backend.models import DashboardWidget
+from backend.schemas import DashboardBase
+from backend.services import dashboard_service
+
+def _widget(id, i, col_span=6):
+    return {
+        "id": id,
+        "config": {"type": "bar", "xAxisKey": "x", "dataKeys": ["y"], "title": f"w{i}", "description": ""},
+        "timestamp": 0,
+        "layout": {"colSpan": col_span, "height": 300, "i": i},
+    }
+
+def _writes(statements):
+    return [s for s in statements if not s.lstrip().upper().startswith("SELECT")]
+
+def test_new_widgets_are_inserted_in_bulk(db, count_queries):
+    engine = db.get_bind()
+    # Warm-up save so both measured saves find the collection version rows
+    dashboard_service.create_or_update(db, DashboardBase(id=9, name="w", createdAt=0, widgets=[_widget("tmp", 0)]))
+    few = DashboardBase(id=1, name="a", createdAt=0, widgets=[_widget(f"tmp-{i}", i) for i in range(2)])
+    many = DashboardBase(id=2, name="b", createdAt=0, widgets=[_widget(f"tmp-{i}", i) for i in range(40)])
+
+    with count_queries(engine) as small:
+        dashboard_service.create_or_update(db, few)
+    with count_queries(engine) as large:
+        saved = dashboard_service.create_or_update(db, many)
+
+    assert len(saved["widgets"]) == 40
+    # Each new widget got its own layout
+    assert all(w["config"]["title"] == f"w{w['layout']['i']}" for w in saved["widgets"])
+    # Statement count does not grow with the number of widgets
+    assert large.count == small.count
+
+def test_unchanged_autosave_skips_writes(db, count_queries):
+    engine = db.get_bind()
+    saved = dashboard_service.create_or_update(
+        db, DashboardBase(id=1, name="a", createdAt=0, widgets=[_widget(f"tmp-{i}", i) for i in range(10)])
+    )
+    ids = [w["id"] for w in saved["widgets"]]
+    same = DashboardBase(id=1, name="a", createdAt=0, widgets=[_widget(id, i) for i, id in enumerate(ids)])
+
+    with count_queries(engine) as counter:
+        dashboard_service.create_or_update(db, same)
+    assert _writes(counter.statements) == []
+
+    moved = same.copy(deep=True)
+    moved.widgets[3].layout.colSpan = 12
+    with count_queries(engine) as counter:
+        dashboard_service.create_or_update(db, moved)
+    layout_updates = [s for s in _writes(counter.statements) if "dashboard_widgets" in s]
+    assert len(layout_updates) == 1
+    assert db.get(DashboardWidget, (1, ids[3])).layout["colSpan"] == 12
+
+def test_removed_and_reused_widgets(db):
+    first = dashboard_service.create_or_update(
+        db, DashboardBase(id=1, name="a", createdAt=0, widgets=[_widget("tmp-0", 0), _widget("tmp-1", 1)])
+    )
+    keep, drop = (w["id"] for w in first["widgets"])
+
+    # Existing widget placed on a second dashboard, plus a duplicate entry
+    second = dashboard_service.create_or_update(
+        db, DashboardBase(id=2, name="b", createdAt=0, widgets=[_widget(keep, 0), _widget(keep, 1)])
+    )
+    assert [w["id"] for w in second["widgets"]] == [keep]
+
+    updated = dashboard_service.update(db, 1, DashboardBase(id=1, name="a", createdAt=0, widgets=[_widget(keep, 0)]))
+    assert [w["id"] for w in updated["widgets"]] == [keep]
+    assert db.query(DashboardWidget).filter(DashboardWidget.widget_id == drop).count() == 0
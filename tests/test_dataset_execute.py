@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import MagicMock
+from backend.models.orm import Dataset
+from backend.schemas.base import DatasetExecuteOptions
+from backend.services import dataset_service
+
+def _mock_db():
+    db = MagicMock()
+    dataset = Dataset(id=1, name="ds", dataSourceId=9, sql="SELECT * FROM readings")
+    db.query.return_value.filter.return_value.first.return_value = dataset
+    return db
+
+def _use_postgres(monkeypatch):
+    monkeypatch.setattr(dataset_service, "_build_execute_request", lambda db, ds, sql, limit: dataset_service.ExecuteSqlRequest(
+        type="postgres", host="h", port="1", username="u", sql=sql, limit=limit))
+
+def test_time_bucket_lifts_the_preview_limit_and_flags_truncation(monkeypatch):
+    _use_postgres(monkeypatch)
+    monkeypatch.setattr(dataset_service, "TIME_BUCKET_MAX_ROWS", 400)
+    limits = []
+
+    def fake_execute(request):
+        limits.append(request.limit)
+        return {"success": True, "columns": ["bucket"], "rows": [{"bucket": i} for i in range(min(request.limit, days))]}
+
+    monkeypatch.setattr(dataset_service.datasource_service, "execute_sql", fake_execute)
+    options = DatasetExecuteOptions(timeBucket={"column": "ts", "unit": "day", "metrics": [{"column": "v", "agg": "avg"}]})
+
+    days = 365
+    result = dataset_service.execute_query(_mock_db(), 1, 100, options)
+    assert limits == [401]
+    assert len(result["rows"]) == 365 and result["truncated"] is False
+
+    days = 1000
+    result = dataset_service.execute_query(_mock_db(), 1, 100, options)
+    assert len(result["rows"]) == 400 and result["truncated"] is True
+
+def test_downsample_reads_the_full_series_not_the_preview(monkeypatch):
+    _use_postgres(monkeypatch)
+    monkeypatch.setattr(dataset_service.datasource_service, "execute_sql", lambda request: pytest.fail("preview query used"))
+
+    def fake_chunks(request, chunk_size=5000):
+        for start in range(0, 20_000, chunk_size):
+            yield ["ts", "v", "payload"], [[i, float(i % 50), "x" * 100] for i in range(start, start + chunk_size)]
+
+    monkeypatch.setattr(dataset_service.datasource_service, "iter_sql_chunks", fake_chunks)
+    options = DatasetExecuteOptions(downsample={"xColumn": "ts", "yColumns": ["v"], "targetPoints": 600})
+    result = dataset_service.execute_query(_mock_db(), 1, 100, options)
+    assert result["downsampled"]["originalRows"] == 20_000
+    assert 100 < len(result["rows"]) <= 600
+    # Only the charted columns are kept and returned
+    assert result["columns"] == ["ts", "v"]
+    assert result["rows"][0] == {"ts": 0, "v": 0.0} and result["rows"][-1]["ts"] == 19_999
+    assert result["truncated"] is False
+
+    monkeypatch.setattr(dataset_service, "DOWNSAMPLE_MAX_ROWS", 8000)
+    result = dataset_service.execute_query(_mock_db(), 1, 100, options)
+    assert result["downsampled"]["originalRows"] == 8000 and result["truncated"] is True
+
+    options = DatasetExecuteOptions(downsample={"xColumn": "ts", "yColumns": ["missing"]})
+    assert dataset_service.execute_query(_mock_db(), 1, 100, options)["success"] is False
@@ -0,0 +1,95 @@
+import gzip
+import os
+import threading
+import time
+import pytest
+from backend.services import export_service
+
+def _batches():
+    yield ["id", "name"], [[1, "北京"], [2, "上海"]]
+    yield ["id", "name"], [[3, None]]
+
+def test_csv_chunks_streams_one_chunk_per_batch():
+    chunks = list(export_service.csv_chunks(_batches()))
+    assert len(chunks) == 2
+    text = b"".join(chunks).decode("utf-8")
+    assert text.startswith("\ufeffid,name\r\n")
+    assert text.endswith("3,\r\n")
+    assert "2,上海" in text
+
+def test_csv_chunks_writes_header_for_empty_result():
+    chunks = list(export_service.csv_chunks(iter([(["a", "b"], [])])))
+    assert b"".join(chunks).decode("utf-8") == "\ufeffa,b\r\n"
+
+def test_gzip_chunks_round_trip():
+    raw = b"".join(export_service.csv_chunks(_batches()))
+    compressed = b"".join(export_service.gzip_chunks(export_service.csv_chunks(_batches())))
+    assert gzip.decompress(compressed) == raw
+
+def test_build_export_file_is_atomic_and_fresh(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_service, "EXPORT_DIR", str(tmp_path))
+    path = export_service.export_file_path(7, "SELECT 1 FROM dual", "csv", True)
+    assert path.endswith(".csv.gz")
+    assert not export_service.is_fresh(path)
+
+    export_service.build_export_file(path, "csv", True, _batches())
+
+    assert export_service.is_fresh(path)
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert f.read().splitlines()[1] == "1,北京"
+
+def test_concurrent_builds_of_one_export_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_service, "EXPORT_DIR", str(tmp_path))
+    path = export_service.export_file_path(7, "SELECT 1 FROM dual", "csv", False)
+    both_writing = threading.Barrier(2, timeout=5)
+
+    def batches():
+        yield ["id"], [[1]]
+        both_writing.wait()  # both requests are mid-write on the same export
+        yield ["id"], [[2]]
+
+    errors = []
+
+    def build():
+        try:
+            export_service.build_export_file(path, "csv", False, batches())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+    with open(path, encoding="utf-8-sig") as f:
+        assert f.read().splitlines() == ["id", "1", "2"]
+
+def test_expired_exports_are_pruned_on_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_service, "EXPORT_DIR", str(tmp_path))
+    stale = tmp_path / "dataset-1-old.csv"
+    stale.write_text("id\n")
+    expired = time.time() - export_service.EXPORT_TTL_SECONDS - 1
+    os.utime(stale, (expired, expired))
+
+    path = export_service.export_file_path(2, "SELECT 2 FROM dual", "csv", False)
+    export_service.build_export_file(path, "csv", False, _batches())
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+def test_parquet_widens_types_that_change_between_batches(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "out.parquet")
+    batches = [
+        (["id", "note", "amount"], [[1, None, 10], [2, None, 20]]),
+        (["id", "note", "amount"], [[3, 42, 30.5]]),     # NULLs then ints, ints then floats
+        (["id", "note", "amount"], [[4, "备注", None]]),
+    ]
+    export_service._write_parquet(path, iter(batches))
+    table = pq.read_table(path)
+    assert str(table.schema.field("amount").type) == "double"
+    assert table.column("amount").to_pylist() == [10.0, 20.0, 30.5, None]
+    assert table.column("note").to_pylist() == [None, None, "42", "备注"]
+    assert table.column("id").to_pylist() == [1, 2, 3, 4]
+    assert os.listdir(tmp_path) == ["out.parquet"]
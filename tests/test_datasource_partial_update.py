@@ -0,0 +1,59 @@
+from backend.models import TableEntry
+from backend.schemas import DataSourceBase, TableEntryPatch, ColumnPatch
+from backend.services import datasource_service
+
+def _payload(tables, alias="Amount"):
+    return DataSourceBase(
+        id=0, name="warehouse",
+        config={"type": "mysql", "name": "warehouse", "host": "h", "port": "3306", "username": "u"},
+        tables=[
+            {
+                "id": i, "name": f"T{i}", "description": "sales",
+                "columns": [{"name": "amount", "type": "number", "alias": alias if i == 0 else None}],
+                "rows": [{"amount": i}],
+            }
+            for i in range(tables)
+        ],
+    )
+
+def _table_writes(statements):
+    return [s for s in statements if s.lstrip().upper().startswith(("UPDATE TABLES", "INSERT INTO TABLES"))]
+
+def test_update_skips_unchanged_tables(db, count_queries):
+    engine = db.get_bind()
+    ds = datasource_service.create(db, _payload(20))
+    payload = _payload(20)
+    ids = {t.name: t.id for t in ds.tables}
+    for t in payload.tables:
+        t.id = ids[t.name]
+
+    with count_queries(engine) as counter:
+        datasource_service.update(db, ds.id, payload)
+    assert _table_writes(counter.statements) == []
+    # Deferred JSON columns are only read once, for the returned payload
+    assert sum("tables.rows" in s for s in counter.statements) == 1
+
+    payload.tables[0].columns[0].alias = "Sales amount"
+    with count_queries(engine) as counter:
+        datasource_service.update(db, ds.id, payload)
+    assert len(_table_writes(counter.statements)) == 1
+    t0 = db.query(TableEntry).filter(TableEntry.name == "T0").one()
+    assert "(Sales amount)" in t0.simple_description
+
+def test_patch_table_and_column(db):
+    ds = datasource_service.create(db, _payload(2))
+    table = next(t for t in ds.tables if t.name == "T1")
+    before = table.content_hash
+
+    patched = datasource_service.patch_table(db, ds.id, table.id, TableEntryPatch(description="orders"))
+    assert patched.description == "orders"
+    assert patched.rows == [{"amount": 1}]
+    assert "表说明: orders" in patched.simple_description
+    assert patched.content_hash != before
+
+    patched = datasource_service.patch_column(db, ds.id, table.id, "amount", ColumnPatch(alias="Order amount"))
+    assert patched.columns[0]["alias"] == "Order amount"
+    assert patched.columns[0]["type"] == "number"
+
+    assert datasource_service.patch_column(db, ds.id, table.id, "missing", ColumnPatch(alias="x")) is None
+    assert datasource_service.patch_table(db, ds.id + 1, table.id, TableEntryPatch(name="x")) is None
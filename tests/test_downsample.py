@@ -0,0 +1,48 @@
+import datetime
+import numpy as np
+from backend.utils import downsample
+
+def test_lttb_keeps_endpoints_and_spikes():
+    n = 100_000
+    x = np.arange(n, dtype=float)
+    y = np.sin(x / 5000.0)
+    y[54_321] = 50.0
+    idx = downsample.lttb_indices(x, y, 1000)
+    assert len(idx) <= 1000
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert 54_321 in idx
+    assert np.all(np.diff(idx) > 0)
+
+def test_minmax_envelope_keeps_extremes():
+    y = np.random.default_rng(0).normal(size=10_000)
+    y[123] = -99.0
+    y[9_876] = 99.0
+    idx = downsample.minmax_indices(y, 200)
+    assert len(idx) <= 202
+    assert {0, 123, 9_876, 9_999} <= set(idx.tolist())
+
+def test_short_series_is_untouched():
+    assert downsample.lttb_indices(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+    assert downsample.minmax_indices(np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+def test_downsample_rows_sorts_by_time_and_cuts_payload():
+    start = datetime.datetime(2024, 1, 1)
+    rows = [
+        {"ts": start + datetime.timedelta(minutes=i), "v": float(i % 97), "w": None}
+        for i in range(20_000)
+    ]
+    rows.reverse()
+    out = downsample.downsample_rows(rows, "ts", ["v", "w"], 200)
+    assert len(out) <= 200
+    assert out[0]["ts"] == start
+    assert [r["ts"] for r in out] == sorted(r["ts"] for r in out)
+
+def test_target_points_for_col_span():
+    assert downsample.target_points_for_col_span(12) == 12 * downsample.POINTS_PER_COLUMN
+    assert downsample.target_points_for_col_span(None) == 6 * downsample.POINTS_PER_COLUMN
+    assert downsample.target_points_for_col_span(40) == 12 * downsample.POINTS_PER_COLUMN
+
+def testnumeric_series_coerces_non_numbers_to_nan():
+    from decimal import Decimal
+    out = downsample.numeric_series([1, None, Decimal("2.5"), "x", "3"])
+    assert out[0] == 1 and np.isnan(out[1]) and out[2] == 2.5 and np.isnan(out[3]) and out[4] == 3
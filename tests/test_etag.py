@@ -0,0 +1,76 @@
+import json
+from fastapi import Response
+from starlette.requests import Request
+from backend.apis import dashboard as dashboard_api, dataset as dataset_api
+from backend.schemas import DatasetBase, DashboardBase
+from backend.services import dataset_service, dashboard_service, version_service
+from backend.utils.etag import make_etag, matches
+
+def _request(etag=None, query=b""):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": query})
+
+def test_bump_increments_resource_and_collection(db):
+    assert version_service.get_version(db, "dataset") == 0
+    version_service.bump(db, "dataset", 7)
+    version_service.bump(db, "dataset", 7)
+    version_service.bump(db, "dataset", 8)
+    db.commit()
+    assert version_service.get_version(db, "dataset", 7) == 2
+    assert version_service.get_version(db, "dataset", 8) == 1
+    assert version_service.get_version(db, "dataset") == 3
+
+def test_bump_is_a_single_upsert_per_counter(db, count_queries):
+    engine = db.get_bind()
+    with count_queries(engine) as counter:
+        version_service.bump(db, "widget", 1)
+        version_service.bump_many(db, "widget", [1, 2, 3])
+    db.commit()
+    # No UPDATE-then-INSERT: a racing first bump can't hit the primary key
+    assert counter.count == 4
+    assert all(s.lstrip().upper().startswith("INSERT") and "ON CONFLICT" in s for s in counter.statements)
+    assert [version_service.get_version(db, "widget", i) for i in (1, 2, 3)] == [2, 1, 1]
+    assert version_service.get_version(db, "widget") == 2
+
+def test_if_none_match_parsing():
+    etag = make_etag("widget", 3, variant="type=chart")
+    assert etag.startswith('"widget-*-3-') and etag.endswith('"')
+    assert matches(_request(etag), etag)
+    assert matches(_request(f'"other", W/{etag}'), etag)
+    assert matches(_request("*"), etag)
+    assert not matches(_request('"widget-*-2"'), etag)
+    assert not matches(_request(), etag)
+
+def test_dataset_list_returns_304_until_changed(db, count_queries):
+    engine = db.get_bind()
+    dataset = DatasetBase(id=1, name="d", dataSourceId=1, sql="select 1", createdAt=0)
+    dataset_service.create(db, dataset)
+
+    response = Response()
+    dataset_api.read_datasets(_request(), response, db)
+    etag = response.headers["etag"]
+
+    with count_queries(engine) as counter:
+        cached = dataset_api.read_datasets(_request(etag), Response(), db)
+    assert cached.status_code == 304
+    assert counter.count == 1
+    assert all("resource_versions" in s for s in counter.statements)
+
+    dataset_service.update(db, 1, dataset.copy(update={"name": "renamed"}))
+    response = Response()
+    rows = dataset_api.read_datasets(_request(etag), response, db)
+    assert response.headers["etag"] != etag
+    assert rows[0].name == "renamed"
+
+def test_dashboard_detail_etag_changes_on_write(db):
+    dashboard_service.create_or_update(db, DashboardBase(id=1, name="a", widgets=[], createdAt=0))
+
+    first = dashboard_api.read_dashboard(1, _request(), db)
+    etag = first.headers["etag"]
+    assert json.loads(first.body)["name"] == "a"
+    assert dashboard_api.read_dashboard(1, _request(etag), db).status_code == 304
+
+    dashboard_service.update(db, 1, DashboardBase(id=1, name="b", widgets=[], createdAt=0))
+    second = dashboard_api.read_dashboard(1, _request(etag), db)
+    assert second.status_code == 200
+    assert json.loads(second.body)["name"] == "b"
@@ -0,0 +1,76 @@
+import time
+from backend.services import ai_service
+from backend.utils.cache import SQLiteCache
+
+class _CountingStrategy(ai_service.LLMStrategy):
+    name = "fake"
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def model(self) -> str:
+        return "fake-model"
+
+    def call(self, messages, schema_hint=None):
+        self.calls += 1
+        return dict(self.result)
+
+def _use(monkeypatch, tmp_path, result):
+    strategy = _CountingStrategy(result)
+    monkeypatch.setattr(ai_service, "get_strategy", lambda: strategy)
+    monkeypatch.setattr(ai_service, "llm_cache", SQLiteCache(str(tmp_path / "llm.db")))
+    monkeypatch.setattr(ai_service, "LLM_CACHE_ENABLED", True)
+    return strategy
+
+def test_repeated_calls_are_served_from_cache(monkeypatch, tmp_path):
+    strategy = _use(monkeypatch, tmp_path, {"annotations": [{"columnName": "id", "alias": "编号", "description": "主键"}]})
+    columns = [{"name": "id", "type": "number"}]
+
+    first = ai_service.generate_table_annotations("orders", "订单", columns)
+    second = ai_service.generate_table_annotations("orders", "订单", columns)
+    assert first == second and strategy.calls == 1
+
+    # Whitespace-only prompt differences share the entry; opting out always calls
+    ai_service._call_llm([{"role": "user", "content": "a  b\n"}], schema_hint="dataset_sql")
+    ai_service._call_llm([{"role": "user", "content": "a b"}], schema_hint="dataset_sql")
+    assert strategy.calls == 2
+    ai_service.generate_table_annotations("orders", "订单", columns, use_cache=False)
+    assert strategy.calls == 3
+
+    # Creative generations are never cached
+    ai_service.generate_chart_template("bar chart")
+    ai_service.generate_chart_template("bar chart")
+    assert strategy.calls == 5
+
+    stats = ai_service.llm_cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["entries"] == 2
+    ai_service.llm_cache.close()
+
+def test_errors_are_not_cached(monkeypatch, tmp_path):
+    strategy = _use(monkeypatch, tmp_path, {"error": "timeout"})
+    ai_service.select_relevant_tables("q", [{"id": 1, "name": "t", "description": "d"}])
+    ai_service.select_relevant_tables("q", [{"id": 1, "name": "t", "description": "d"}])
+    assert strategy.calls == 2
+    ai_service.llm_cache.close()
+
+def test_sqlite_cache_ttl_and_lru(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.db"), maxsize=2, ttl=60)
+    cache.set("a", {"v": 1})
+    time.sleep(0.01)
+    cache.set("b", {"v": 2})
+    time.sleep(0.01)
+    assert cache.get("a") == {"v": 1}  # a is now more recently used than b
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1} and cache.get("c") == {"v": 3}
+    assert cache.stats()["evictions"] == 1
+
+    cache.ttl = 0
+    assert cache.get("a") is None
+    cache.close()
+
+    # Entries survive reopening the file
+    reopened = SQLiteCache(str(tmp_path / "c.db"), maxsize=2, ttl=60)
+    assert reopened.get("c") == {"v": 3}
+    reopened.close()
@@ -0,0 +1,147 @@
+import asyncio
+import time
+import pytest
+from backend.services import ai_service
+from backend.utils.circuit_breaker import CircuitBreaker
+from backend.utils.histogram import LatencyHistogram
+
+class _FakeProvider(ai_service.LLMStrategy):
+    def __init__(self, name, delay=0.0, error=None, chunks=("{\"ok\": ", "true}")):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.chunks = chunks
+        self.calls = 0
+        self.cancelled = False
+
+    def call(self, messages, schema_hint=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            return {"error": self.error}
+        return {"provider": self.name}
+
+    async def stream(self, messages, schema_hint=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error:
+                raise RuntimeError(self.error)
+            for chunk in self.chunks:
+                yield chunk
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+@pytest.fixture
+def providers(monkeypatch):
+    fast, slow = _FakeProvider("fast"), _FakeProvider("slow")
+    monkeypatch.setitem(ai_service.STRATEGY_REGISTRY, "fast", fast)
+    monkeypatch.setitem(ai_service.STRATEGY_REGISTRY, "slow", slow)
+    monkeypatch.setattr(ai_service, "_provider_health", {})
+    monkeypatch.setattr(ai_service, "HEDGE_DEFAULT_DELAY", 0.05)
+    monkeypatch.setattr(ai_service, "HEDGE_MIN_DELAY", 0.01)
+    return ai_service.HedgedStrategy(["slow", "fast"]), slow, fast
+
+def test_histogram_quantiles_follow_recent_latency():
+    hist = LatencyHistogram(half_life=100)
+    for _ in range(90):
+        hist.record(100)
+    for _ in range(10):
+        hist.record(5000)
+    assert 100 <= hist.quantile(0.5) < 130
+    assert 100 <= hist.quantile(0.9) < 130
+    assert hist.quantile(0.99) >= 5000
+    for _ in range(400):
+        hist.record(1000)
+    assert 1000 <= hist.quantile(0.5) < 1300
+
+def test_circuit_breaker_opens_and_half_opens(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("backend.utils.circuit_breaker.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 11
+    assert breaker.allow()
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+def test_hedges_slow_primary(providers):
+    hedged, slow, fast = providers
+    slow.delay = 0.4
+    start = time.perf_counter()
+    assert hedged.call([{"role": "user", "content": "q"}]) == {"provider": "fast"}
+    assert time.perf_counter() - start < 0.3
+    assert slow.calls == 1 and fast.calls == 1
+    # The abandoned call still feeds its provider's latency once it ends
+    deadline = time.time() + 2
+    while ai_service.provider_health("slow").latency.observations == 0 and time.time() < deadline:
+        time.sleep(0.02)
+    assert ai_service.provider_health("slow").latency.observations == 1
+
+def test_no_hedge_when_the_next_provider_is_saturated(providers, monkeypatch):
+    hedged, slow, fast = providers
+    monkeypatch.setattr(ai_service, "HEDGE_WORKERS_PER_PROVIDER", 1)
+    busy = hedged._pool("fast").submit(time.sleep, 0.5)  # e.g. an earlier hedge still running
+    slow.delay = 0.2
+    assert hedged.call([]) == {"provider": "slow"}
+    assert fast.calls == 0
+    busy.result()
+    assert not hedged._pool("fast").saturated()
+
+def test_fast_primary_is_not_hedged(providers):
+    hedged, slow, fast = providers
+    assert hedged.call([]) == {"provider": "slow"}
+    assert fast.calls == 0
+
+def test_fails_over_on_error_and_opens_breaker(providers, monkeypatch):
+    hedged, slow, fast = providers
+    monkeypatch.setattr(ai_service, "HEDGE_DEFAULT_DELAY", 5)
+    slow.error = "boom"
+    for _ in range(ai_service.BREAKER_FAILURES):
+        assert hedged.call([]) == {"provider": "fast"}
+    assert ai_service.provider_health("slow").breaker.state == CircuitBreaker.OPEN
+    calls = slow.calls
+    assert hedged.call([]) == {"provider": "fast"}
+    assert slow.calls == calls
+
+    metrics = ai_service.provider_metrics()
+    assert metrics["slow"]["breaker"] == "open"
+    assert metrics["fast"]["latency"]["count"] == ai_service.BREAKER_FAILURES + 1
+    assert metrics["slow"]["latency"]["count"] == ai_service.BREAKER_FAILURES  # failures are timed too
+
+def test_all_providers_failing_reports_every_error(providers):
+    hedged, slow, fast = providers
+    slow.error, fast.error = "a", "b"
+    assert hedged.call([]) == {"error": "slow: a; fast: b"}
+
+def test_stream_races_first_chunk_and_cancels_loser(providers):
+    hedged, slow, fast = providers
+    slow.delay = 1.0
+
+    async def collect():
+        return [chunk async for chunk in hedged.stream([])]
+
+    assert "".join(asyncio.run(collect())) == '{"ok": true}'
+    assert slow.cancelled and fast.calls == 1
+    assert ai_service.provider_health("fast").first_chunk.observations == 1
+
+def test_stream_fails_over_on_error(providers):
+    hedged, slow, fast = providers
+    slow.error = "down"
+
+    async def collect():
+        return [chunk async for chunk in hedged.stream([])]
+
+    assert "".join(asyncio.run(collect())) == '{"ok": true}'
+    fast.error = "down too"
+    with pytest.raises(RuntimeError, match="down too"):
+        asyncio.run(collect())
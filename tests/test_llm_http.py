@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+from backend.services import llm_http, siliconflow_service
+
+class _FakeResponse:
+    status_code = 200
+    text = '{"ok": true}'
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": '```json\n{"ok": true}\n```'}}]}
+
+def test_session_is_shared_and_pooled():
+    llm_http.close_all()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        sessions = list(pool.map(lambda _: llm_http.get_session("test"), range(32)))
+    assert all(s is sessions[0] for s in sessions)
+    adapter = sessions[0].get_adapter("https://example.com")
+    assert adapter._pool_maxsize == llm_http.POOL_MAXSIZE
+    assert adapter.max_retries.total == llm_http.RETRIES
+    # 429/5xx are retried, read timeouts are not
+    assert adapter.max_retries.status == llm_http.RETRIES and adapter.max_retries.read == 0
+
+    llm_http.close_all()
+    assert llm_http.get_session("test") is not sessions[0]
+    llm_http.close_all()
+
+def test_siliconflow_reuses_pooled_session(monkeypatch):
+    llm_http.close_all()
+    used = []
+
+    def fake_post(self, url, **kwargs):
+        used.append((self, kwargs["timeout"]))
+        return _FakeResponse()
+
+    monkeypatch.setattr(siliconflow_service, "API_KEY", "k")
+    monkeypatch.setattr("requests.Session.post", fake_post)
+    assert siliconflow_service.call_llm([{"role": "user", "content": "hi"}]) == {"ok": True}
+    assert siliconflow_service.call_llm([{"role": "user", "content": "hi"}]) == {"ok": True}
+    assert used[0][0] is used[1][0]
+    assert used[0][1] == (llm_http.CONNECT_TIMEOUT, llm_http.READ_TIMEOUT)
+    llm_http.close_all()
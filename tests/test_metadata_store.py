@@ -0,0 +1,72 @@
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from backend.db import metrics
+from backend.db.session import Base, create_metadata_engine
+from backend.models.orm import Template
+
+def test_pragmas_applied_on_connect(tmp_path):
+    engine = create_metadata_engine(f"sqlite:///{tmp_path / 'meta.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().lower() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 10000
+        # NORMAL == 1
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+    engine.dispose()
+
+def test_defaults_when_pragmas_disabled(tmp_path):
+    engine = create_metadata_engine(f"sqlite:///{tmp_path / 'plain.db'}", pragmas=None)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().lower() == "delete"
+    engine.dispose()
+
+def test_write_metrics_recorded(tmp_path):
+    engine = create_metadata_engine(f"sqlite:///{tmp_path / 'm.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    metrics.instrument_sessionmaker(factory)
+    before = metrics.snapshot()
+
+    db = factory()
+    db.add(Template(name="t", type="bar", category="chart", createdAt=0))
+    db.commit()
+    db.close()
+
+    after = metrics.snapshot()
+    assert after["writeStatements"]["count"] == before["writeStatements"]["count"] + 1
+    assert after["commits"]["count"] == before["commits"]["count"] + 1
+    assert "p95Ms" in after["commits"]
+    engine.dispose()
+
+def test_postgres_ddl_uses_bigint_ids():
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateTable
+    def ddl(name):
+        return str(CreateTable(Base.metadata.tables[name]).compile(dialect=postgresql.dialect()))
+    # Client-generated ids (Date.now()) overflow a 32-bit INTEGER
+    assert "id BIGSERIAL" in ddl("widgets")
+    links = ddl("dashboard_widgets")
+    assert "dashboard_id BIGINT" in links
+    assert "widget_id BIGINT" in links
+
+def test_sqlite_keeps_integer_rowid_ids(tmp_path):
+    engine = create_metadata_engine(f"sqlite:///{tmp_path / 'ids.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(Template(name="t", type="bar", category="chart", createdAt=0))
+    db.commit()
+    assert db.query(Template).one().id == 1
+    db.close()
+    engine.dispose()
+
+def test_pool_metrics_forget_dropped_engines(tmp_path):
+    import gc
+    import weakref
+    engine = create_metadata_engine(f"sqlite:///{tmp_path / 'gone.db'}")
+    ref = weakref.ref(engine)
+    assert engine in metrics._engines
+    engine.dispose()
+    del engine
+    gc.collect()
+    assert ref() is None
+    assert len(metrics.snapshot()["pools"]) == len(metrics._engines)
@@ -0,0 +1,69 @@
+import asyncio
+import time
+import pytest
+from backend.services import ai_service, mock_llm_service, prompt_builder
+
+@pytest.fixture(autouse=True)
+def mock_provider(monkeypatch):
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    monkeypatch.setattr(mock_llm_service, "LATENCY", "fixed:0")
+    monkeypatch.setattr(mock_llm_service, "TOKEN_MS", 0)
+    monkeypatch.setattr(mock_llm_service, "ERROR_RATE", 0)
+    mock_llm_service.reseed()
+
+def test_schema_valid_responses():
+    ids = ai_service.select_relevant_tables("订单", [
+        {"id": 7, "name": "orders", "description": "订单"},
+        {"id": 9, "name": "users", "description": None},
+    ], use_cache=False)
+    assert ids == [7, 9]
+
+    annotations = ai_service.generate_table_annotations(
+        "orders", None, [{"name": "id", "type": "NUMBER"}, {"name": "amount", "type": "NUMBER"}], use_cache=False
+    )
+    assert [a["columnName"] for a in annotations] == ["id", "amount"]
+    assert all(a["alias"] and a["description"] for a in annotations)
+
+    assert ai_service.generate_data_insight([], "趋势")["explanation"]
+    assert ai_service.generate_chart_template("销售柱状图")["type"] == "bar"
+    assert "return MockComponent" in ai_service.generate_web_component("表格")["code"]
+
+def test_dataset_sql_uses_prompt_tables():
+    messages = ai_service._dataset_sql_messages("", "x")
+    assert ai_service._call_llm(messages, "dataset_sql", use_cache=False)["sql"] == "SELECT 1 FROM DUAL"
+    table = {"name": "ORDERS", "description": "订单", "columns": [{"name": "ID", "type": "NUMBER"}]}
+    messages = ai_service._dataset_sql_messages(prompt_builder.render_table(table), "x")
+    result = ai_service._call_llm(messages, "dataset_sql", use_cache=False)
+    assert result["sql"] == "SELECT * FROM ORDERS"
+
+def test_latency_and_errors_are_reproducible(monkeypatch):
+    monkeypatch.setattr(mock_llm_service, "ERROR_RATE", 0.5)
+    draws = [mock_llm_service._draw("uniform:10,20") for _ in range(20)]
+    mock_llm_service.reseed()
+    assert [mock_llm_service._draw("uniform:10,20") for _ in range(20)] == draws
+    assert all(0.010 <= latency <= 0.020 for latency, _ in draws)
+    assert {failed for _, failed in draws} == {True, False}
+
+    with pytest.raises(ValueError):
+        mock_llm_service.parse_latency("gamma:1")
+
+def test_injected_errors_and_latency(monkeypatch):
+    monkeypatch.setattr(mock_llm_service, "LATENCY", "fixed:50")
+    start = time.perf_counter()
+    assert "explanation" in ai_service.generate_data_insight([], "q")
+    assert time.perf_counter() - start >= 0.05
+
+    monkeypatch.setattr(mock_llm_service, "LATENCY", "fixed:0")
+    monkeypatch.setattr(mock_llm_service, "ERROR_RATE", 1)
+    assert ai_service.generate_data_insight([], "q")["explanation"].startswith("分析失败")
+
+def test_streams_in_chunks(monkeypatch):
+    monkeypatch.setattr(mock_llm_service, "CHUNK_CHARS", 3)
+
+    async def collect():
+        return [event async for event in ai_service.stream_data_insight([], "季度趋势")]
+
+    events = asyncio.run(collect())
+    deltas = [data["text"] for event, data in events if event == "delta"]
+    assert len(deltas) > 3 and all(len(d) <= 3 for d in deltas)
+    assert events[-1] == ("result", {"explanation": "模拟分析：季度趋势"})
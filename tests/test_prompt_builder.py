@@ -0,0 +1,50 @@
+from backend.services import prompt_builder
+from backend.utils.token_count import count_message_tokens, count_tokens
+
+def _table(name, description, columns):
+    return {"name": name, "description": description, "columns": columns}
+
+ORDERS = _table("ORDERS", "订单表", [
+    {"name": "ORDER_ID", "type": "NUMBER", "alias": "订单号", "description": None},
+    {"name": "AMOUNT", "type": "NUMBER(12,2)", "alias": "金额", "description": "含税金额"},
+    {"name": "REMARK", "type": "VARCHAR2(200)", "alias": "", "description": ""},
+])
+
+def test_renders_compact_ddl_without_empty_fields():
+    assert prompt_builder.render_table(ORDERS) == (
+        "TABLE ORDERS -- 订单表\n"
+        "  ORDER_ID NUMBER -- 订单号\n"
+        "  AMOUNT NUMBER(12,2) -- 金额; 含税金额\n"
+        "  REMARK VARCHAR2(200)"
+    )
+    text, tokens = prompt_builder.build_schema_context([ORDERS], "订单金额")
+    assert "None" not in text and "'" not in text
+    assert tokens == count_tokens(text)
+    assert len(text) < len(str([{"tables": [ORDERS]}])) / 2
+
+def test_trims_least_relevant_tables_first():
+    filler = [
+        _table(f"LOG_{i}", "系统日志", [{"name": f"COL_{j}", "type": "VARCHAR2(100)", "description": "日志字段说明" * 3} for j in range(40)])
+        for i in range(10)
+    ]
+    tables = filler[:5] + [ORDERS] + filler[5:]
+    full, full_tokens = prompt_builder.build_schema_context(tables, "订单金额 amount", budget=10 ** 6)
+    text, tokens = prompt_builder.build_schema_context(tables, "订单金额 amount", budget=full_tokens // 4)
+
+    assert tokens <= full_tokens // 4 < full_tokens
+    assert prompt_builder.render_table(ORDERS) in text
+    assert "-- Other tables: LOG_" in text
+    assert [t["name"] for t in tables if t["name"] in text] == [t["name"] for t in tables]
+
+def test_most_relevant_table_keeps_matching_columns():
+    wide = _table("SALES", "销售", [{"name": f"C{i}", "type": "NUMBER", "alias": "指标"} for i in range(200)]
+                  + [{"name": "REGION", "type": "VARCHAR2(20)", "alias": "区域"}])
+    text, _ = prompt_builder.build_schema_context([wide], "按区域汇总", budget=20)
+    assert text.startswith("TABLE SALES -- 销售\n  REGION VARCHAR2(20)")
+    assert "-- 200 more columns" in text
+
+def test_token_estimates_depend_on_model():
+    text = "SELECT 金额, 数量 FROM ORDERS WHERE 区域 = '华东'" * 10
+    assert count_tokens(text, "deepseek-ai/DeepSeek-V3.2") != count_tokens(text, "Qwen/Qwen3-32B")
+    assert count_tokens("", "x") == 0
+    assert count_message_tokens([{"role": "user", "content": [{"type": "text", "text": text}]}]) > count_tokens(text)
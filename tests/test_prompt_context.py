@@ -0,0 +1,66 @@
+from backend.schemas import DataSourceBase, ColumnPatch
+from backend.services import ai_service, datasource_service, prompt_context_service
+
+def _datasource(db):
+    return datasource_service.create(db, DataSourceBase(
+        id=0, name="warehouse",
+        config={"type": "oracle", "name": "warehouse", "host": "h", "port": "1521", "username": "u"},
+        tables=[
+            {"id": i, "name": f"T{i}", "description": f"表{i}", "columns": [{"name": "ID", "type": "number"}], "rows": []}
+            for i in range(5)
+        ],
+    ))
+
+def _capture(monkeypatch, answer):
+    prompts = []
+
+    def fake_call(messages, schema_hint=None, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return answer
+
+    monkeypatch.setattr(ai_service, "_call_llm", fake_call)
+    return prompts
+
+def test_repeat_queries_reuse_compiled_context(db, monkeypatch, count_queries):
+    engine = db.get_bind()
+    ds = _datasource(db)
+    prompts = _capture(monkeypatch, {"sql": "SELECT 1", "explanation": "x"})
+    ids = [t.id for t in ds.tables]
+
+    ai_service.generate_dataset_sql(db, ds.id, ids, "第一个问题")
+    with count_queries(engine) as counter:
+        result = ai_service.generate_dataset_sql(db, ds.id, list(reversed(ids)), "第二个问题")
+    # datasource existence + version check; no table rows are read
+    assert counter.count == 2
+    assert result["relevantTableIds"] == sorted(ids)
+    # Same tables in any order give the same prompt up to the question
+    prefix = prompts[0].split("User Request")[0]
+    assert prompts[1].startswith(prefix) and "TABLE T0" in prefix
+
+def test_datasource_writes_invalidate_context(db, monkeypatch):
+    ds = _datasource(db)
+    prompts = _capture(monkeypatch, {"sql": "SELECT 1", "explanation": "x"})
+    table = ds.tables[0]
+
+    ai_service.generate_dataset_sql(db, ds.id, [table.id], "q")
+    datasource_service.patch_column(db, ds.id, table.id, "ID", ColumnPatch(alias="编号"))
+    ai_service.generate_dataset_sql(db, ds.id, [table.id], "q")
+    assert "编号" not in prompts[0] and "ID number -- 编号" in prompts[1]
+
+    # A write from another process only shows up as a version bump
+    summaries = prompt_context_service.annotated_tables(db, ds.id)
+    assert [t.id for t in summaries] == sorted(t.id for t in ds.tables)
+    monkeypatch.setattr(prompt_context_service, "invalidate", lambda db, ds_id: None)
+    datasource_service.delete(db, ds.id)
+    assert prompt_context_service.annotated_tables(db, ds.id) == []
+
+def test_table_selection_prompt_is_stable(db, monkeypatch):
+    ds = _datasource(db)
+    prompts = _capture(monkeypatch, {"relevant_table_ids": []})
+    ai_service.auto_select_tables(db, ds.id, "表3的数据")
+    ai_service.auto_select_tables(db, ds.id, "另一个问题")
+    tables_part = [p.split("User Query")[0] for p in prompts]
+    assert tables_part[0] == tables_part[1]
+    assert [line.split(",")[0] for line in tables_part[0].splitlines() if line.startswith("ID: ")] == [
+        f"ID: {t.id}" for t in sorted(ds.tables, key=lambda t: t.id)
+    ]
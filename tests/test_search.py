@@ -0,0 +1,78 @@
+from sqlalchemy import text
+from backend.schemas import DataSourceBase, DatasetBase, WidgetCreate, ColumnPatch
+from backend.services import datasource_service, dataset_service, widget_service, search_service
+from backend.utils.tokenizer import tokenize
+
+def _payload(tables):
+    return DataSourceBase(
+        id=0, name="warehouse",
+        config={"type": "mysql", "name": "warehouse", "host": "h", "port": "3306", "username": "u"},
+        tables=tables,
+    )
+
+def _table(i, name, description, columns):
+    return {"id": i, "name": name, "description": description, "columns": columns, "rows": []}
+
+def _hits(db, q, **kwargs):
+    return [(hit["kind"], hit["name"]) for hit in search_service.search(db, q, **kwargs)["items"]]
+
+def test_tokenize_splits_identifiers_and_cjk():
+    assert tokenize("orderId") == ["order", "id", "orderid"]
+    assert tokenize("user_name") == ["user", "name"]
+    assert tokenize("销售额") == ["销售", "售额"]
+
+def test_search_tables_datasets_and_widgets(db):
+    search_service.create_index(db.get_bind())
+    ds = datasource_service.create(db, _payload([
+        _table(1, "ORDERS", "订单明细表", [{"name": "orderId", "type": "number", "alias": "订单编号"}]),
+        _table(2, "CUSTOMERS", "客户信息", [{"name": "regionCode", "type": "string", "description": "销售区域"}]),
+    ]))
+    dataset_service.create(db, DatasetBase(id=10, name="月度销售额", description="orders by month",
+                                           dataSourceId=ds.id, sql="select 1", createdAt=0))
+    widget_service.create(db, WidgetCreate(name="Revenue trend", type="chart", config={}))
+
+    assert _hits(db, "订单") == [("table", "ORDERS")]
+    assert _hits(db, "order id") == [("table", "ORDERS")]      # camelCase column name
+    assert _hits(db, "区域") == [("table", "CUSTOMERS")]        # column description
+    assert _hits(db, "销售额") == [("dataset", "月度销售额")]
+    assert _hits(db, "reve") == [("widget", "Revenue trend")]    # prefix on the last word
+    assert _hits(db, "销") and all(kind in ("table", "dataset") for kind, _ in _hits(db, "销"))
+    assert _hits(db, "orders", kind="table") == [("table", "ORDERS")]
+    assert _hits(db, "orders", datasource_id=ds.id + 1) == []
+
+    page = search_service.search(db, "o", skip=1, limit=1)
+    assert page["total"] >= 2 and len(page["items"]) == 1
+
+def test_search_follows_writes(db):
+    search_service.create_index(db.get_bind())
+    ds = datasource_service.create(db, _payload([
+        _table(1, "ORDERS", None, [{"name": "amount", "type": "number"}]),
+    ]))
+    table = ds.tables[0]
+
+    datasource_service.patch_column(db, ds.id, table.id, "amount", ColumnPatch(alias="成交金额"))
+    assert _hits(db, "金额") == [("table", "ORDERS")]
+
+    payload = _payload([_table(table.id, "SHIPMENTS", None, [{"name": "amount", "type": "number"}])])
+    datasource_service.update(db, ds.id, payload)
+    assert _hits(db, "orders") == []
+    assert _hits(db, "shipments") == [("table", "SHIPMENTS")]
+
+    datasource_service.delete(db, ds.id)
+    assert search_service.search(db, "shipments")["total"] == 0
+
+    # A rebuild reproduces the incrementally maintained index
+    widget = widget_service.create(db, WidgetCreate(name="Sales map", type="chart", config={}))
+    assert search_service.rebuild(db) == {"table": 0, "dataset": 0, "widget": 1}
+    assert search_service.search(db, "map")["items"][0]["id"] == widget.id
+
+def test_index_created_while_running_is_picked_up(db, monkeypatch):
+    assert not search_service.is_available(db)
+
+    # e.g. create_search_index.py run against the live database
+    with db.get_bind().begin() as conn:
+        for ddl in search_service._SQLITE_DDL:
+            conn.execute(text(ddl))
+    assert not search_service.is_available(db)  # missing result still cached
+    monkeypatch.setattr(search_service, "MISSING_RECHECK_SECONDS", 0)
+    assert search_service.is_available(db)
@@ -0,0 +1,43 @@
+import pytest
+from backend.services import sql_builder
+
+def test_time_bucket_expression_per_dialect():
+    assert sql_builder.time_bucket_expression("postgres", "ts", "day") == "date_trunc('day', \"ts\")"
+    assert sql_builder.time_bucket_expression("oracle", "created_at", "week") == "TRUNC(created_at, 'IW')"
+    assert sql_builder.time_bucket_expression("oracle", "CreatedAt", "hour") == "TRUNC(\"CreatedAt\", 'HH24')"
+    assert sql_builder.time_bucket_expression("mysql", "ts", "month") == "DATE_FORMAT(`ts`, '%Y-%m-01')"
+
+def test_time_bucket_expression_converts_timezone():
+    expr = sql_builder.time_bucket_expression("mysql", "ts", "day", timezone="+08:00", source_timezone="+00:00")
+    assert expr == "DATE_FORMAT(CONVERT_TZ(`ts`, '+00:00', '+08:00'), '%Y-%m-%d')"
+    expr = sql_builder.time_bucket_expression("postgres", "ts", "hour", timezone="Asia/Shanghai")
+    assert expr == "date_trunc('hour', ((\"ts\") AT TIME ZONE 'UTC') AT TIME ZONE 'Asia/Shanghai')"
+
+def test_build_time_bucket_sql_aggregates_per_bucket():
+    sql = sql_builder.build_time_bucket_sql(
+        "postgres", "SELECT * FROM metrics;", "ts", "day",
+        [{"column": "value", "agg": "avg"}], group_by=["region"]
+    )
+    assert sql == (
+        "SELECT date_trunc('day', \"ts\") AS \"ts\", \"region\", AVG(\"value\") AS \"value\""
+        " FROM (SELECT * FROM metrics) sub_bucket WHERE \"ts\" IS NOT NULL"
+        " GROUP BY date_trunc('day', \"ts\"), \"region\""
+        " ORDER BY date_trunc('day', \"ts\"), \"region\""
+    )
+
+def test_build_time_bucket_sql_defaults_to_row_count():
+    sql = sql_builder.build_time_bucket_sql("oracle", "SELECT * FROM t", "ts", "month", [])
+    assert "COUNT(*) AS row_count" in sql
+
+@pytest.mark.parametrize("kwargs", [
+    {"column": "ts; DROP TABLE x", "unit": "day"},
+    {"column": "ts", "unit": "decade"},
+    {"column": "ts", "unit": "day", "timezone": "UTC'; --"},
+])
+def test_build_time_bucket_sql_rejects_unsafe_input(kwargs):
+    with pytest.raises(ValueError):
+        sql_builder.build_time_bucket_sql("postgres", "SELECT 1", metrics=[], **kwargs)
+
+def test_build_time_bucket_sql_rejects_unknown_aggregation():
+    with pytest.raises(ValueError):
+        sql_builder.build_time_bucket_sql("mysql", "SELECT 1", "ts", "day", [{"column": "v", "agg": "median"}])
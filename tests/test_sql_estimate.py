@@ -0,0 +1,76 @@
+import json
+from backend.schemas.base import ExecuteSqlRequest
+from backend.services import datasource_service, sql_estimate_service
+
+def test_summarize_postgres_plan_finds_seq_scans():
+    plan = [{"Plan": {
+        "Node Type": "Hash Join", "Total Cost": 1234.5, "Plan Rows": 9800,
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "orders", "Total Cost": 800, "Plan Rows": 100000},
+            {"Node Type": "Hash", "Plans": [
+                {"Node Type": "Index Scan", "Relation Name": "customers", "Plan Rows": 10}
+            ]},
+        ],
+    }}]
+    summary = sql_estimate_service.summarize_postgres_plan(json.dumps(plan))
+    assert summary == {"estimatedRows": 9800.0, "estimatedCost": 1234.5, "fullScans": ["orders"]}
+
+    parallel = [{"Plan": {"Node Type": "Gather", "Plan Rows": 5, "Total Cost": 9, "Plans": [
+        {"Node Type": "Parallel Seq Scan", "Relation Name": "events"},
+    ]}}]
+    assert sql_estimate_service.summarize_postgres_plan(parallel)["fullScans"] == ["events"]
+
+def test_summarize_mysql_plan_uses_last_join_table():
+    plan = {"query_block": {
+        "cost_info": {"query_cost": "52.40"},
+        "nested_loop": [
+            {"table": {"table_name": "o", "access_type": "ALL", "rows_examined_per_scan": 500, "rows_produced_per_join": 500}},
+            {"table": {"table_name": "c", "access_type": "eq_ref", "rows_examined_per_scan": 1, "rows_produced_per_join": 480}},
+        ],
+    }}
+    summary = sql_estimate_service.summarize_mysql_plan(plan)
+    assert summary == {"estimatedRows": 480.0, "estimatedCost": 52.4, "fullScans": ["o"]}
+
+def test_summarize_oracle_plan_reads_root_row():
+    rows = [
+        {"id": 0, "operation": "SELECT STATEMENT", "options": None, "object_name": None, "cardinality": 120, "cost": 31},
+        {"id": 1, "operation": "TABLE ACCESS", "options": "FULL", "object_name": "PM_PROJECT", "cardinality": 120, "cost": 31},
+    ]
+    summary = sql_estimate_service.summarize_oracle_plan(rows)
+    assert summary == {"estimatedRows": 120.0, "estimatedCost": 31.0, "fullScans": ["PM_PROJECT"]}
+
+def test_evaluate_guard(monkeypatch):
+    estimate = {"estimatedRows": 5e6, "estimatedCost": 10.0, "fullScans": []}
+    monkeypatch.setattr(sql_estimate_service, "COST_GUARD_MODE", "off")
+    assert sql_estimate_service.evaluate_guard(estimate) is None
+
+    monkeypatch.setattr(sql_estimate_service, "COST_GUARD_MODE", "block")
+    monkeypatch.setattr(sql_estimate_service, "COST_GUARD_MAX_ROWS", 1e6)
+    guard = sql_estimate_service.evaluate_guard(estimate)
+    assert guard["action"] == "block"
+    assert "预估行数" in guard["message"]
+
+    monkeypatch.setattr(sql_estimate_service, "COST_GUARD_MAX_ROWS", 1e7)
+    assert sql_estimate_service.evaluate_guard(estimate) is None
+
+def test_preview_guard_estimates_the_limited_statement(monkeypatch):
+    seen = []
+
+    def fake_guard(request, sql=None, params=None):
+        seen.append((sql, params))
+        return {"guard": {"action": "block", "message": "too big"}}
+
+    monkeypatch.setattr(sql_estimate_service, "check_guard", fake_guard)
+    request = ExecuteSqlRequest(type="postgres", host="h", port="5432", username="u",
+                                sql="SELECT * FROM events WHERE day = :day;", limit=100, params={"day": "2024-01-01"})
+    result = datasource_service.execute_sql(request)
+    assert not result["success"] and "too big" in result["message"]
+    assert seen == [("SELECT * FROM (SELECT * FROM events WHERE day = :day) AS sub_wrapper LIMIT :lim",
+                     {"lim": 100, "day": "2024-01-01"})]
+
+    # The preview cap can't be overridden through the caller's params
+    request.params = {"day": "2024-01-01", "lim": 10**9}
+    seen.clear()
+    result = datasource_service.execute_sql(request)
+    assert not result["success"] and "lim" in result["message"]
+    assert seen == []
@@ -0,0 +1,33 @@
+from backend.models import DataSource, TableEntry, Dashboard, Widget, DashboardWidget
+from backend.services import datasource_service, dashboard_service
+
+def test_datasource_summaries_skip_table_payload(db, count_queries):
+    engine = db.get_bind()
+    for i in range(1, 4):
+        db.add(DataSource(id=i, name=f"ds{i}", config={"type": "mysql", "password": "x"}))
+        for j in range(i):
+            db.add(TableEntry(name=f"t{i}_{j}", columns=[{"name": "c", "type": "string"}] * 50,
+                              rows=[{"c": "v"}] * 20, dataSourceId=i))
+    db.commit()
+    db.expunge_all()
+
+    with count_queries(engine) as counter:
+        page = datasource_service.get_summaries(db, skip=1, limit=2, include_tables=True)
+    assert page["total"] == 3
+    assert [(d["id"], d["tableCount"], d["type"]) for d in page["items"]] == [(2, 2, "mysql"), (3, 3, "mysql")]
+    assert page["items"][0]["tables"][0]["name"] == "t2_0"
+    assert "password" not in page["items"][0]
+    # Deferred JSON columns are never selected
+    assert not any("tables.columns" in s or "tables.rows" in s for s in counter.statements)
+
+def test_dashboard_summaries_count_widgets(db):
+    db.add(Dashboard(id=1, name="a", createdAt=1))
+    db.add(Dashboard(id=2, name="b", createdAt=2))
+    for wid in (1, 2):
+        db.add(Widget(id=wid, config={"webComponentCode": "<div/>" * 1000}, createdAt=0))
+        db.add(DashboardWidget(dashboard_id=1, widget_id=wid, layout={"colSpan": 6, "height": 300}))
+    db.commit()
+
+    page = dashboard_service.get_summaries(db, limit=10)
+    assert page["total"] == 2
+    assert [(d["id"], d["widgetCount"]) for d in page["items"]] == [(1, 2), (2, 0)]
@@ -0,0 +1,79 @@
+from backend.models import TableEntry
+from backend.schemas import DataSourceBase, ColumnPatch
+from backend.services import ai_service, datasource_service, table_retrieval_service
+from backend.utils.bm25 import BM25Index
+
+def _payload(tables):
+    return DataSourceBase(
+        id=0, name="warehouse",
+        config={"type": "mysql", "name": "warehouse", "host": "h", "port": "3306", "username": "u"},
+        tables=[
+            {"id": i, "name": name, "description": desc, "columns": [{"name": col, "type": "string"}], "rows": []}
+            for i, (name, desc, col) in enumerate(tables)
+        ],
+    )
+
+def _tables(db, ds_id):
+    return db.query(TableEntry).filter(TableEntry.dataSourceId == ds_id).all()
+
+def test_bm25_ranks_and_updates_incrementally():
+    index = BM25Index()
+    index.add(1, ["sales", "order", "amount"])
+    index.add(2, ["customer", "region"])
+    index.add(3, ["sales", "region", "region"])
+    assert [doc for doc, _ in index.search(["region"])] == [3, 2]
+    assert index.search(["sales", "order"])[0][0] == 1
+
+    index.add(1, ["customer"])
+    index.remove(3)
+    assert len(index) == 2
+    assert [doc for doc, _ in index.search(["region"])] == [2]
+    assert index.search(["sales"]) == []
+
+def test_rank_tables_keeps_top_k_and_follows_edits(db):
+    table_retrieval_service.clear()
+    filler = [(f"LOG_{i}", f"系统日志{i}", "logTime") for i in range(40)]
+    ds = datasource_service.create(db, _payload([
+        ("SALES_ORDER", "销售订单明细", "orderAmount"),
+        ("CUSTOMER", "客户档案", "customerName"),
+    ] + filler))
+
+    ranked = table_retrieval_service.rank_tables(db, ds.id, "各区域的销售订单金额", _tables(db, ds.id), top_k=5)
+    assert len(ranked) == 5
+    assert ranked[0].name == "SALES_ORDER"
+
+    # Edited annotations are picked up on the next query; only that table is re-read
+    customer = next(t for t in ds.tables if t.name == "CUSTOMER")
+    datasource_service.patch_column(db, ds.id, customer.id, "customerName", ColumnPatch(alias="销售区域"))
+    ranked = table_retrieval_service.rank_tables(db, ds.id, "销售区域", _tables(db, ds.id), top_k=5)
+    assert ranked[0].name == "CUSTOMER"
+
+def test_select_relevant_tables_only_sees_candidates(db, monkeypatch):
+    table_retrieval_service.clear()
+    ds = datasource_service.create(db, _payload(
+        [("SALES_ORDER", "销售订单", "amount")] + [(f"LOG_{i}", f"日志{i}", "ts") for i in range(60)]
+    ))
+    prompts = []
+
+    def fake_call(messages, schema_hint=None, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return {"relevant_table_ids": []}
+
+    monkeypatch.setattr(ai_service, "_call_llm", fake_call)
+    monkeypatch.setattr(table_retrieval_service, "TOP_K", 10)
+    ai_service.auto_select_tables(db, ds.id, "销售订单")
+    assert prompts[0].count("ID: ") == 10
+    assert "SALES_ORDER" in prompts[0]
+
+def test_tables_without_a_hash_are_indexed_once(db, count_queries):
+    table_retrieval_service.clear()
+    engine = db.get_bind()
+    ds = datasource_service.create(db, _payload([("SALES_ORDER", "销售订单", "amount"), ("CUSTOMER", "客户", "name")]))
+    # Saved before content hashes existed
+    db.query(TableEntry).update({TableEntry.content_hash: None})
+    db.commit()
+
+    table_retrieval_service.refresh(db, ds.id)
+    with count_queries(engine) as counter:
+        table_retrieval_service.refresh(db, ds.id)
+    assert counter.count == 1  # only the (id, content_hash) scan